@@ -7,121 +7,15 @@ import re
 from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 
+from scheduling_engine import scheduling_engine
+from task_links import refresh_link_outlines, resolve_link_ids, retarget_link
+from wbs_index import outline_key
+
 
 def _recalculate_dates_standalone(project: Dict) -> Dict:
     """Standalone date recalculation function to avoid circular imports"""
-    from datetime import datetime, timedelta
-
-    tasks = project.get("tasks", [])
-    if not tasks:
-        return project
-
-    # Get project start date
-    project_start_str = project.get("start_date", "")
-    try:
-        project_start = datetime.fromisoformat(project_start_str.replace('Z', '+00:00').split('T')[0]) if project_start_str else datetime.now()
-    except:
-        project_start = datetime.now()
-
-    # Build task lookup
-    task_map = {t["outline_number"]: t for t in tasks}
-
-    # Parse duration helper
-    def parse_duration(duration_str):
-        if not duration_str:
-            return 0
-        import re
-        match = re.search(r'PT(\d+)H', duration_str)
-        if match:
-            return int(match.group(1)) / 8
-        return 0
-
-    # First pass: Calculate dates for non-summary tasks
-    processed = set()
-    max_iterations = len(tasks) * 2
-    iteration = 0
-
-    while len(processed) < len(tasks) and iteration < max_iterations:
-        iteration += 1
-        for task in tasks:
-            outline = task["outline_number"]
-            if outline in processed or task.get("summary"):
-                continue
-
-            predecessors = task.get("predecessors", [])
-            all_preds_processed = all(
-                p.get("outline_number") in processed or p.get("outline_number") not in task_map
-                for p in predecessors
-            )
-
-            if not all_preds_processed and predecessors:
-                continue
-
-            start_date = project_start
-
-            for pred in predecessors:
-                pred_outline = pred.get("outline_number")
-                if pred_outline in task_map:
-                    pred_task = task_map[pred_outline]
-                    pred_finish_str = pred_task.get("finish_date", "")
-                    if pred_finish_str:
-                        try:
-                            pred_finish = datetime.fromisoformat(pred_finish_str.replace('Z', '+00:00').split('T')[0])
-                            lag_days = pred.get("lag", 0)
-                            if isinstance(lag_days, str):
-                                lag_days = 0
-                            pred_finish = pred_finish + timedelta(days=int(lag_days))
-                            if pred_finish > start_date:
-                                start_date = pred_finish
-                        except:
-                            pass
-
-            duration_days = parse_duration(task.get("duration", "PT8H0M0S"))
-            finish_date = start_date + timedelta(days=max(duration_days, 0))
-
-            task["start_date"] = start_date.strftime("%Y-%m-%dT08:00:00")
-            task["finish_date"] = finish_date.strftime("%Y-%m-%dT17:00:00")
-            processed.add(outline)
-
-    # Second pass: Calculate summary task dates
-    summary_tasks = [t for t in tasks if t.get("summary")]
-    summary_tasks.sort(key=lambda t: -t.get("outline_level", 0))
-
-    for summary in summary_tasks:
-        summary_outline = summary["outline_number"]
-        children = [t for t in tasks if t["outline_number"].startswith(summary_outline + ".")]
-
-        if not children:
-            continue
-
-        min_start = None
-        max_finish = None
-
-        for child in children:
-            if child.get("start_date"):
-                try:
-                    child_start = datetime.fromisoformat(child["start_date"].replace('Z', '+00:00').split('T')[0])
-                    if min_start is None or child_start < min_start:
-                        min_start = child_start
-                except:
-                    pass
-
-            if child.get("finish_date"):
-                try:
-                    child_finish = datetime.fromisoformat(child["finish_date"].replace('Z', '+00:00').split('T')[0])
-                    if max_finish is None or child_finish > max_finish:
-                        max_finish = child_finish
-                except:
-                    pass
-
-        if min_start:
-            summary["start_date"] = min_start.strftime("%Y-%m-%dT08:00:00")
-        if max_finish:
-            summary["finish_date"] = max_finish.strftime("%Y-%m-%dT17:00:00")
-        if min_start and max_finish:
-            duration_days = (max_finish - min_start).days
-            summary["duration"] = f"PT{duration_days * 8}H0M0S"
-
+    if project.get("tasks"):
+        scheduling_engine.schedule_dates(project)
     return project
 
 
@@ -400,6 +294,14 @@ class AICommandHandler:
         Execute a parsed command on the project
         Returns: {"success": bool, "message": str, "changes": list}
         """
+        # Commands address links by outline number: show current ones, then
+        # resolve any links the command wrote back to task ids
+        refresh_link_outlines(project.get("tasks", []))
+        result = self._execute_command(command, project)
+        resolve_link_ids(project.get("tasks", []))
+        return result
+
+    def _execute_command(self, command: Dict[str, Any], project: Dict[str, Any]) -> Dict[str, Any]:
         action = command["action"]
         params = command["params"]
         
@@ -1511,7 +1413,7 @@ class AICommandHandler:
         for t in tasks:
             for p in t.get("predecessors", []):
                 if p.get("outline_number") == task_outline_2:
-                    p["outline_number"] = task_outline_1
+                    retarget_link(p, task1)
 
         # Renumber
         self._renumber_tasks(tasks)
@@ -1628,6 +1530,9 @@ class AICommandHandler:
 
     def _renumber_tasks(self, tasks: List[Dict]) -> None:
         """Renumber task outline numbers based on their position and level"""
+        # Links written by outline number during this command keep their target
+        resolve_link_ids(tasks)
+
         counters = {}  # level -> current number
         parent_stack = []  # stack of (level, outline_number)
 
@@ -1693,13 +1598,7 @@ class AICommandHandler:
         # Filter out project-level task (outline "0") and sort by outline number
         work_tasks = [t for t in tasks if t.get("outline_number") != "0"]
         # Sort by outline number to ensure correct order
-        def outline_sort_key(t):
-            outline = t.get("outline_number", "0")
-            try:
-                return int(outline.split('.')[0]), int(outline.split('.')[1]) if '.' in outline else 0
-            except:
-                return 9999, 0
-        work_tasks.sort(key=outline_sort_key)
+        work_tasks.sort(key=lambda t: outline_key(t.get("outline_number", "0")))
         print(f"[Organize] First 5 tasks: {[(t.get('outline_number'), t.get('name')[:20]) for t in work_tasks[:5]]}")
         print(f"[Organize] Last 5 tasks: {[(t.get('outline_number'), t.get('name')[:20]) for t in work_tasks[-5:]]}")
 
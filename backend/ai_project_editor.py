@@ -9,6 +9,10 @@ from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime
 from copy import deepcopy
 
+from scheduling_engine import scheduling_engine
+from wbs_index import WBSIndex, outline_key, task_key
+from task_links import links_to, refresh_link_outlines, resolve_link_ids, retarget_link
+
 
 class AIProjectEditor:
     """
@@ -210,12 +214,20 @@ class AIProjectEditor:
         Execute a parsed command on the project
         Returns: {"success": bool, "message": str, "changes": list, "project": dict}
         """
-        action = command["action"]
-        params = command["params"]
-
         # Work on a copy to allow rollback
         project_copy = deepcopy(project)
 
+        # Commands name tasks and links by outline number: bring link outlines
+        # up to date first, and give links the command created their task ids after
+        refresh_link_outlines(project_copy.get("tasks", []))
+        result = self._execute_command(command, project, project_copy)
+        resolve_link_ids(result["project"].get("tasks", []))
+        return result
+
+    def _execute_command(self, command: Dict[str, Any], project: Dict[str, Any], project_copy: Dict[str, Any]) -> Dict[str, Any]:
+        action = command["action"]
+        params = command["params"]
+
         try:
             if action == "move_task":
                 return self._move_task(
@@ -311,8 +323,10 @@ class AIProjectEditor:
             }
 
         # Get all tasks to move (including children)
-        tasks_to_move = self._get_task_with_children(tasks, source)
+        index = WBSIndex(tasks)
+        tasks_to_move = self._get_task_with_children(tasks, source, index)
         old_outlines = {t["outline_number"]: t for t in tasks_to_move}
+        old_parent = self._find_task_by_outline(tasks, source.rsplit(".", 1)[0]) if "." in source else None
 
         # Remove tasks from current position
         remaining_tasks = [t for t in tasks if t["outline_number"] not in old_outlines]
@@ -324,9 +338,8 @@ class AIProjectEditor:
             new_level = target_task["outline_level"] + 1
             # Find next available child number
             existing_children = [
-                t for t in remaining_tasks
-                if t["outline_number"].startswith(target + ".") and
-                t["outline_level"] == new_level
+                t for t in index.children(task_key(target_task))
+                if t["outline_number"] not in old_outlines
             ]
             next_child_num = len(existing_children) + 1
             new_base_outline = f"{target}.{next_child_num}"
@@ -419,7 +432,6 @@ class AIProjectEditor:
 
         # Reassign outline numbers to moved tasks
         changes = []
-        outline_mapping = {}  # old -> new outline mapping
 
         for i, task in enumerate(tasks_to_move):
             old_outline = task["outline_number"]
@@ -430,7 +442,6 @@ class AIProjectEditor:
                 relative = old_outline[len(source):]
                 new_outline = new_base_outline + relative
 
-            outline_mapping[old_outline] = new_outline
             task["outline_number"] = new_outline
             task["outline_level"] = new_level + (task["outline_level"] - source_task["outline_level"])
 
@@ -443,14 +454,8 @@ class AIProjectEditor:
                 "new_level": task["outline_level"]
             })
 
-        # Update dependencies to reflect new outline numbers
+        # Links follow task ids, so dependencies need no update
         all_tasks = remaining_tasks + tasks_to_move
-        for task in all_tasks:
-            if task.get("predecessors"):
-                for pred in task["predecessors"]:
-                    old_pred = pred.get("outline_number")
-                    if old_pred in outline_mapping:
-                        pred["outline_number"] = outline_mapping[old_pred]
 
         # Re-sort tasks by outline number
         all_tasks.sort(key=lambda t: self._outline_sort_key(t["outline_number"]))
@@ -465,11 +470,11 @@ class AIProjectEditor:
         if target_in_new and position == "under":
             target_in_new["summary"] = True
 
-        # Note: Automatic date recalculation disabled for performance
-        # Users can manually edit task dates after moving via the task editor
-        # To enable auto-recalc, uncomment the lines below:
-        # moved_outlines = [change["new_outline"] for change in changes]
-        # project = self.recalculate_dates(project, moved_outlines)
+        # Reschedule the moved tasks; only their successors and the old and new
+        # ancestor summaries are recomputed
+        moved_outlines = [t["outline_number"] for t in tasks_to_move]
+        affected_outlines = [old_parent["outline_number"]] if old_parent else []
+        project = self.recalculate_dates(project, moved_outlines, affected_outlines)
 
         return {
             "success": True,
@@ -581,8 +586,10 @@ class AIProjectEditor:
 
         # Find predecessor of deleted task (to relink successors)
         deleted_predecessor = None
+        deleted_predecessor_id = None
         if task_to_delete.get("predecessors"):
             deleted_predecessor = task_to_delete["predecessors"][0].get("outline_number")
+            deleted_predecessor_id = task_to_delete["predecessors"][0].get("predecessor_id")
 
         # Remove tasks
         remaining_tasks = [t for t in tasks if t["outline_number"] not in delete_outlines]
@@ -604,6 +611,7 @@ class AIProjectEditor:
                         if deleted_predecessor and deleted_predecessor not in delete_outlines:
                             new_predecessors.append({
                                 "outline_number": deleted_predecessor,
+                                "predecessor_id": deleted_predecessor_id,
                                 "type": pred.get("type", 1),
                                 "lag": pred.get("lag", 0),
                                 "lag_format": pred.get("lag_format", 7)
@@ -655,9 +663,7 @@ class AIProjectEditor:
             }
 
         # Get direct children of this task
-        children = [t for t in tasks if
-                    t["outline_number"].startswith(task_outline + ".") and
-                    t["outline_number"].count(".") == task_outline.count(".") + 1]
+        children = self._get_direct_children(tasks, task_outline)
 
         if not children:
             # No children, just delete the task
@@ -799,7 +805,7 @@ class AIProjectEditor:
             if task.get("predecessors"):
                 for pred in task["predecessors"]:
                     if pred.get("outline_number") == outline2:
-                        pred["outline_number"] = outline1
+                        retarget_link(pred, task1)
 
         # Renumber tasks
         tasks = self._renumber_tasks(tasks)
@@ -896,12 +902,12 @@ class AIProjectEditor:
             tasks.insert(insert_index + i, subtask)
 
         # Update any tasks that depended on the original task to depend on the last part
-        last_part_outline = f"{task_outline}.{num_parts}"
+        last_part = new_tasks[-1]
         for t in tasks:
-            if t.get("predecessors"):
+            if t.get("predecessors") and t is not last_part:
                 for pred in t["predecessors"]:
                     if pred.get("outline_number") == task_outline:
-                        pred["outline_number"] = last_part_outline
+                        retarget_link(pred, last_part)
 
         project["tasks"] = tasks
 
@@ -1209,33 +1215,23 @@ class AIProjectEditor:
                 return task
         return None
 
-    def _get_task_with_children(self, tasks: List[Dict], parent_outline: str) -> List[Dict]:
+    def _get_task_with_children(self, tasks: List[Dict], parent_outline: str, index: Optional[WBSIndex] = None) -> List[Dict]:
         """Get a task and all its children"""
-        result = []
-        for task in tasks:
-            outline = task.get("outline_number", "")
-            if outline == parent_outline or outline.startswith(parent_outline + "."):
-                result.append(task)
-        return result
+        if index is None or index.tasks is not tasks:
+            index = WBSIndex(tasks)
+        parent = index.find(parent_outline)
+        return index.subtree(task_key(parent)) if parent else []
 
-    def _get_direct_children(self, tasks: List[Dict], parent_outline: str) -> List[Dict]:
+    def _get_direct_children(self, tasks: List[Dict], parent_outline: str, index: Optional[WBSIndex] = None) -> List[Dict]:
         """Get direct children of a task (one level deep)"""
-        parent_level = len(parent_outline.split("."))
-        result = []
-        for task in tasks:
-            outline = task.get("outline_number", "")
-            if outline.startswith(parent_outline + "."):
-                task_level = len(outline.split("."))
-                if task_level == parent_level + 1:
-                    result.append(task)
-        return result
+        if index is None or index.tasks is not tasks:
+            index = WBSIndex(tasks)
+        parent = index.find(parent_outline)
+        return index.children(task_key(parent)) if parent else []
 
-    def _outline_sort_key(self, outline: str) -> List[int]:
+    def _outline_sort_key(self, outline: str) -> str:
         """Convert outline number to sortable key"""
-        try:
-            return [int(x) for x in outline.split(".")]
-        except ValueError:
-            return [0]
+        return outline_key(outline)
 
     def _renumber_tasks(self, tasks: List[Dict]) -> List[Dict]:
         """Renumber tasks to fill gaps and maintain proper sequence.
@@ -1245,6 +1241,9 @@ class AIProjectEditor:
         if not tasks:
             return tasks
 
+        # Links written by outline number during this edit keep their target
+        resolve_link_ids(tasks)
+
         # Sort tasks first
         tasks.sort(key=lambda t: self._outline_sort_key(t["outline_number"]))
 
@@ -1395,157 +1394,53 @@ class AIProjectEditor:
     # DATE RECALCULATION
     # =========================================================================
 
-    def recalculate_dates(self, project: Dict, moved_task_outlines: List[str] = None) -> Dict:
+    def recalculate_dates(self, project: Dict, moved_task_outlines: List[str] = None,
+                          affected_outlines: List[str] = None) -> Dict:
         """
-        Recalculate task dates after a move operation.
+        Recalculate task dates, fully or after a move operation.
 
         For moved tasks:
         - Clear hard constraints (allow dates to be recalculated)
-        - Calculate start_date based on predecessors
-        - Calculate finish_date based on duration
+        - Reschedule incrementally from the moved tasks (and any other
+          affected tasks, e.g. the summary they were moved out of)
 
-        For summary tasks:
-        - Roll up dates from children (min start, max finish)
+        Without moved tasks, all tasks are rescheduled by the scheduling engine
+        in a single forward/backward pass, and summary tasks roll up from their children.
         """
-        from datetime import datetime, timedelta
-
         tasks = project.get("tasks", [])
         if not tasks:
             return project
 
-        # Get project start date as fallback
-        project_start_str = project.get("start_date", "")
-        try:
-            project_start = datetime.fromisoformat(project_start_str.replace('Z', '+00:00').split('T')[0]) if project_start_str else datetime.now()
-        except:
-            project_start = datetime.now()
-
-        # Build task lookup
-        task_map = {t["outline_number"]: t for t in tasks}
-
         # Clear ALL constraints for moved tasks so dates can be recalculated
+        moved = {}
+        task_map = {t["outline_number"]: t for t in tasks}
         if moved_task_outlines:
             for outline in moved_task_outlines:
                 if outline in task_map:
                     task = task_map[outline]
                     task["constraint_type"] = 0  # As Soon As Possible
                     task["constraint_date"] = None
+                    moved[outline] = (task, task.get("start_date"))
                     print(f"[Date Recalc] Cleared constraints for moved task {outline}: {task.get('name', 'Unknown')}")
 
-        # First pass: Calculate dates for non-summary tasks based on predecessors
-        processed = set()
-        max_iterations = len(tasks) * 2
-        iteration = 0
-
-        while len(processed) < len(tasks) and iteration < max_iterations:
-            iteration += 1
-            for task in tasks:
-                outline = task["outline_number"]
-                if outline in processed:
-                    continue
-
-                if task.get("summary"):
-                    continue
-
-                predecessors = task.get("predecessors", [])
-                all_preds_processed = all(
-                    p.get("outline_number") in processed or p.get("outline_number") not in task_map
-                    for p in predecessors
-                )
-
-                if not all_preds_processed and predecessors:
-                    continue
-
-                start_date = project_start
-
-                for pred in predecessors:
-                    pred_outline = pred.get("outline_number")
-                    if pred_outline in task_map:
-                        pred_task = task_map[pred_outline]
-                        pred_finish_str = pred_task.get("finish_date", "")
-                        if pred_finish_str:
-                            try:
-                                pred_finish = datetime.fromisoformat(pred_finish_str.replace('Z', '+00:00').split('T')[0])
-                                lag_days = pred.get("lag", 0)
-                                if isinstance(lag_days, str):
-                                    import re
-                                    match = re.search(r'PT(\d+)H', lag_days)
-                                    if match:
-                                        lag_days = int(match.group(1)) / 8
-                                    else:
-                                        lag_days = 0
-                                pred_finish = pred_finish + timedelta(days=int(lag_days))
-                                if pred_finish > start_date:
-                                    start_date = pred_finish
-                            except:
-                                pass
-
-                duration_str = task.get("duration", "PT8H0M0S")
-                duration_days = self._parse_duration_to_days(duration_str)
-                finish_date = start_date + timedelta(days=max(duration_days, 0))
-
-                old_start = task.get("start_date")
-                task["start_date"] = start_date.strftime("%Y-%m-%dT08:00:00")
-                task["finish_date"] = finish_date.strftime("%Y-%m-%dT17:00:00")
-
-                if outline in (moved_task_outlines or []):
-                    old_start_str = old_start[:10] if old_start else 'None'
-                    print(f"[Date Recalc] Task {outline} '{task.get('name', '')[:30]}': {old_start_str} -> {task['start_date'][:10]}")
-
-                processed.add(outline)
-
-        # Second pass: Calculate dates for summary tasks (roll up from children)
-        summary_tasks = [t for t in tasks if t.get("summary")]
-        summary_tasks.sort(key=lambda t: -t.get("outline_level", 0))
-
-        for summary in summary_tasks:
-            summary_outline = summary["outline_number"]
-            children = [
-                t for t in tasks
-                if t["outline_number"].startswith(summary_outline + ".")
-                and t["outline_number"] != summary_outline
-            ]
+        if moved:
+            seeds = [task["id"] for task, _ in moved.values()]
+            seeds += [task_map[o]["id"] for o in affected_outlines or [] if o in task_map]
+            stats = scheduling_engine.reschedule_from(project, seeds)
+        else:
+            stats = scheduling_engine.schedule_dates(project)
 
-            if not children:
-                continue
+        for outline, (task, old_start) in moved.items():
+            old_start_str = old_start[:10] if old_start else 'None'
+            new_start_str = task['start_date'][:10] if task.get('start_date') else 'None'
+            print(f"[Date Recalc] Task {outline} '{task.get('name', '')[:30]}': {old_start_str} -> {new_start_str}")
 
-            min_start = None
-            max_finish = None
-
-            for child in children:
-                child_start_str = child.get("start_date", "")
-                child_finish_str = child.get("finish_date", "")
-
-                if child_start_str:
-                    try:
-                        child_start = datetime.fromisoformat(child_start_str.replace('Z', '+00:00').split('T')[0])
-                        if min_start is None or child_start < min_start:
-                            min_start = child_start
-                    except:
-                        pass
-
-                if child_finish_str:
-                    try:
-                        child_finish = datetime.fromisoformat(child_finish_str.replace('Z', '+00:00').split('T')[0])
-                        if max_finish is None or child_finish > max_finish:
-                            max_finish = child_finish
-                    except:
-                        pass
-
-            old_start = summary.get("start_date", "None")
-            if min_start:
-                summary["start_date"] = min_start.strftime("%Y-%m-%dT08:00:00")
-            if max_finish:
-                summary["finish_date"] = max_finish.strftime("%Y-%m-%dT17:00:00")
-
-            if min_start and max_finish:
-                duration_days = (max_finish - min_start).days
-                summary["duration"] = f"PT{duration_days * 8}H0M0S"
-                old_start_str = old_start[:10] if old_start and old_start != 'None' else 'None'
-                new_start_str = summary.get('start_date', '')[:10] if summary.get('start_date') else 'None'
-                print(f"[Date Recalc] Summary {summary_outline} '{summary.get('name', '')[:30]}': {old_start_str} -> {new_start_str}")
-
-        print(f"[Date Recalc] Completed: {len(processed)} non-summary tasks, {len(summary_tasks)} summary tasks")
+        if moved:
+            print(f"[Date Recalc] Completed: {len(stats['changed'])} tasks changed, {stats['visited']} recomputed")
+            return project
+        if stats["cyclic"]:
+            print(f"[Date Recalc] Skipped {stats['cyclic']} tasks in circular dependencies")
+        print(f"[Date Recalc] Completed: {stats['scheduled']} non-summary tasks, {stats['summaries']} summary tasks")
         return project
 
     def _parse_duration_to_days(self, duration_str: str) -> float:
@@ -1683,11 +1578,11 @@ class ProjectTemplateLearner:
                 all_patterns["task_name_frequency"][name]["count"] += 1
                 all_patterns["task_name_frequency"][name]["durations"].append(task["duration_hours"])
 
-            # Aggregate duration norms
+            # Aggregate duration norms (spread kept as min/max relative to the average)
             for category, stats in learned.get("duration_stats", {}).items():
                 if category not in all_patterns["category_duration_norms"]:
                     all_patterns["category_duration_norms"][category] = []
-                all_patterns["category_duration_norms"][category].append(stats["avg_hours"])
+                all_patterns["category_duration_norms"][category].append(stats)
 
             # Aggregate milestones
             for ms in learned.get("milestones", []):
@@ -1697,11 +1592,15 @@ class ProjectTemplateLearner:
                 all_patterns["common_milestones"][name] += 1
 
         # Calculate normalized values
-        for category, avgs in all_patterns["category_duration_norms"].items():
-            if avgs:
+        for category, stats_list in all_patterns["category_duration_norms"].items():
+            if stats_list:
+                avgs = [stats["avg_hours"] for stats in stats_list]
+                spreads = [stats for stats in stats_list if stats["avg_hours"] > 0]
                 all_patterns["category_duration_norms"][category] = {
                     "avg_hours": sum(avgs) / len(avgs),
-                    "sample_count": len(avgs)
+                    "sample_count": len(avgs),
+                    "min_ratio": sum(s["min_hours"] / s["avg_hours"] for s in spreads) / len(spreads) if spreads else 1.0,
+                    "max_ratio": sum(s["max_hours"] / s["avg_hours"] for s in spreads) / len(spreads) if spreads else 1.0
                 }
 
         # Calculate task name averages
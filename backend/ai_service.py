@@ -8,6 +8,8 @@ import json
 import os
 from typing import List, Dict, Optional
 from models import Task
+from scheduling_engine import DayAxis, scheduling_engine
+from schedule_crashing import crashing_optimizer
 
 
 class LocalAIService:
@@ -237,39 +239,8 @@ Provide your estimate:"""
     # MS PROJECT CRITICAL PATH CALCULATION (CPM Algorithm)
     # ============================================================================
 
-    def _parse_constraint_date_to_days(self, constraint_date: str, project_start: str = None) -> float:
-        """
-        Convert a constraint date to days from project start.
-        Returns the number of working days from project start to the constraint date.
-        """
-        if not constraint_date:
-            return 0.0
-        try:
-            from datetime import datetime
-            # Parse constraint date (ISO 8601 format)
-            if 'T' in constraint_date:
-                constraint_dt = datetime.fromisoformat(constraint_date.replace('Z', '+00:00'))
-            else:
-                constraint_dt = datetime.strptime(constraint_date[:10], '%Y-%m-%d')
-
-            # If no project start, assume constraint is absolute days from day 0
-            if not project_start:
-                # Use a reference date (Jan 1, 2024)
-                ref_date = datetime(2024, 1, 1)
-                delta = constraint_dt - ref_date
-                return delta.days
-            else:
-                if 'T' in project_start:
-                    start_dt = datetime.fromisoformat(project_start.replace('Z', '+00:00'))
-                else:
-                    start_dt = datetime.strptime(project_start[:10], '%Y-%m-%d')
-                delta = constraint_dt - start_dt
-                return delta.days
-        except Exception as e:
-            print(f"Error parsing constraint date: {e}")
-            return 0.0
-
-    def _calculate_critical_path(self, tasks: list, project_start: str = None) -> dict:
+    def _calculate_critical_path(self, tasks: list, project_start: str = None, vectorized: bool = None,
+                                 calendar=None) -> dict:
         """
         Calculate critical path using CPM (Critical Path Method).
         Implements forward pass and backward pass per MS Project standards.
@@ -285,264 +256,90 @@ Provide your estimate:"""
             6 = FINISH_NO_EARLIER_THAN
             7 = FINISH_NO_LATER_THAN
 
+        vectorized: True/False forces the NumPy array-backed passes on/off
+            (for benchmarking); None follows the CPM_VECTORIZED setting.
+        calendar: CalendarService constraint dates and hour durations are
+            counted on; defaults to the calendar of the loaded project, if any.
+            Constraint dates are working days from project_start.
+
         Returns:
             dict with:
                 - critical_tasks: list of tasks on critical path
                 - project_duration: total project duration in days
                 - task_floats: dict of task_id -> total_float
+                - task_schedule: dict of task_id -> early/late start/finish and total_float
+                - driving_links: list of [predecessor_id, successor_id] zero-float driving links
+                - driving_paths: chains of task ids linked by driving links,
+                  the chain finishing the project first
         """
         if not tasks:
             return {
                 "critical_tasks": [],
                 "project_duration": 0,
-                "task_floats": {}
+                "task_floats": {},
+                "task_schedule": {},
+                "driving_links": [],
+                "driving_paths": []
             }
 
-        # Build task lookup map
-        task_map = {t["id"]: t for t in tasks}
-        outline_to_id = {t["outline_number"]: t["id"] for t in tasks}
-
-        # Initialize all tasks
-        for task in tasks:
-            task["early_start"] = 0.0
-            task["early_finish"] = 0.0
-            task["late_start"] = 0.0
-            task["late_finish"] = 0.0
-            task["total_float"] = 0.0
-            task["is_critical"] = False
-
-        # FORWARD PASS: Calculate Early Start and Early Finish
-        # Process tasks in topological order (respecting dependencies)
-        processed = set()
-
-        def can_process(task):
-            """Check if all predecessors have been processed"""
-            if not task.get("predecessors"):
-                return True
-            for pred in task["predecessors"]:
-                pred_id = outline_to_id.get(pred["outline_number"])
-                if pred_id and pred_id not in processed:
-                    return False
-            return True
-
-        while len(processed) < len(tasks):
-            made_progress = False
-            for task in tasks:
-                if task["id"] in processed:
-                    continue
-
-                if can_process(task):
-                    # Calculate early start based on predecessors
-                    if not task.get("predecessors"):
-                        base_early_start = 0.0
-                    else:
-                        max_finish = 0.0
-                        for pred in task["predecessors"]:
-                            pred_id = outline_to_id.get(pred["outline_number"])
-                            if pred_id and pred_id in task_map:
-                                pred_task = task_map[pred_id]
-
-                                # Get lag in days (already converted from XML tenth-minutes to days during import)
-                                # lag is stored internally as days with lag_format=7
-                                lag_days = pred.get("lag", 0)
-
-                                # Dependency type (MS Project standard):
-                                # 0 = FF (Finish-to-Finish)
-                                # 1 = FS (Finish-to-Start) - DEFAULT
-                                # 2 = SF (Start-to-Finish)
-                                # 3 = SS (Start-to-Start)
-                                dep_type = pred.get("type", 1)
-
-                                if dep_type == 1:  # FS (Finish-to-Start)
-                                    finish_time = pred_task["early_finish"] + lag_days
-                                elif dep_type == 3:  # SS (Start-to-Start)
-                                    finish_time = pred_task["early_start"] + lag_days
-                                elif dep_type == 0:  # FF (Finish-to-Finish)
-                                    finish_time = pred_task["early_finish"] + lag_days - self._parse_duration_to_days(task.get("duration", ""))
-                                elif dep_type == 2:  # SF (Start-to-Finish)
-                                    finish_time = pred_task["early_start"] + lag_days - self._parse_duration_to_days(task.get("duration", ""))
-                                else:
-                                    finish_time = pred_task["early_finish"] + lag_days
-
-                                max_finish = max(max_finish, finish_time)
-
-                        base_early_start = max_finish
-
-                    # Apply constraint enforcement on early_start (forward pass)
-                    constraint_type = task.get("constraint_type", 0)
-                    constraint_date = task.get("constraint_date")
-                    duration_days = self._parse_duration_to_days(task.get("duration", ""))
-
-                    if constraint_type == 2:  # MUST_START_ON
-                        constraint_day = self._parse_constraint_date_to_days(constraint_date, project_start)
-                        task["early_start"] = constraint_day
-                    elif constraint_type == 3:  # MUST_FINISH_ON
-                        constraint_day = self._parse_constraint_date_to_days(constraint_date, project_start)
-                        task["early_start"] = constraint_day - duration_days
-                    elif constraint_type == 4:  # START_NO_EARLIER_THAN
-                        constraint_day = self._parse_constraint_date_to_days(constraint_date, project_start)
-                        task["early_start"] = max(base_early_start, constraint_day)
-                    elif constraint_type == 6:  # FINISH_NO_EARLIER_THAN
-                        constraint_day = self._parse_constraint_date_to_days(constraint_date, project_start)
-                        min_early_start = constraint_day - duration_days
-                        task["early_start"] = max(base_early_start, min_early_start)
-                    else:
-                        # ASAP (0), ALAP (1), SNLT (5), FNLT (7) - use calculated early start
-                        task["early_start"] = base_early_start
-
-                    # Calculate early finish
-                    task["early_finish"] = task["early_start"] + duration_days
-
-                    processed.add(task["id"])
-                    made_progress = True
-
-            if not made_progress:
-                # Circular dependency detected - break the loop
-                break
-
-        # Find project end date (maximum early finish)
-        project_end = max((t["early_finish"] for t in tasks), default=0.0)
-
-        # BACKWARD PASS: Calculate Late Start and Late Finish
-        # Process tasks in reverse topological order
-        processed = set()
-
-        # Build successor map
-        successor_map = {task["id"]: [] for task in tasks}
-        for task in tasks:
-            for pred in task.get("predecessors", []):
-                pred_id = outline_to_id.get(pred["outline_number"])
-                if pred_id:
-                    successor_map[pred_id].append({
-                        "task": task,
-                        "type": pred.get("type", 1),
-                        "lag": pred.get("lag", 0)
-                    })
-
-        def can_process_backward(task):
-            """Check if all successors have been processed"""
-            successors = successor_map.get(task["id"], [])
-            if not successors:
-                return True
-            for succ_info in successors:
-                if succ_info["task"]["id"] not in processed:
-                    return False
-            return True
-
-        while len(processed) < len(tasks):
-            made_progress = False
-            for task in reversed(tasks):
-                if task["id"] in processed:
-                    continue
-
-                if can_process_backward(task):
-                    successors = successor_map.get(task["id"], [])
-                    duration_days = self._parse_duration_to_days(task.get("duration", ""))
-
-                    if not successors:
-                        # No successors - use project end date
-                        base_late_finish = project_end
-                    else:
-                        min_start = project_end
-                        for succ_info in successors:
-                            succ_task = succ_info["task"]
-                            dep_type = succ_info["type"]
-                            lag_days = succ_info["lag"]  # Already in days
-
-                            if dep_type == 1:  # FS (Finish-to-Start)
-                                start_time = succ_task["late_start"] - lag_days
-                            elif dep_type == 3:  # SS (Start-to-Start)
-                                start_time = succ_task["late_start"] - lag_days + duration_days
-                            elif dep_type == 0:  # FF (Finish-to-Finish)
-                                start_time = succ_task["late_finish"] - lag_days
-                            elif dep_type == 2:  # SF (Start-to-Finish)
-                                start_time = succ_task["late_finish"] - lag_days + duration_days
-                            else:
-                                start_time = succ_task["late_start"] - lag_days
-
-                            min_start = min(min_start, start_time)
-
-                        base_late_finish = min_start
-
-                    # Apply constraint enforcement on late_finish (backward pass)
-                    constraint_type = task.get("constraint_type", 0)
-                    constraint_date = task.get("constraint_date")
-
-                    if constraint_type == 2:  # MUST_START_ON
-                        constraint_day = self._parse_constraint_date_to_days(constraint_date, project_start)
-                        task["late_finish"] = constraint_day + duration_days
-                    elif constraint_type == 3:  # MUST_FINISH_ON
-                        constraint_day = self._parse_constraint_date_to_days(constraint_date, project_start)
-                        task["late_finish"] = constraint_day
-                    elif constraint_type == 5:  # START_NO_LATER_THAN
-                        constraint_day = self._parse_constraint_date_to_days(constraint_date, project_start)
-                        max_late_finish = constraint_day + duration_days
-                        task["late_finish"] = min(base_late_finish, max_late_finish)
-                    elif constraint_type == 7:  # FINISH_NO_LATER_THAN
-                        constraint_day = self._parse_constraint_date_to_days(constraint_date, project_start)
-                        task["late_finish"] = min(base_late_finish, constraint_day)
-                    elif constraint_type == 1:  # AS_LATE_AS_POSSIBLE
-                        # For ALAP, late_finish = base_late_finish (normal backward pass)
-                        # But early_start should be pushed to late_start after backward pass
-                        task["late_finish"] = base_late_finish
-                    else:
-                        # ASAP (0), SNET (4), FNET (6) - use calculated late finish
-                        task["late_finish"] = base_late_finish
-
-                    # Calculate late start
-                    task["late_start"] = task["late_finish"] - duration_days
-
-                    processed.add(task["id"])
-                    made_progress = True
-
-            if not made_progress:
-                break
-
-        # Handle ALAP (As Late As Possible) constraints
-        # For ALAP tasks, push early_start to late_start
-        for task in tasks:
-            constraint_type = task.get("constraint_type", 0)
-            if constraint_type == 1:  # AS_LATE_AS_POSSIBLE
-                task["early_start"] = task["late_start"]
-                task["early_finish"] = task["late_finish"]
-
-        # Calculate Total Float and identify Critical Path
+        # Single topological sort + forward/backward pass (see scheduling_engine)
+        axis = scheduling_engine._day_axis({"start_date": project_start}, calendar)
+        result = scheduling_engine.compute(
+            tasks,
+            constraint_offset=axis.offset,
+            vectorized=vectorized,
+            hours_per_day=axis.hours_per_day
+        )
+        project_end = result.project_end
+
+        # Calculate Total Float and identify Critical Path.
+        # Results are returned alongside the tasks; the task dicts are not modified.
         critical_tasks = []
         task_floats = {}
+        task_schedule = {}
 
-        print(f"\n=== CRITICAL PATH DEBUG ===")
-        print(f"Project end (max early_finish): {project_end}")
-        print(f"Total tasks: {len(tasks)}")
-
-        for task in tasks:
+        for i, task in enumerate(tasks):
             # Total Float = Late Start - Early Start (or Late Finish - Early Finish)
-            total_float = task["late_start"] - task["early_start"]
-            task["total_float"] = total_float
+            total_float = result.late_start[i] - result.early_start[i]
             task_floats[task["id"]] = total_float
-
-            duration_days = self._parse_duration_to_days(task.get("duration", ""))
-            print(f"Task {task['outline_number']}: {task['name'][:30]:30} | Duration: {duration_days:5.1f}d | ES: {task['early_start']:6.1f} | EF: {task['early_finish']:6.1f} | LS: {task['late_start']:6.1f} | LF: {task['late_finish']:6.1f} | Float: {total_float:6.1f} | Summary: {task.get('summary', False)}")
+            task_schedule[task["id"]] = {
+                "early_start": result.early_start[i],
+                "early_finish": result.early_finish[i],
+                "late_start": result.late_start[i],
+                "late_finish": result.late_finish[i],
+                "total_float": total_float
+            }
 
             # Skip summary tasks - they derive their criticality from children
             # Only work tasks (non-summary) can be on the critical path
             if task.get("summary", False):
-                task["is_critical"] = False
                 continue
 
             # Critical if float is approximately zero (within 0.01 days tolerance)
             # Note: MUST constraints (types 2, 3) are always critical
             constraint_type = task.get("constraint_type", 0)
             if abs(total_float) < 0.01 or constraint_type in [2, 3]:
-                task["is_critical"] = True
                 critical_tasks.append(task)
-                print(f"  ^ CRITICAL (float={total_float:.2f})")
 
-        print(f"=== Found {len(critical_tasks)} critical tasks ===\n")
+        # Driving links and chains, found in one pass over the CPM graph
+        links, chains = scheduling_engine.driving_paths(result)
+        driving_links = [[tasks[p]["id"], tasks[s]["id"]] for p, s in links]
+        driving_paths = []
+        for path in chains:
+            ids = [tasks[i]["id"] for i in path if not tasks[i].get("summary", False)]
+            if ids:
+                driving_paths.append(ids)
+
+        print(f"[Critical Path] {len(critical_tasks)} of {len(tasks)} tasks critical, "
+              f"{len(driving_paths)} driving paths, project duration {project_end:.1f} days")
 
         return {
             "critical_tasks": critical_tasks,
             "project_duration": project_end,
-            "task_floats": task_floats
+            "task_floats": task_floats,
+            "task_schedule": task_schedule,
+            "driving_links": driving_links,
+            "driving_paths": driving_paths
         }
 
     # ============================================================================
@@ -570,7 +367,7 @@ Provide your estimate:"""
             }
 
         # Calculate critical path
-        cp_result = self._calculate_critical_path(tasks)
+        cp_result = self._calculate_critical_path(tasks, project_context.get("start_date"))
         current_duration = cp_result["project_duration"]
         critical_tasks = cp_result["critical_tasks"]
         reduction_needed = current_duration - target_days
@@ -587,22 +384,29 @@ Provide your estimate:"""
                 "critical_path_tasks": [t["name"] for t in critical_tasks]
             }
 
-        # Generate optimization strategies
+        # Generate optimization strategies: each is a crashing plan whose savings
+        # were measured by re-running CPM after every cut, not summed up front
+        axis = scheduling_engine._day_axis(project_context, None)
         strategies = []
 
         # Strategy 1: Reduce Lags (Lowest Risk)
-        lag_strategy = self._optimize_lags(tasks, critical_tasks, reduction_needed)
+        lag_strategy = self._optimize_lags(tasks, target_days, axis)
         if lag_strategy:
             strategies.append(lag_strategy)
 
         # Strategy 2: Compress Tasks (Medium Risk)
-        compression_strategy = self._compress_tasks(tasks, critical_tasks, reduction_needed)
+        compression_strategy = self._compress_tasks(tasks, target_days, axis)
         if compression_strategy:
             strategies.append(compression_strategy)
 
+        # Strategy 3: Minimum-cost crashing over lags and durations together,
+        # when neither alone is the same plan
+        crashing_strategy = self._crash_schedule(tasks, target_days, axis)
+        if crashing_strategy and len({c["change_type"] for c in crashing_strategy["changes"]}) > 1:
+            strategies.append(crashing_strategy)
+
         # Determine if target is achievable
-        max_savings = sum(s["total_savings_days"] for s in strategies)
-        achievable = max_savings >= reduction_needed
+        achievable = any(s["achieves_target"] for s in strategies)
 
         # Rank strategies
         strategies = self._rank_strategies(strategies, reduction_needed)
@@ -618,126 +422,104 @@ Provide your estimate:"""
             "critical_path_tasks": [t["name"] for t in critical_tasks]
         }
 
-    def _optimize_lags(self, tasks: list, critical_tasks: list, reduction_needed: float) -> Optional[dict]:
+    def duration_cost_curve(self, targets: List[float], project_context: dict) -> dict:
         """
-        Strategy 1: Reduce lags between dependent tasks.
-        MS Project compliant - modifies LinkLag values.
+        Time-cost tradeoff curve: the minimum crashing cost of each target duration.
+        One crashing run to the tightest target serves every looser target.
         """
-        changes = []
-        total_savings = 0.0
-
-        # Only look at critical path tasks
-        for task in critical_tasks:
-            for pred in task.get("predecessors", []):
-                # Lag is stored in days (converted from tenth-minutes during XML import)
-                lag_days = pred.get("lag", 0)
-
-                if lag_days > 0:
-                    # Suggest reducing lag by 40% (conservative approach)
-                    reduction_percent = 0.4
-                    suggested_reduction = lag_days * reduction_percent
-                    new_lag_days = lag_days - suggested_reduction
-
-                    changes.append({
-                        "task_id": task["id"],
-                        "task_name": task["name"],
-                        "task_outline": task["outline_number"],
-                        "change_type": "lag_reduction",
-                        "current_value": lag_days,
-                        "suggested_value": new_lag_days,
-                        "savings_days": suggested_reduction,
-                        "cost_usd": 0,
-                        "risk_level": "Low",
-                        "description": f"Reduce lag from {lag_days:.1f} to {new_lag_days:.1f} days",
-                        "predecessor_outline": pred["outline_number"],
-                        "lag_format": pred.get("lag_format", 7),
-                        "new_lag_days": new_lag_days
-                    })
-
-                    total_savings += suggested_reduction
+        tasks = project_context.get("tasks", [])
+        if not tasks or not targets:
+            return {
+                "success": False,
+                "message": "No tasks in project" if not tasks else "No target durations",
+                "current_duration_days": 0,
+                "points": [],
+                "steps": []
+            }
 
-        if not changes:
-            return None
+        axis = scheduling_engine._day_axis(project_context, None)
+        curve = crashing_optimizer.cost_curve(tasks, targets, axis.offset, hours_per_day=axis.hours_per_day)
+        reachable = sum(1 for point in curve["points"] if point["achievable"])
 
         return {
-            "strategy_id": "lag_reduction",
-            "name": "Reduce Lags",
-            "type": "lag_reduction",
-            "total_savings_days": total_savings,
-            "total_cost_usd": 0,
-            "risk_level": "Low",
-            "recommended": True,
-            "description": f"Reduce buffer time between {len(changes)} dependent tasks on critical path",
-            "changes": changes,
-            "tasks_affected": len(set(c["task_id"] for c in changes)),
-            "critical_path_impact": True
+            "success": True,
+            "message": f"{reachable} of {len(curve['points'])} target durations reachable by crashing",
+            "current_duration_days": curve["baseline_duration_days"],
+            "points": curve["points"],
+            "steps": curve["steps"],
+            "stop_reason": curve["stop_reason"]
         }
 
-    def _compress_tasks(self, tasks: list, critical_tasks: list, reduction_needed: float) -> Optional[dict]:
+    def _optimize_lags(self, tasks: list, target_days: float, axis: DayAxis) -> Optional[dict]:
+        """
+        Strategy 1: Reduce lags between dependent tasks.
+        MS Project compliant - modifies LinkLag values.
+        """
+        plan = crashing_optimizer.crash(tasks, target_days, axis.offset, compress_tasks=False,
+                                        hours_per_day=axis.hours_per_day)
+        if not plan["changes"]:
+            return None
+        return self._crashing_strategy(
+            plan,
+            strategy_id="lag_reduction",
+            name="Reduce Lags",
+            risk_level="Low",
+            description=f"Reduce buffer time on {len(plan['changes'])} critical links"
+        )
+
+    def _compress_tasks(self, tasks: list, target_days: float, axis: DayAxis) -> Optional[dict]:
         """
         Strategy 2: Compress task durations by adding resources.
         MS Project compliant - modifies Duration field.
         """
-        changes = []
-        total_savings = 0.0
-        total_cost = 0.0
-
-        for task in critical_tasks:
-            # Skip summary tasks and milestones
-            if task.get("summary") or task.get("milestone"):
-                continue
-
-            duration_days = self._parse_duration_to_days(task.get("duration", ""))
-
-            # Only compress tasks longer than 2 days
-            if duration_days > 2:
-                # Suggest 20% compression (realistic with added resources)
-                compression_percent = 0.2
-                compression_days = duration_days * compression_percent
-                new_duration_days = duration_days - compression_days
-
-                # Convert back to MS Project format
-                new_duration_hours = int(new_duration_days * 8)
-                new_duration_format = f"PT{new_duration_hours}H0M0S"
-
-                # Estimate cost: $500/day for overtime or extra crew
-                cost = compression_days * 500
-
-                changes.append({
-                    "task_id": task["id"],
-                    "task_name": task["name"],
-                    "task_outline": task["outline_number"],
-                    "change_type": "duration_compression",
-                    "current_value": duration_days,
-                    "suggested_value": new_duration_days,
-                    "savings_days": compression_days,
-                    "cost_usd": cost,
-                    "risk_level": "Medium",
-                    "description": f"Compress from {duration_days:.1f} to {new_duration_days:.1f} days (add crew/overtime)",
-                    "duration_format": new_duration_format
-                })
-
-                total_savings += compression_days
-                total_cost += cost
-
-                # Stop if we've achieved enough savings
-                if total_savings >= reduction_needed:
-                    break
-
-        if not changes:
+        plan = crashing_optimizer.crash(tasks, target_days, axis.offset, reduce_lags=False,
+                                        hours_per_day=axis.hours_per_day)
+        if not plan["changes"]:
             return None
-
+        return self._crashing_strategy(
+            plan,
+            strategy_id="task_compression",
+            name="Compress Tasks",
+            risk_level="Medium",
+            description=f"Reduce duration of {len(plan['changes'])} critical tasks by adding resources"
+        )
+
+    def _crash_schedule(self, tasks: list, target_days: float, axis: DayAxis) -> Optional[dict]:
+        """
+        Strategy 3: Minimum-cost crashing (free lag reductions first, then the
+        cheapest compressions), re-evaluating the critical path after each step.
+        """
+        plan = crashing_optimizer.crash(tasks, target_days, axis.offset, hours_per_day=axis.hours_per_day)
+        if not plan["changes"]:
+            return None
+        return self._crashing_strategy(
+            plan,
+            strategy_id="time_cost_crashing",
+            name="Crash Schedule (Minimum Cost)",
+            risk_level="Medium",
+            description=f"Cheapest combination of lag reductions and compressions over {len(plan['steps'])} steps",
+            strategy_type="combined"
+        )
+
+    def _crashing_strategy(
+        self, plan: dict, strategy_id: str, name: str, risk_level: str, description: str, strategy_type: str = None
+    ) -> dict:
+        """Optimization strategy from a crashing plan"""
+        if not plan["achieved"]:
+            description += f" ({plan['stop_reason'].lower()})"
         return {
-            "strategy_id": "task_compression",
-            "name": "Compress Tasks",
-            "type": "task_compression",
-            "total_savings_days": total_savings,
-            "total_cost_usd": total_cost,
-            "risk_level": "Medium",
+            "strategy_id": strategy_id,
+            "name": name,
+            "type": strategy_type or strategy_id,
+            "total_savings_days": plan["total_savings_days"],
+            "total_cost_usd": plan["total_cost_usd"],
+            "risk_level": risk_level,
             "recommended": False,
-            "description": f"Reduce duration of {len(changes)} critical tasks by adding resources",
-            "changes": changes,
-            "tasks_affected": len(changes),
+            "description": description,
+            "changes": plan["changes"],
+            "steps": plan["steps"],
+            "achieves_target": plan["achieved"],
+            "tasks_affected": len(set(c["task_id"] for c in plan["changes"])),
             "critical_path_impact": True
         }
 
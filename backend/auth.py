@@ -11,7 +11,7 @@ from pydantic import BaseModel, EmailStr, Field
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 
-from database import DatabaseService
+from database import AsyncDatabaseService, DatabaseService
 
 # Security configuration
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "sturgis-project-secret-key-change-in-production-2024")
@@ -24,8 +24,9 @@ pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 # HTTP Bearer token security
 security = HTTPBearer()
 
-# Database instance
+# Database instance (awaited from handlers through adb)
 db = DatabaseService()
+adb = AsyncDatabaseService(db)
 
 # Router
 router = APIRouter(prefix="/api/auth", tags=["authentication"])
@@ -109,7 +110,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     if user_id is None:
         raise credentials_exception
 
-    user = db.get_user_by_id(user_id)
+    user = await adb.get_user_by_id(user_id)
     if user is None:
         raise credentials_exception
 
@@ -124,7 +125,7 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
 async def register(user_data: UserRegister):
     """Register a new user"""
     # Check if email already exists
-    if db.email_exists(user_data.email):
+    if await adb.email_exists(user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
@@ -132,7 +133,7 @@ async def register(user_data: UserRegister):
 
     # Hash password and create user
     password_hash = get_password_hash(user_data.password)
-    user_id = db.create_user(
+    user_id = await adb.create_user(
         email=user_data.email,
         name=user_data.name,
         password_hash=password_hash,
@@ -143,7 +144,7 @@ async def register(user_data: UserRegister):
     access_token = create_access_token(data={"sub": user_id})
 
     # Get user data for response
-    user = db.get_user_by_id(user_id)
+    user = await adb.get_user_by_id(user_id)
     user.pop("password_hash", None)
 
     return Token(
@@ -156,7 +157,7 @@ async def register(user_data: UserRegister):
 async def login(credentials: UserLogin):
     """Login and get access token"""
     # Find user by email
-    user = db.get_user_by_email(credentials.email)
+    user = await adb.get_user_by_email(credentials.email)
 
     if not user:
         raise HTTPException(
@@ -4,6 +4,7 @@ Handles database backup/restore to survive Azure App Service deployments
 """
 import os
 import shutil
+import sqlite3
 import threading
 import time
 from datetime import datetime
@@ -98,6 +99,19 @@ class AzureStorageService:
         stat = file_path.stat()
         return f"{stat.st_size}-{stat.st_mtime}"
 
+    def _checkpoint(self) -> None:
+        """Fold the WAL into the database file, so the file alone is a complete copy"""
+        if not self.local_db_path.exists():
+            return
+        try:
+            conn = sqlite3.connect(str(self.local_db_path))
+            try:
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            finally:
+                conn.close()
+        except sqlite3.Error as e:
+            print(f"Azure Storage: WAL checkpoint failed: {e}")
+
     def restore_from_azure(self) -> bool:
         """
         Download database from Azure Blob Storage on startup.
@@ -114,6 +128,7 @@ class AzureStorageService:
 
             # Create backup of local file if it exists
             if self.local_db_path.exists():
+                self._checkpoint()
                 backup_path = self.local_db_path.with_suffix('.db.local_backup')
                 shutil.copy2(self.local_db_path, backup_path)
                 print(f"Azure Storage: Backed up local database to {backup_path}")
@@ -126,6 +141,10 @@ class AzureStorageService:
                 download_stream = self.blob_client.download_blob()
                 f.write(download_stream.readall())
 
+            # A WAL left over from the old local file must not be replayed into the restored one
+            for suffix in ("-wal", "-shm"):
+                Path(f"{self.local_db_path}{suffix}").unlink(missing_ok=True)
+
             file_size = self.local_db_path.stat().st_size
             print(f"Azure Storage: Database restored successfully ({file_size:,} bytes)")
             self._last_backup_hash = self._get_file_hash(self.local_db_path)
@@ -149,6 +168,9 @@ class AzureStorageService:
                 print("Azure Storage: No local database to backup")
                 return False
 
+            # Committed changes may still sit in the WAL
+            self._checkpoint()
+
             # Check if file has changed
             current_hash = self._get_file_hash(self.local_db_path)
             if not force and current_hash == self._last_backup_hash:
@@ -2,11 +2,81 @@
 Calendar Service for Sturgis Project
 Provides calendar-aware date calculations for scheduling
 """
-from datetime import datetime, timedelta
-from typing import List, Set, Optional, Dict, Any
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Set, Optional, Dict, Any
 import math
 
 
+class WorkingDayIndex:
+    """
+    Prefix-sum index over a calendar's working days.
+
+    Every date gets a working-day number relative to a fixed anchor date:
+    the count of working days in [anchor, date) for dates on or after the
+    anchor, negative counts before it. Working dates are stored in order, so
+    both directions (date -> number, number -> date) are O(1) list lookups.
+    The covered range grows in chunks as lookups reach past it.
+    """
+
+    CHUNK_DAYS = 366 * 4
+    MAX_DAYS = 366 * 200  # Lookups further than this from the anchor are refused
+
+    def __init__(self, is_working: Callable[[int], bool], anchor_ordinal: int):
+        self._is_working = is_working
+        self.anchor = anchor_ordinal
+        # _fwd_count[k]: working days in [anchor, anchor + k); _fwd_days: working ordinals >= anchor
+        self._fwd_count: List[int] = [0]
+        self._fwd_days: List[int] = []
+        # _back_count[k]: working days in [anchor - k, anchor); _back_days: working ordinals < anchor, descending
+        self._back_count: List[int] = [0]
+        self._back_days: List[int] = []
+
+    def _extend_forward(self, days: int) -> None:
+        if len(self._fwd_count) - 1 >= self.MAX_DAYS:
+            raise ValueError("Date is outside the calendar range")
+        ordinal = self.anchor + len(self._fwd_count) - 1
+        count = self._fwd_count[-1]
+        for _ in range(days):
+            if self._is_working(ordinal):
+                self._fwd_days.append(ordinal)
+                count += 1
+            self._fwd_count.append(count)
+            ordinal += 1
+
+    def _extend_backward(self, days: int) -> None:
+        if len(self._back_count) - 1 >= self.MAX_DAYS:
+            raise ValueError("Date is outside the calendar range")
+        ordinal = self.anchor - len(self._back_count)
+        count = self._back_count[-1]
+        for _ in range(days):
+            if self._is_working(ordinal):
+                self._back_days.append(ordinal)
+                count += 1
+            self._back_count.append(count)
+            ordinal -= 1
+
+    def number(self, ordinal: int) -> int:
+        """Working-day number of a date: working days between the anchor and it"""
+        k = ordinal - self.anchor
+        if k >= 0:
+            while k >= len(self._fwd_count):
+                self._extend_forward(self.CHUNK_DAYS)
+            return self._fwd_count[k]
+        while -k >= len(self._back_count):
+            self._extend_backward(self.CHUNK_DAYS)
+        return -self._back_count[-k]
+
+    def ordinal(self, number: int) -> int:
+        """Date ordinal of the working day with the given number"""
+        if number >= 0:
+            while number >= len(self._fwd_days):
+                self._extend_forward(self.CHUNK_DAYS)
+            return self._fwd_days[number]
+        while -number > len(self._back_days):
+            self._extend_backward(self.CHUNK_DAYS)
+        return self._back_days[-number - 1]
+
+
 class CalendarService:
     """
     Calendar service for working day calculations.
@@ -37,6 +107,8 @@ class CalendarService:
                 else:
                     self.holidays.add(date_str)
 
+        self._index: Optional[WorkingDayIndex] = None
+
     @classmethod
     def from_calendar_config(cls, calendar_config: Dict[str, Any]) -> 'CalendarService':
         """Create a CalendarService from a calendar configuration dict"""
@@ -70,6 +142,31 @@ class CalendarService:
         # isoweekday(): Monday=1, Sunday=7
         return date.isoweekday() in self.work_week
 
+    @property
+    def has_working_days(self) -> bool:
+        """False for a calendar with no working weekdays (only overrides, if any)"""
+        return bool(self.work_week & {1, 2, 3, 4, 5, 6, 7})
+
+    @property
+    def index(self) -> WorkingDayIndex:
+        """Working-day index for this calendar, built on first use"""
+        if self._index is None:
+            self._index = WorkingDayIndex(self._is_working_ordinal, datetime.now().toordinal())
+        return self._index
+
+    def _is_working_ordinal(self, ordinal: int) -> bool:
+        day = date.fromordinal(ordinal)
+        date_str = day.isoformat()
+        if date_str in self.holidays:
+            return False
+        if date_str in self.extra_workdays:
+            return True
+        return day.isoweekday() in self.work_week
+
+    def _shift(self, value: datetime, ordinal: int) -> datetime:
+        """Move a datetime to another date, keeping its time of day"""
+        return value + timedelta(days=ordinal - value.toordinal())
+
     def get_next_working_day(self, date: datetime) -> datetime:
         """
         Get the next working day from a given date.
@@ -81,16 +178,10 @@ class CalendarService:
         Returns:
             The next working day
         """
-        current = date
-        max_iterations = 365  # Safety limit
-
-        for _ in range(max_iterations):
-            if self.is_working_day(current):
-                return current
-            current += timedelta(days=1)
-
-        # Fallback (should never reach here)
-        return date
+        if not self.has_working_days:
+            return date
+        index = self.index
+        return self._shift(date, index.ordinal(index.number(date.toordinal())))
 
     def get_previous_working_day(self, date: datetime) -> datetime:
         """
@@ -103,16 +194,10 @@ class CalendarService:
         Returns:
             The previous working day
         """
-        current = date
-        max_iterations = 365  # Safety limit
-
-        for _ in range(max_iterations):
-            if self.is_working_day(current):
-                return current
-            current -= timedelta(days=1)
-
-        # Fallback (should never reach here)
-        return date
+        if not self.has_working_days:
+            return date
+        index = self.index
+        return self._shift(date, index.ordinal(index.number(date.toordinal() + 1) - 1))
 
     def add_working_days(self, start_date: datetime, working_days: float) -> datetime:
         """
@@ -129,38 +214,25 @@ class CalendarService:
         if working_days == 0:
             return start_date
 
-        # Ensure we start on a working day
-        current = self.get_next_working_day(start_date)
-
         # Handle negative working days
         if working_days < 0:
             return self.subtract_working_days(start_date, abs(working_days))
 
+        if not self.has_working_days:
+            return start_date
+
         # Separate whole days and fractional part
         whole_days = int(working_days)
         fraction = working_days - whole_days
 
-        # Add whole working days
-        days_added = 0
-        max_iterations = whole_days * 3 + 365  # Safety limit
-
-        for _ in range(max_iterations):
-            if days_added >= whole_days:
-                break
-            current += timedelta(days=1)
-            if self.is_working_day(current):
-                days_added += 1
-
-        # Handle fractional day
-        # For scheduling purposes, we round to the next working day if fraction > 0
-        # This keeps task end dates on working days
+        # Start on a working day, then step whole working days forward.
+        # For scheduling purposes, a fractional part rounds up to the next
+        # working day, which keeps task end dates on working days.
+        index = self.index
+        number = index.number(start_date.toordinal()) + whole_days
         if fraction > 0:
-            # Move to next working day for the fractional part
-            current += timedelta(days=1)
-            while not self.is_working_day(current):
-                current += timedelta(days=1)
-
-        return current
+            number += 1
+        return self._shift(start_date, index.ordinal(number))
 
     def subtract_working_days(self, start_date: datetime, working_days: float) -> datetime:
         """
@@ -173,23 +245,13 @@ class CalendarService:
         Returns:
             The resulting date after subtracting working days
         """
-        if working_days == 0:
+        if working_days == 0 or not self.has_working_days:
             return start_date
 
-        current = self.get_previous_working_day(start_date)
-        whole_days = int(working_days)
-
-        days_subtracted = 0
-        max_iterations = whole_days * 3 + 365
-
-        for _ in range(max_iterations):
-            if days_subtracted >= whole_days:
-                break
-            current -= timedelta(days=1)
-            if self.is_working_day(current):
-                days_subtracted += 1
-
-        return current
+        # Start on the previous working day, then step whole working days back
+        index = self.index
+        number = index.number(start_date.toordinal() + 1) - 1 - int(working_days)
+        return self._shift(start_date, index.ordinal(number))
 
     def get_working_days_between(self, start_date: datetime, end_date: datetime) -> float:
         """
@@ -205,18 +267,12 @@ class CalendarService:
         if end_date <= start_date:
             return 0.0
 
-        count = 0
-        current = start_date
-        max_iterations = (end_date - start_date).days + 1
-
-        for _ in range(max_iterations):
-            if current >= end_date:
-                break
-            if self.is_working_day(current):
-                count += 1
-            current += timedelta(days=1)
-
-        return float(count)
+        # Days start_date + k (k >= 0) that fall before end_date
+        span = end_date - start_date
+        days = span.days + (1 if span.seconds or span.microseconds else 0)
+        first = start_date.toordinal()
+        index = self.index
+        return float(index.number(first + days) - index.number(first))
 
     def get_calendar_days_for_working_days(self, working_days: float, start_date: datetime = None) -> int:
         """
@@ -299,3 +355,49 @@ def create_default_calendar() -> CalendarService:
         hours_per_day=8,
         exceptions=[]
     )
+
+
+class CalendarCache:
+    """
+    Compiled calendars per project.
+
+    A CalendarService (and the working-day index it builds) is created once per
+    project and reused by every reschedule until the calendar is edited.
+    """
+
+    def __init__(self):
+        self._calendars: Dict[str, CalendarService] = {}
+        self._loader: Optional[Callable[[str], Dict[str, Any]]] = None
+
+    def set_loader(self, loader: Callable[[str], Dict[str, Any]]) -> None:
+        """Set the function that loads a project's calendar configuration"""
+        self._loader = loader
+
+    def get(self, project_id: Optional[str]) -> Optional[CalendarService]:
+        """Get the compiled calendar for a project (None if it cannot be loaded)"""
+        if not project_id or self._loader is None:
+            return None
+        calendar = self._calendars.get(project_id)
+        if calendar is None:
+            try:
+                calendar = CalendarService.from_calendar_config(self._loader(project_id))
+            except Exception as e:
+                print(f"[Calendar] Failed to load calendar for project {project_id}: {e}")
+                return None
+            self._calendars[project_id] = calendar
+        return calendar
+
+    def is_loaded(self, project_id: Optional[str]) -> bool:
+        """Whether get() would answer from the cache, without calling the loader"""
+        return project_id in self._calendars
+
+    def invalidate(self, project_id: Optional[str] = None) -> None:
+        """Drop a project's compiled calendar (or all of them) after an edit"""
+        if project_id is None:
+            self._calendars.clear()
+        else:
+            self._calendars.pop(project_id, None)
+
+
+# Singleton instance
+calendar_cache = CalendarCache()
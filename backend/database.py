@@ -2,19 +2,63 @@
 SQLite database service for Sturgis Project
 Handles multi-project persistence with proper isolation
 """
+import asyncio
 import sqlite3
 import json
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import List, Optional, Dict, Any
+from typing import Iterable, List, Optional, Dict, Any
 from datetime import datetime
 import uuid
 from contextlib import contextmanager
 
+from wbs_index import outline_key, subtree_key_range
+
 
 # Get data directory from environment variable (for persistent storage in Azure)
 DATA_DIR = os.getenv("DATA_PATH", "project_data")
 
+# Applied once to every pooled connection. WAL lets readers run while a
+# writer commits (also across gunicorn worker processes); NORMAL sync is
+# durable in WAL mode except for the last commits on power loss.
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",
+    "PRAGMA cache_size = -20000",       # KiB (about 20 MB of page cache)
+    "PRAGMA mmap_size = 268435456",     # 256 MB memory-mapped reads
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA foreign_keys = ON",
+)
+STATEMENT_CACHE_SIZE = 256  # Prepared statements kept per connection
+BUSY_TIMEOUT_SECONDS = 30
+
+# Threads that run database work for async handlers. SQLite takes one writer
+# at a time, so a few threads cover concurrent reads without queueing more
+# writers on the busy lock.
+DB_THREADS = int(os.getenv("DB_THREADS", "4"))
+
+# Secondary indexes over task data, which bulk_create_tasks can drop during a large import
+TASK_INDEXES = (
+    ("idx_tasks_project", "tasks(project_id)"),
+    ("idx_tasks_outline", "tasks(project_id, outline_number)"),
+    ("idx_tasks_outline_key", "tasks(project_id, outline_key)"),
+    ("idx_predecessors_task", "predecessors(task_id)"),
+    ("idx_predecessors_project", "predecessors(project_id)"),
+    ("idx_task_baselines_task", "task_baselines(task_id)"),
+    ("idx_task_baselines_project", "task_baselines(project_id)"),
+)
+
+# Column order of _task_row
+TASK_COLUMNS = (
+    "id", "project_id", "uid", "name", "outline_number", "outline_level",
+    "duration", "value", "milestone", "summary", "percent_complete",
+    "start_date", "finish_date", "actual_start", "actual_finish", "actual_duration", "create_date",
+    "constraint_type", "constraint_date", "outline_key",
+)
+
 
 class DatabaseService:
     """SQLite database service for project management"""
@@ -25,21 +69,74 @@ class DatabaseService:
             db_path = os.path.join(DATA_DIR, "projects.db")
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._local = threading.local()  # One pooled connection per thread
+        # project id -> {task id: (task row, link rows)} as last loaded or saved,
+        # so a save can write only what changed since. Recorded only once the
+        # transaction that read or wrote it commits; any other task write
+        # forgets it (and bumps the generation, so a save in flight on another
+        # thread does not record a state that write has overtaken).
+        self._saved_state: Dict[str, Dict[str, tuple]] = {}
+        self._saved_state_lock = threading.Lock()
+        self._saved_state_generation = 0
         self.init_database()
     
     @contextmanager
     def get_connection(self):
-        """Context manager for database connections"""
-        conn = sqlite3.connect(str(self.db_path))
-        conn.row_factory = sqlite3.Row  # Enable column access by name
+        """
+        Context manager for database connections
+
+        Each thread reuses one connection, opened on first use. A nested use
+        joins the outer transaction: only the outermost block commits or
+        rolls back.
+        """
+        conn = self._thread_connection()
+        outermost = self._local.depth == 0
+        self._local.depth += 1
         try:
             yield conn
-            conn.commit()
+            if outermost:
+                conn.commit()
         except Exception as e:
-            conn.rollback()
+            if outermost:
+                conn.rollback()
+                self._local.after_commit = []
             raise e
         finally:
+            self._local.depth -= 1
+        if outermost:
+            callbacks, self._local.after_commit = self._local.after_commit, []
+            for callback in callbacks:
+                callback()
+
+    def _after_commit(self, callback) -> None:
+        """Run callback when this thread's transaction commits (right away outside one); dropped on rollback"""
+        if getattr(self._local, "depth", 0) > 0:
+            self._local.after_commit.append(callback)
+        else:
+            callback()
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        """This thread's connection (a new one after a fork: connections must not cross processes)"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
+            return conn
+        conn = sqlite3.connect(str(self.db_path), timeout=BUSY_TIMEOUT_SECONDS,
+                               cached_statements=STATEMENT_CACHE_SIZE)
+        conn.row_factory = sqlite3.Row  # Enable column access by name
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        self._local.conn = conn
+        self._local.pid = os.getpid()
+        self._local.depth = 0
+        self._local.after_commit = []
+        return conn
+
+    def close(self) -> None:
+        """Close this thread's pooled connection"""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
             conn.close()
+        self._local.conn = None
     
     def init_database(self):
         """Initialize database schema"""
@@ -85,6 +182,7 @@ class DatabaseService:
                     create_date TEXT,
                     constraint_type INTEGER DEFAULT 0,
                     constraint_date TEXT,
+                    outline_key TEXT,
                     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
                 )
             """)
@@ -99,6 +197,15 @@ class DatabaseService:
             except sqlite3.OperationalError:
                 pass  # Column already exists
 
+            # Add the WBS sort key column and fill it for existing tasks (migration)
+            try:
+                cursor.execute("ALTER TABLE tasks ADD COLUMN outline_key TEXT")
+            except sqlite3.OperationalError:
+                pass  # Column already exists
+            cursor.execute("SELECT id, outline_number FROM tasks WHERE outline_key IS NULL")
+            cursor.executemany("UPDATE tasks SET outline_key = ? WHERE id = ?",
+                               [(outline_key(row[1]), row[0]) for row in cursor.fetchall()])
+
             # Add user_id and is_shared columns to projects table (migration)
             try:
                 cursor.execute("ALTER TABLE projects ADD COLUMN user_id TEXT")
@@ -119,10 +226,17 @@ class DatabaseService:
                     type INTEGER DEFAULT 1,
                     lag INTEGER DEFAULT 0,
                     lag_format INTEGER DEFAULT 7,
+                    predecessor_id TEXT,
                     FOREIGN KEY (task_id) REFERENCES tasks(id) ON DELETE CASCADE,
                     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
                 )
             """)
+
+            # Add predecessor task id to existing links (migration)
+            try:
+                cursor.execute("ALTER TABLE predecessors ADD COLUMN predecessor_id TEXT")
+            except sqlite3.OperationalError:
+                pass  # Column already exists
             
             # Project calendar table
             cursor.execute("""
@@ -203,13 +317,9 @@ class DatabaseService:
             """)
 
             # Create indexes for better performance
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_project ON tasks(project_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_outline ON tasks(project_id, outline_number)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_predecessors_task ON predecessors(task_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_predecessors_project ON predecessors(project_id)")
+            for name, target in TASK_INDEXES:
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_calendar_exceptions_project ON calendar_exceptions(project_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_task_baselines_task ON task_baselines(task_id)")
-            cursor.execute("CREATE INDEX IF NOT EXISTS idx_task_baselines_project ON task_baselines(project_id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_projects_user ON projects(user_id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_projects_shared ON projects(is_shared)")
@@ -351,33 +461,37 @@ class DatabaseService:
                 LIMIT ?
             """, (limit,))
 
-            projects = []
-            for row in cursor.fetchall():
-                project = dict(row)
-
-                # Get tasks for this project
-                cursor.execute("""
-                    SELECT name, outline_number, outline_level, duration,
-                           milestone, summary, percent_complete
-                    FROM tasks
-                    WHERE project_id = ?
-                    ORDER BY outline_number
-                """, (project['id'],))
-
-                project['tasks'] = [dict(task) for task in cursor.fetchall()]
-
-                # Get predecessor patterns
-                cursor.execute("""
-                    SELECT t.name, t.outline_number, p.outline_number as pred_outline,
-                           p.type, p.lag, p.lag_format
-                    FROM tasks t
-                    JOIN predecessors p ON t.id = p.task_id
-                    WHERE t.project_id = ?
-                """, (project['id'],))
-
-                project['dependencies'] = [dict(dep) for dep in cursor.fetchall()]
-
-                projects.append(project)
+            projects = [dict(row) for row in cursor.fetchall()]
+            if not projects:
+                return projects
+            by_id = {project['id']: project for project in projects}
+            for project in projects:
+                project['tasks'] = []
+                project['dependencies'] = []
+            placeholders = ", ".join("?" * len(projects))
+
+            # Tasks and predecessor patterns of all these projects, one query each
+            cursor.execute(f"""
+                SELECT project_id, name, outline_number, outline_level, duration,
+                       milestone, summary, percent_complete
+                FROM tasks
+                WHERE project_id IN ({placeholders})
+                ORDER BY outline_key
+            """, tuple(by_id))
+            for row in cursor:
+                task = dict(row)
+                by_id[task.pop('project_id')]['tasks'].append(task)
+
+            cursor.execute(f"""
+                SELECT t.project_id, t.name, t.outline_number, p.outline_number as pred_outline,
+                       p.type, p.lag, p.lag_format
+                FROM tasks t
+                JOIN predecessors p ON t.id = p.task_id
+                WHERE t.project_id IN ({placeholders})
+            """, tuple(by_id))
+            for row in cursor:
+                dep = dict(row)
+                by_id[dep.pop('project_id')]['dependencies'].append(dep)
 
             return projects
 
@@ -469,6 +583,7 @@ class DatabaseService:
 
     def delete_project(self, project_id: str) -> bool:
         """Delete a project and all its tasks"""
+        self._forget_saved_state(project_id)
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM projects WHERE id = ?", (project_id,))
@@ -499,6 +614,7 @@ class DatabaseService:
 
     def create_task(self, project_id: str, task_data: Dict[str, Any]) -> str:
         """Create a new task"""
+        self._forget_saved_state()  # Written outside save_task_changes
         task_id = task_data.get('id', str(uuid.uuid4()))
 
         with self.get_connection() as conn:
@@ -509,8 +625,8 @@ class DatabaseService:
                     id, project_id, uid, name, outline_number, outline_level,
                     duration, value, milestone, summary, percent_complete,
                     start_date, finish_date, actual_start, actual_finish, actual_duration, create_date,
-                    constraint_type, constraint_date
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    constraint_type, constraint_date, outline_key
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 task_id, project_id, task_data.get('uid', task_id),
                 task_data['name'], task_data['outline_number'], task_data.get('outline_level', 1),
@@ -521,17 +637,19 @@ class DatabaseService:
                 task_data.get('start_date'), task_data.get('finish_date'),
                 task_data.get('actual_start'), task_data.get('actual_finish'),
                 task_data.get('actual_duration'), task_data.get('create_date'),
-                task_data.get('constraint_type', 0), task_data.get('constraint_date')
+                task_data.get('constraint_type', 0), task_data.get('constraint_date'),
+                outline_key(task_data['outline_number'])
             ))
 
             # Insert predecessors
             for pred in task_data.get('predecessors', []):
                 cursor.execute("""
-                    INSERT INTO predecessors (task_id, project_id, outline_number, type, lag, lag_format)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                    INSERT INTO predecessors (task_id, project_id, outline_number, type, lag, lag_format, predecessor_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
                 """, (
                     task_id, project_id, pred['outline_number'],
-                    pred.get('type', 1), pred.get('lag', 0), pred.get('lag_format', 7)
+                    pred.get('type', 1), pred.get('lag', 0), pred.get('lag_format', 7),
+                    pred.get('predecessor_id')
                 ))
 
             # Insert baselines
@@ -559,55 +677,40 @@ class DatabaseService:
 
         return task_id
 
-    def get_tasks(self, project_id: str) -> List[Dict[str, Any]]:
-        """Get all tasks for a project"""
+    def get_tasks(self, project_id: str, outline_number: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Get all tasks for a project in WBS order, or only the subtree under
+        outline_number (the task and its descendants)
+
+        Three queries however many tasks there are: tasks, predecessors and
+        baselines, the last two grouped onto their tasks by task_id.
+        """
+        generation = self._saved_state_generation
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
-            # Get all tasks
-            cursor.execute("""
-                SELECT * FROM tasks
-                WHERE project_id = ?
-                ORDER BY outline_number
-            """, (project_id,))
+            # Get all tasks, ordered (and range-scanned) by the indexed WBS sort key
+            if outline_number is None:
+                scope = "project_id = ?"
+                params = (project_id,)
+            else:
+                scope = "project_id = ? AND outline_key >= ? AND outline_key < ?"
+                params = (project_id, *subtree_key_range(outline_number))
+            cursor.execute(f"SELECT * FROM tasks WHERE {scope} ORDER BY outline_key", params)
 
             tasks = []
-            for row in cursor.fetchall():
-                task = dict(row)
-                # Convert boolean fields
-                task['milestone'] = bool(task['milestone'])
-                task['summary'] = bool(task['summary'])
-                # Ensure constraint fields have defaults
-                task['constraint_type'] = task.get('constraint_type', 0) or 0
-                task['constraint_date'] = task.get('constraint_date')
-
-                # Get predecessors for this task
-                cursor.execute("""
-                    SELECT outline_number, type, lag, lag_format
-                    FROM predecessors
-                    WHERE task_id = ?
-                """, (task['id'],))
-
-                task['predecessors'] = [dict(pred) for pred in cursor.fetchall()]
-
-                # Get baselines for this task
-                cursor.execute("""
-                    SELECT number, start, finish, duration, duration_format,
-                           work, cost, bcws, bcwp, fixed_cost, estimated_duration, interim
-                    FROM task_baselines
-                    WHERE task_id = ?
-                    ORDER BY number
-                """, (task['id'],))
-
-                task['baselines'] = []
-                for baseline_row in cursor.fetchall():
-                    baseline = dict(baseline_row)
-                    baseline['estimated_duration'] = bool(baseline['estimated_duration'])
-                    baseline['interim'] = bool(baseline['interim'])
-                    task['baselines'].append(baseline)
-
+            tasks_by_id = {}
+            for row in cursor:
+                task = self._task_from_row(row)
                 tasks.append(task)
+                tasks_by_id[task['id']] = task
 
+            if tasks:
+                task_scope = "project_id = ?" if outline_number is None else f"task_id IN (SELECT id FROM tasks WHERE {scope})"
+                self._attach_links_and_baselines(cursor, tasks_by_id, task_scope, params)
+
+            if outline_number is None:
+                self._remember_saved_state(project_id, self._task_state(project_id, tasks), generation)
             return tasks
 
     def get_task(self, task_id: str) -> Optional[Dict[str, Any]]:
@@ -618,42 +721,57 @@ class DatabaseService:
             row = cursor.fetchone()
 
             if row:
-                task = dict(row)
-                task['milestone'] = bool(task['milestone'])
-                task['summary'] = bool(task['summary'])
-                # Ensure constraint fields have defaults
-                task['constraint_type'] = task.get('constraint_type', 0) or 0
-                task['constraint_date'] = task.get('constraint_date')
-
-                # Get predecessors
-                cursor.execute("""
-                    SELECT outline_number, type, lag, lag_format
-                    FROM predecessors
-                    WHERE task_id = ?
-                """, (task_id,))
-
-                task['predecessors'] = [dict(pred) for pred in cursor.fetchall()]
-
-                # Get baselines
-                cursor.execute("""
-                    SELECT number, start, finish, duration, duration_format,
-                           work, cost, bcws, bcwp, fixed_cost, estimated_duration, interim
-                    FROM task_baselines
-                    WHERE task_id = ?
-                    ORDER BY number
-                """, (task_id,))
-
-                task['baselines'] = []
-                for baseline_row in cursor.fetchall():
-                    baseline = dict(baseline_row)
-                    baseline['estimated_duration'] = bool(baseline['estimated_duration'])
-                    baseline['interim'] = bool(baseline['interim'])
-                    task['baselines'].append(baseline)
-
+                task = self._task_from_row(row)
+                self._attach_links_and_baselines(cursor, {task_id: task}, "task_id = ?", (task_id,))
                 return task
 
         return None
 
+    @staticmethod
+    def _task_from_row(row: sqlite3.Row) -> Dict[str, Any]:
+        task = dict(row)
+        task.pop('outline_key', None)
+        # Convert boolean fields
+        task['milestone'] = bool(task['milestone'])
+        task['summary'] = bool(task['summary'])
+        # Ensure constraint fields have defaults
+        task['constraint_type'] = task.get('constraint_type', 0) or 0
+        task['constraint_date'] = task.get('constraint_date')
+        task['predecessors'] = []
+        task['baselines'] = []
+        return task
+
+    @staticmethod
+    def _attach_links_and_baselines(cursor: sqlite3.Cursor, tasks_by_id: Dict[str, Dict[str, Any]],
+                                    scope: str, params: tuple) -> None:
+        """Load the predecessors and baselines of every task in scope in one query each, grouped by task_id"""
+        cursor.execute(f"""
+            SELECT task_id, outline_number, type, lag, lag_format, predecessor_id
+            FROM predecessors
+            WHERE {scope}
+            ORDER BY id
+        """, params)
+        for row in cursor:
+            pred = dict(row)
+            task = tasks_by_id.get(pred.pop('task_id'))
+            if task is not None:
+                task['predecessors'].append(pred)
+
+        cursor.execute(f"""
+            SELECT task_id, number, start, finish, duration, duration_format,
+                   work, cost, bcws, bcwp, fixed_cost, estimated_duration, interim
+            FROM task_baselines
+            WHERE {scope}
+            ORDER BY number
+        """, params)
+        for row in cursor:
+            baseline = dict(row)
+            task = tasks_by_id.get(baseline.pop('task_id'))
+            if task is not None:
+                baseline['estimated_duration'] = bool(baseline['estimated_duration'])
+                baseline['interim'] = bool(baseline['interim'])
+                task['baselines'].append(baseline)
+
     def get_task_ids(self, project_id: str) -> List[str]:
         """Get all task IDs for a project"""
         with self.get_connection() as conn:
@@ -663,6 +781,7 @@ class DatabaseService:
 
     def update_task(self, task_id: str, task_data: Dict[str, Any]) -> bool:
         """Update an existing task"""
+        self._forget_saved_state()  # Written outside save_task_changes
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
@@ -690,6 +809,11 @@ class DatabaseService:
                     update_fields.append(f"{field} = ?")
                     values.append(1 if task_data[field] else 0)
 
+            # Keep the sort key in step with the outline number
+            if 'outline_number' in task_data:
+                update_fields.append("outline_key = ?")
+                values.append(outline_key(task_data['outline_number']))
+
             if update_fields:
                 values.append(task_id)
                 cursor.execute(f"""
@@ -706,11 +830,12 @@ class DatabaseService:
                 # Insert new predecessors
                 for pred in task_data['predecessors']:
                     cursor.execute("""
-                        INSERT INTO predecessors (task_id, project_id, outline_number, type, lag, lag_format)
-                        VALUES (?, ?, ?, ?, ?, ?)
+                        INSERT INTO predecessors (task_id, project_id, outline_number, type, lag, lag_format, predecessor_id)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
                     """, (
                         task_id, project_id, pred['outline_number'],
-                        pred.get('type', 1), pred.get('lag', 0), pred.get('lag_format', 7)
+                        pred.get('type', 1), pred.get('lag', 0), pred.get('lag_format', 7),
+                        pred.get('predecessor_id')
                     ))
 
             # Update project timestamp
@@ -721,6 +846,7 @@ class DatabaseService:
 
     def delete_task(self, task_id: str) -> bool:
         """Delete a task"""
+        self._forget_saved_state()  # Written outside save_task_changes
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
@@ -743,6 +869,7 @@ class DatabaseService:
 
     def delete_all_tasks(self, project_id: str) -> int:
         """Delete all tasks for a project"""
+        self._forget_saved_state()  # Written outside save_task_changes
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
@@ -756,71 +883,222 @@ class DatabaseService:
 
             return deleted_count
 
-    def bulk_create_tasks(self, project_id: str, tasks: List[Dict[str, Any]]) -> int:
-        """Bulk create tasks for a project (used during XML import)"""
-        count = 0
+    def bulk_create_tasks(self, project_id: str, tasks: List[Dict[str, Any]], defer_indexes: bool = False) -> int:
+        """
+        Bulk create tasks for a project (used during XML import)
+
+        Task, predecessor and baseline rows are built first and inserted with
+        one executemany each, in one transaction.
+
+        Args:
+            defer_indexes: Drop the secondary task indexes for the load and
+                           rebuild them afterwards. Pays off for very large
+                           imports into a database that holds little else,
+                           since the rebuild covers every project's rows.
+        """
+        self._forget_saved_state()  # Written outside save_task_changes
+        if not tasks:
+            return 0
+        now = datetime.now().isoformat()
+        task_rows, link_rows, baseline_rows = [], [], []
+        for task_data in tasks:
+            if not task_data.get('id'):
+                task_data = {**task_data, 'id': str(uuid.uuid4())}
+            task_rows.append(self._task_row(project_id, task_data))
+            link_rows.extend(self._link_rows(project_id, task_data))
+            baseline_rows.extend(
+                self._baseline_row(project_id, task_data['id'], baseline, now)
+                for baseline in task_data.get('baselines') or []
+            )
+
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            if defer_indexes:
+                for name, _ in TASK_INDEXES:
+                    cursor.execute(f"DROP INDEX IF EXISTS {name}")
+
+            cursor.executemany(
+                f"INSERT INTO tasks ({', '.join(TASK_COLUMNS)}) VALUES ({', '.join('?' * len(TASK_COLUMNS))})",
+                task_rows
+            )
+            cursor.executemany("""
+                INSERT INTO predecessors (task_id, project_id, outline_number, type, lag, lag_format, predecessor_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, link_rows)
+            cursor.executemany("""
+                INSERT INTO task_baselines (
+                    task_id, project_id, number, start, finish, duration, duration_format,
+                    work, cost, bcws, bcwp, fixed_cost, estimated_duration, interim, created_at
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, baseline_rows)
+
+            if defer_indexes:
+                for name, target in TASK_INDEXES:
+                    cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
 
-            for task_data in tasks:
-                task_id = task_data.get('id', str(uuid.uuid4()))
-
-                cursor.execute("""
-                    INSERT INTO tasks (
-                        id, project_id, uid, name, outline_number, outline_level,
-                        duration, value, milestone, summary, percent_complete,
-                        start_date, finish_date, actual_start, actual_finish, actual_duration, create_date,
-                        constraint_type, constraint_date
-                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    task_id, project_id, task_data.get('uid', task_id),
-                    task_data['name'], task_data['outline_number'], task_data.get('outline_level', 1),
-                    task_data.get('duration'), task_data.get('value', ''),
-                    1 if task_data.get('milestone', False) else 0,
-                    1 if task_data.get('summary', False) else 0,
-                    task_data.get('percent_complete', 0),
-                    task_data.get('start_date'), task_data.get('finish_date'),
-                    task_data.get('actual_start'), task_data.get('actual_finish'),
-                    task_data.get('actual_duration'), task_data.get('create_date'),
-                    task_data.get('constraint_type', 0), task_data.get('constraint_date')
-                ))
+            # Update project timestamp
+            cursor.execute("UPDATE projects SET updated_at = ? WHERE id = ?", (now, project_id))
 
-                # Insert predecessors
-                for pred in task_data.get('predecessors', []):
-                    cursor.execute("""
-                        INSERT INTO predecessors (task_id, project_id, outline_number, type, lag, lag_format)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """, (
-                        task_id, project_id, pred['outline_number'],
-                        pred.get('type', 1), pred.get('lag', 0), pred.get('lag_format', 7)
-                    ))
+        return len(task_rows)
+
+    @staticmethod
+    def _task_row(project_id: str, task_data: Dict[str, Any]) -> tuple:
+        """Values of a task for TASK_COLUMNS"""
+        task_id = task_data['id']
+        return (
+            task_id, project_id, task_data.get('uid', task_id),
+            task_data['name'], task_data['outline_number'], task_data.get('outline_level', 1),
+            task_data.get('duration'), task_data.get('value', ''),
+            1 if task_data.get('milestone', False) else 0,
+            1 if task_data.get('summary', False) else 0,
+            task_data.get('percent_complete', 0),
+            task_data.get('start_date'), task_data.get('finish_date'),
+            task_data.get('actual_start'), task_data.get('actual_finish'),
+            task_data.get('actual_duration'), task_data.get('create_date'),
+            task_data.get('constraint_type', 0), task_data.get('constraint_date'),
+            outline_key(task_data['outline_number'])
+        )
+
+    @staticmethod
+    def _link_rows(project_id: str, task_data: Dict[str, Any]) -> List[tuple]:
+        """Rows of a task's predecessors table entries"""
+        return [
+            (task_data['id'], project_id, pred['outline_number'],
+             pred.get('type', 1), pred.get('lag', 0), pred.get('lag_format', 7), pred.get('predecessor_id'))
+            for pred in task_data.get('predecessors') or []
+        ]
+
+    def _task_state(self, project_id: str, tasks: List[Dict[str, Any]]) -> Dict[str, tuple]:
+        return {task['id']: (self._task_row(project_id, task), self._link_rows(project_id, task)) for task in tasks}
+
+    def _remember_saved_state(self, project_id: str, state: Dict[str, tuple], generation: int) -> None:
+        """Record a project's stored state once the current transaction commits, unless a write overtook it"""
+        def remember():
+            with self._saved_state_lock:
+                if self._saved_state_generation == generation:
+                    self._saved_state[project_id] = state
+        self._after_commit(remember)
+
+    def _forget_saved_state(self, project_id: Optional[str] = None) -> None:
+        """Drop the recorded state of one project (all with None); the next save reloads it"""
+        with self._saved_state_lock:
+            self._saved_state_generation += 1
+            if project_id is None:
+                self._saved_state.clear()
+            else:
+                self._saved_state.pop(project_id, None)
 
-                # Insert baselines
-                now = datetime.now().isoformat()
-                for baseline in task_data.get('baselines', []):
-                    cursor.execute("""
-                        INSERT INTO task_baselines (
-                            task_id, project_id, number, start, finish, duration, duration_format,
-                            work, cost, bcws, bcwp, fixed_cost, estimated_duration, interim, created_at
-                        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (
-                        task_id, project_id, baseline.get('number', 0),
-                        baseline.get('start'), baseline.get('finish'),
-                        baseline.get('duration'), baseline.get('duration_format', 7),
-                        baseline.get('work'), baseline.get('cost'),
-                        baseline.get('bcws'), baseline.get('bcwp'), baseline.get('fixed_cost'),
-                        1 if baseline.get('estimated_duration') else 0,
-                        1 if baseline.get('interim') else 0,
-                        now
-                    ))
+    def task_changes(self, project_id: str, tasks: List[Dict[str, Any]],
+                     dirty_ids: Iterable[str] = (), dirty_link_ids: Iterable[str] = ()) -> Dict[str, Any]:
+        """
+        What saving tasks would change compared to the database: tasks to
+        insert, tasks whose row differs, tasks whose predecessor set differs,
+        and ids to delete. Compared against the state recorded when the
+        project was last loaded or saved (reloaded if another write cleared it).
+
+        Tasks in dirty_ids (dirty_link_ids) count as changed (relinked) even
+        if they match that state: the caller edited them, and another
+        process may have saved different values since.
+        """
+        with self._saved_state_lock:
+            saved = self._saved_state.get(project_id)
+        if saved is None:
+            saved = self._task_state(project_id, self.get_tasks(project_id))
+        dirty_ids, dirty_link_ids = set(dirty_ids), set(dirty_link_ids)
+
+        created, updated, relinked = [], [], []
+        for task in tasks:
+            before = saved.get(task['id'])
+            if before is None:
+                created.append(task)
+                continue
+            if task['id'] in dirty_ids or self._task_row(project_id, task) != before[0]:
+                updated.append(task)
+            if task['id'] in dirty_link_ids or self._link_rows(project_id, task) != before[1]:
+                relinked.append(task)
+        current_ids = {task['id'] for task in tasks}
+        deleted = [task_id for task_id in saved if task_id not in current_ids]
+        return {"created": created, "updated": updated, "relinked": relinked, "deleted": deleted}
+
+    def save_task_changes(self, project_id: str, tasks: List[Dict[str, Any]], touch_project: bool = True,
+                          dirty_ids: Iterable[str] = (), dirty_link_ids: Iterable[str] = ()) -> Dict[str, int]:
+        """
+        Make the project's stored tasks match tasks, writing only the rows
+        that changed (see task_changes), with executemany in one transaction.
+        The saved state is recorded when the outermost transaction commits.
 
-                count += 1
+        Args:
+            touch_project: Update the project's timestamp (callers that
+                           update the project row themselves pass False)
+            dirty_ids: Tasks edited since the last load or save, written
+                       even if they match the recorded state
+            dirty_link_ids: Tasks whose predecessors were edited likewise
 
-            # Update project timestamp
-            cursor.execute("UPDATE projects SET updated_at = ? WHERE id = ?",
-                         (datetime.now().isoformat(), project_id))
+        Returns:
+            Counts of created, updated, relinked and deleted tasks
+        """
+        for task in tasks:
+            if not task.get('id'):
+                task['id'] = str(uuid.uuid4())
+        generation = self._saved_state_generation
+        changes = self.task_changes(project_id, tasks, dirty_ids, dirty_link_ids)
+        created, updated, relinked, deleted = (changes[k] for k in ("created", "updated", "relinked", "deleted"))
 
-        return count
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if deleted:
+                # Predecessors and baselines go with them (ON DELETE CASCADE)
+                cursor.executemany("DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id in deleted])
+            if created:
+                cursor.executemany(
+                    f"INSERT INTO tasks ({', '.join(TASK_COLUMNS)}) VALUES ({', '.join('?' * len(TASK_COLUMNS))})",
+                    [self._task_row(project_id, task) for task in created]
+                )
+            if updated:
+                columns = TASK_COLUMNS[2:]  # Everything but id and project_id
+                cursor.executemany(
+                    f"UPDATE tasks SET {', '.join(f'{column} = ?' for column in columns)} WHERE id = ?",
+                    [self._task_row(project_id, task)[2:] + (task['id'],) for task in updated]
+                )
+            if relinked:
+                cursor.executemany("DELETE FROM predecessors WHERE task_id = ?", [(task['id'],) for task in relinked])
+            link_rows = [row for task in created + relinked for row in self._link_rows(project_id, task)]
+            if link_rows:
+                cursor.executemany("""
+                    INSERT INTO predecessors (task_id, project_id, outline_number, type, lag, lag_format, predecessor_id)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, link_rows)
+            now = datetime.now().isoformat()
+            baseline_rows = [
+                self._baseline_row(project_id, task['id'], baseline, now)
+                for task in created for baseline in task.get('baselines') or []
+            ]
+            if baseline_rows:
+                cursor.executemany("""
+                    INSERT INTO task_baselines (
+                        task_id, project_id, number, start, finish, duration, duration_format,
+                        work, cost, bcws, bcwp, fixed_cost, estimated_duration, interim, created_at
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, baseline_rows)
+            if touch_project and (created or updated or relinked or deleted):
+                cursor.execute("UPDATE projects SET updated_at = ? WHERE id = ?",
+                               (datetime.now().isoformat(), project_id))
+            self._remember_saved_state(project_id, self._task_state(project_id, tasks), generation)
+
+        return {key: len(value) for key, value in changes.items()}
+
+    @staticmethod
+    def _baseline_row(project_id: str, task_id: str, baseline: Dict[str, Any], created_at: str) -> tuple:
+        return (
+            task_id, project_id, baseline.get('number', 0),
+            baseline.get('start'), baseline.get('finish'),
+            baseline.get('duration'), baseline.get('duration_format', 7),
+            baseline.get('work'), baseline.get('cost'),
+            baseline.get('bcws'), baseline.get('bcwp'), baseline.get('fixed_cost'),
+            1 if baseline.get('estimated_duration') else 0,
+            1 if baseline.get('interim') else 0,
+            created_at
+        )
 
     # ============================================================================
     # CALENDAR MANAGEMENT
@@ -1119,3 +1397,47 @@ class DatabaseService:
             cursor = conn.cursor()
             cursor.execute("SELECT 1 FROM users WHERE email = ?", (email.lower(),))
             return cursor.fetchone() is not None
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def database_executor() -> ThreadPoolExecutor:
+    """The bounded thread pool shared by every AsyncDatabaseService"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="sqlite")
+    return _executor
+
+
+class AsyncDatabaseService:
+    """
+    Awaitable front for a DatabaseService, for use from async handlers.
+
+    Every service method is available as a coroutine that runs the call on
+    the database thread pool, so SQLite work never blocks the event loop:
+    ``await adb.get_tasks(project_id)``. run() does the same for any function,
+    e.g. several calls that must share one transaction. Each pool thread
+    keeps its own pooled connection.
+    """
+
+    def __init__(self, service: DatabaseService, executor: Optional[ThreadPoolExecutor] = None):
+        self.service = service
+        self._executor = executor
+
+    async def run(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) on a database thread and return its result"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor or database_executor(), partial(func, *args, **kwargs))
+
+    def __getattr__(self, name: str):
+        method = getattr(self.service, name)
+        if not callable(method):
+            return method
+
+        async def call(*args, **kwargs):
+            return await self.run(method, *args, **kwargs)
+
+        call.__name__ = name
+        call.__doc__ = method.__doc__
+        return call
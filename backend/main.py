@@ -5,12 +5,16 @@ load_dotenv()
 from fastapi import FastAPI, UploadFile, File, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import Response
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from typing import List, Optional, Dict, Any
 import xml.etree.ElementTree as ET
-from datetime import datetime
+from datetime import date, datetime
+from functools import partial
+import asyncio
+import math
 import os
 import json
+import uuid
 from pathlib import Path
 
 from models import (
@@ -18,6 +22,8 @@ from models import (
     Task,
     TaskCreate,
     TaskUpdate,
+    TaskBatchRequest,
+    CloneSubtreeRequest,
     Predecessor,
     ValidationResult,
     ProjectMetadata,
@@ -27,8 +33,11 @@ from models import (
     ChatRequest,
     GenerateProjectRequest,
     OptimizeDurationRequest,
+    DurationCostCurveRequest,
+    ScheduleRiskRequest,
     OptimizationResult,
     ApplyOptimizationRequest,
+    ScenarioCreateRequest,
     ProjectCalendar,
     CalendarException,
     CalendarExceptionCreate,
@@ -52,7 +61,16 @@ from ai_service import ai_service
 from ai_command_handler import ai_command_handler
 from ai_project_editor import ai_project_editor, project_template_learner
 from ai_llm_parser import llm_parser  # LLM-based command parser (Claude)
-from database import DatabaseService, DATA_DIR
+from database import AsyncDatabaseService, DatabaseService, DATA_DIR
+from calendar_service import calendar_cache
+from schedule_cache import schedule_cache
+from schedule_risk import schedule_risk_simulator
+from scenarios import scenario_store
+from task_links import link_target, refresh_link_outlines, relink_by_outline, resolve_link_ids
+from wbs_index import WBSIndex
+from task_filter import TaskFilter
+from timeline import bucket_counts, project_span, timeline_arrays, timeline_window
+from scheduling_engine import ScheduleNetwork, scheduling_engine
 from auth import router as auth_router, get_current_user, decode_token
 from azure_storage import init_azure_storage, shutdown_azure_storage, get_azure_storage
 from contextlib import asynccontextmanager
@@ -163,18 +181,74 @@ async def trigger_restore():
         raise HTTPException(status_code=404, detail="No backup found in Azure Blob Storage")
 
 
-# Initialize database service
+# Initialize database service; async handlers await adb, which runs the
+# SQLite work on the database thread pool instead of the event loop
 db = DatabaseService()
+adb = AsyncDatabaseService(db)
 
 # In-memory cache for the current project state (for backward compatibility)
 current_project: Optional[Dict[str, Any]] = None
 current_project_id: Optional[str] = None
+# Tasks (and predecessor sets) edited since the project was loaded or last
+# saved; a save writes them even if they match what this process loaded
+dirty_task_ids: set = set()
+dirty_link_ids: set = set()
 xml_processor = MSProjectXMLProcessor()
 validator = ProjectValidator()
 
+# Schedule on the loaded project's calendar (compiled once, cached until edited)
+calendar_cache.set_loader(db.get_project_calendar)
+scheduling_engine.calendar_resolver = lambda: calendar_cache.get(current_project_id)
+
 
 from fastapi import Request
 
+# Write endpoints that never modify the loaded project
+READ_ONLY_WRITE_PATHS = {
+    "/api/validate",
+    "/api/ai/estimate-duration",
+    "/api/ai/detect-dependencies",
+    "/api/ai/categorize-task",
+    "/api/ai/optimize-duration",
+    "/api/ai/duration-cost-curve",
+    "/api/schedule/risk",
+}
+
+
+@app.middleware("http")
+async def bump_schedule_version(request: Request, call_next):
+    """
+    Bump the schedule version of the loaded project after any write request,
+    so results cached against the previous version are recomputed.
+    """
+    project_before = current_project_id
+    response = await call_next(request)
+    if (request.method in ("POST", "PUT", "PATCH", "DELETE")
+            and request.url.path.startswith("/api/")
+            and request.url.path not in READ_ONLY_WRITE_PATHS):
+        for project_id in {project_before, current_project_id}:
+            schedule_cache.bump(project_id)
+    return response
+
+
+@app.middleware("http")
+async def preload_project_calendar(request: Request, call_next):
+    """
+    Compile the loaded project's calendar on a database thread before the
+    request runs, so scheduling code resolving it on the event loop finds it
+    cached instead of reading the database there.
+    """
+    if request.url.path.startswith("/api/"):
+        await preload_calendar(current_project_id)
+    return await call_next(request)
+
+
+async def preload_calendar(project_id: Optional[str]) -> None:
+    """Load and compile a project's calendar on a database thread unless it is cached"""
+    if project_id and not calendar_cache.is_loaded(project_id):
+        await adb.run(calendar_cache.get, project_id)
+
+
 async def get_optional_user(request: Request) -> Optional[dict]:
     """Optional user dependency - returns user if authenticated, None otherwise.
 
@@ -194,12 +268,66 @@ async def get_optional_user(request: Request) -> Optional[dict]:
     if user_id is None:
         return None
 
-    user = db.get_user_by_id(user_id)
+    user = await adb.get_user_by_id(user_id)
     if user:
         user.pop("password_hash", None)
     return user
 
 
+def critical_path(tasks: List[Dict[str, Any]], project: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """CPM of tasks, constraint dates counted from the project's start on its calendar"""
+    return ai_service._calculate_critical_path(tasks, (project or current_project or {}).get("start_date"))
+
+
+def get_wbs_index(tasks: List[Dict[str, Any]]) -> WBSIndex:
+    """Hierarchy index of the loaded project's tasks, built at most once per schedule version"""
+    index = schedule_cache.get(current_project_id, "wbs_index")
+    if index is None or index.tasks is not tasks:
+        index = schedule_cache.put(current_project_id, "wbs_index", WBSIndex(tasks))
+    return index
+
+
+def get_schedule_network(tasks: List[Dict[str, Any]]) -> ScheduleNetwork:
+    """Link adjacency of the loaded project's tasks, built at most once per schedule version"""
+    network = schedule_cache.get(current_project_id, "schedule_network")
+    if network is None or network.tasks is not tasks:
+        hours_per_day = scheduling_engine._day_axis(current_project or {}, None).hours_per_day
+        network = schedule_cache.put(current_project_id, "schedule_network",
+                                     ScheduleNetwork(tasks, hierarchy=True, hours_per_day=hours_per_day))
+    return network
+
+
+def filtered_tasks(task_filter: TaskFilter, tasks: List[Dict], cache_id: Optional[str] = None) -> Dict:
+    """Tasks matching a filter; the critical path is computed (or reused from the cache) only if it needs one"""
+    schedule = None
+    if task_filter.needs_schedule:
+        if cache_id is not None:
+            schedule = schedule_cache.get_or_compute(
+                cache_id, "critical_path", lambda: critical_path(tasks)
+            )
+        else:
+            schedule = critical_path(tasks)
+    index = get_wbs_index(tasks) if cache_id is not None and task_filter.subtree is not None else None
+    matches = task_filter.select(tasks, index, schedule)
+    return {"tasks": matches, "filter": task_filter.text, "total_tasks": len(tasks)}
+
+
+def paged(result: Dict, offset: int, limit: Optional[int]) -> Dict:
+    """Cut one page out of a {"tasks": [...]} response"""
+    if limit is None:
+        return result
+    rows = result["tasks"]
+    return {**result, "tasks": rows[offset:offset + limit], "offset": offset, "limit": limit, "total_rows": len(rows)}
+
+
+def task_window(index: WBSIndex, offset: int, limit: int, collapsed: Optional[str] = None) -> Dict:
+    """One viewport of tasks in WBS order, with the descendants of collapsed tasks skipped"""
+    collapsed_ids = [task_id for task_id in (collapsed or "").split(",") if task_id]
+    rows, total_rows = index.window(offset, limit, collapsed_ids)
+    return {"tasks": rows, "offset": offset, "limit": limit, "total_rows": total_rows,
+            "total_tasks": len(index.tasks)}
+
+
 def save_project_to_db():
     """Save current project state to database"""
     global current_project_id
@@ -223,56 +351,143 @@ def save_project_to_db():
             print(f"Error saving project to database: {e}")
 
 
-def load_project_from_db(project_id: Optional[str] = None, user_id: Optional[str] = None):
-    """Load project from database"""
-    global current_project, current_project_id
+def task_snapshot(tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Copies of tasks (and their link lists) to hand to a database thread while edits go on"""
+    return [
+        {**task, "predecessors": [dict(pred) for pred in task.get("predecessors") or []],
+         "baselines": list(task.get("baselines") or [])}
+        for task in tasks
+    ]
+
+
+def mark_dirty(task_ids, links: bool = False) -> None:
+    """Record tasks of the loaded project as edited (and their predecessors, with links)"""
+    task_ids = list(task_ids)
+    dirty_task_ids.update(task_ids)
+    if links:
+        dirty_link_ids.update(task_ids)
+
+
+def write_project(project_id: str, project: Dict[str, Any], tasks: List[Dict[str, Any]],
+                  xml_str: Optional[str], dirty_ids: set = frozenset(),
+                  dirty_links: set = frozenset()) -> Dict[str, int]:
+    """
+    Save a project snapshot in one transaction (runs on a database thread).
+
+    The metadata update stamps the project, and only the dirty tasks and
+    predecessor sets, plus any others that changed since the last load or
+    save, are written.
+    """
+    with db.get_connection():
+        db.update_project_metadata(
+            project_id,
+            project.get('name', 'Unnamed Project'),
+            project.get('start_date', '2024-01-01'),
+            project.get('status_date', '2024-01-01')
+        )
+        changes = db.save_task_changes(project_id, tasks, touch_project=False,
+                                       dirty_ids=dirty_ids, dirty_link_ids=dirty_links)
+
+        # Save XML template if available
+        if xml_str is not None:
+            db.save_xml_template(project_id, xml_str)
+    return changes
+
 
+def update_tasks(tasks: List[Dict[str, Any]]) -> None:
+    """Write each task's row and links in one transaction (runs on a database thread)"""
+    with db.get_connection():
+        for task in tasks:
+            db.update_task(task["id"], task)
+
+
+def fetch_project_from_db(project_id: Optional[str] = None, user_id: Optional[str] = None) -> Optional[Dict]:
+    """
+    Read a project, its tasks and XML template, and make it the user's active project.
+
+    Touches only the database, so it can run on a database thread; None if
+    there is no such project (or no active one when project_id is None).
+    """
     # If no project_id specified, load the active project for this user
     if project_id is None:
         project_data = db.get_active_project(user_id)
         if project_data:
             project_id = project_data['id']
+    if not project_id:
+        return None
 
-    if project_id:
-        try:
-            # Load project metadata
-            project_data = db.get_project(project_id)
-            if not project_data:
-                return False
+    project_data = db.get_project(project_id)
+    if not project_data:
+        return None
+    stored = {
+        "project": project_data,
+        "tasks": db.get_tasks(project_id),
+        "xml": db.get_xml_template(project_id),
+    }
 
-            # Load tasks
-            tasks = db.get_tasks(project_id)
+    # Switch to this project for this user
+    db.switch_project(project_id, user_id=user_id)
+    return stored
 
-            # Build current_project dict
-            current_project = {
-                "name": project_data['name'],
-                "start_date": project_data['start_date'],
-                "status_date": project_data['status_date'],
-                "tasks": tasks
-            }
-            current_project_id = project_id
 
-            # Rebuild hierarchical outline numbers if they're flat (from MS Project XML)
-            current_project["tasks"] = xml_processor._rebuild_hierarchical_outline_numbers(current_project["tasks"])
+def install_project(stored: Optional[Dict]) -> bool:
+    """Make a project read by fetch_project_from_db the in-memory current project"""
+    global current_project, current_project_id
 
-            # Calculate summary tasks after loading
-            current_project["tasks"] = xml_processor._calculate_summary_tasks(current_project["tasks"])
+    if stored is None:
+        return False
+    project_data = stored["project"]
+    project_id = project_data['id']
 
-            # Load XML template if available
-            xml_content = db.get_xml_template(project_id)
-            if xml_content:
-                xml_processor.xml_root = ET.fromstring(xml_content)
-            else:
-                xml_processor.xml_root = None
+    # Build current_project dict
+    current_project = {
+        "name": project_data['name'],
+        "start_date": project_data['start_date'],
+        "status_date": project_data['status_date'],
+        "tasks": stored["tasks"]
+    }
+    current_project_id = project_id
+    schedule_cache.bump(project_id)
+    dirty_task_ids.clear()
+    dirty_link_ids.clear()
 
-            # Switch to this project for this user
-            db.switch_project(project_id, user_id=user_id)
+    # Rebuild hierarchical outline numbers if they're flat (from MS Project XML)
+    current_project["tasks"] = xml_processor._rebuild_hierarchical_outline_numbers(current_project["tasks"])
 
-            print(f"Loaded project from database: {current_project.get('name', 'Unknown')} (ID: {project_id})")
-            return True
-        except Exception as e:
-            print(f"Error loading project from database: {e}")
+    # Key links saved before predecessor ids were stored by their outline
+    resolve_link_ids(current_project["tasks"])
+
+    # Calculate summary tasks after loading
+    current_project["tasks"] = xml_processor._calculate_summary_tasks(current_project["tasks"])
+
+    # Load XML template if available
+    if stored["xml"]:
+        xml_processor.xml_root = ET.fromstring(stored["xml"])
+    else:
+        xml_processor.xml_root = None
 
+    print(f"Loaded project from database: {current_project.get('name', 'Unknown')} (ID: {project_id})")
+    return True
+
+
+def load_project_from_db(project_id: Optional[str] = None, user_id: Optional[str] = None):
+    """Load project from database"""
+    try:
+        return install_project(fetch_project_from_db(project_id, user_id))
+    except Exception as e:
+        print(f"Error loading project from database: {e}")
+    return False
+
+
+async def load_project(project_id: Optional[str] = None, user_id: Optional[str] = None):
+    """Load project from database, reading it on a database thread"""
+    try:
+        installed = install_project(await adb.run(fetch_project_from_db, project_id, user_id))
+        if installed:
+            await preload_calendar(current_project_id)
+        return installed
+    except Exception as e:
+        print(f"Error loading project from database: {e}")
     return False
 
 
@@ -316,7 +531,7 @@ async def get_all_projects(current_user: Optional[dict] = Depends(get_optional_u
     If not authenticated, returns all projects (backward compatibility).
     """
     user_id = current_user.get("id") if current_user else None
-    projects = db.list_projects(user_id=user_id)
+    projects = await adb.list_projects(user_id=user_id)
 
     # Format for frontend compatibility
     formatted_projects = []
@@ -361,7 +576,7 @@ async def create_new_project(
     user_id = current_user.get("id") if current_user else None
 
     # Create project in database
-    project_id = db.create_project(
+    project_id = await adb.create_project(
         name=name,
         start_date=datetime.now().strftime("%Y-%m-%d"),
         status_date=datetime.now().strftime("%Y-%m-%d"),
@@ -403,10 +618,10 @@ async def switch_project(
     user_id = current_user.get("id") if current_user else None
 
     # Verify access and switch
-    if not db.switch_project(project_id, user_id=user_id):
+    if not await adb.switch_project(project_id, user_id=user_id):
         raise HTTPException(status_code=404, detail="Project not found or access denied")
 
-    if load_project_from_db(project_id):
+    if await load_project(project_id):
         return {
             "success": True,
             "message": "Switched to project",
@@ -429,7 +644,7 @@ async def update_project_sharing(
     """
     user_id = current_user.get("id") if current_user else None
 
-    if db.update_project_sharing(project_id, is_shared, user_id=user_id):
+    if await adb.update_project_sharing(project_id, is_shared, user_id=user_id):
         return {
             "success": True,
             "message": f"Project {'shared' if is_shared else 'unshared'} successfully",
@@ -448,7 +663,8 @@ async def delete_project(project_id: str):
     if project_id == current_project_id:
         raise HTTPException(status_code=400, detail="Cannot delete the currently active project. Switch to another project first.")
 
-    if db.delete_project(project_id):
+    if await adb.delete_project(project_id):
+        scenario_store.drop_project(project_id)
         return {
             "success": True,
             "message": "Project deleted successfully"
@@ -510,7 +726,7 @@ async def upload_project(
 
         # Create project in database
         print("Creating project in database...")
-        project_id = db.create_project(
+        project_id = await adb.create_project(
             name=project_data.get('name', 'Imported Project'),
             start_date=project_data.get('start_date', datetime.now().strftime("%Y-%m-%d")),
             status_date=project_data.get('status_date', datetime.now().strftime("%Y-%m-%d")),
@@ -530,9 +746,10 @@ async def upload_project(
                 # Keep UID from XML or generate new one
                 if not task.get("uid"):
                     task["uid"] = task["id"]
+            relink_by_outline(tasks)
 
             print(f"Inserting {len(tasks)} tasks...")
-            db.bulk_create_tasks(project_id, tasks)
+            await adb.bulk_create_tasks(project_id, tasks)
             print("Tasks inserted successfully")
 
         # Update in-memory state
@@ -571,15 +788,15 @@ async def get_project_metadata(current_user: Optional[dict] = Depends(get_option
 
     # Get active project for THIS USER (not globally)
     user_id = current_user.get("id") if current_user else None
-    project_data = db.get_active_project(user_id)
+    project_data = await adb.get_active_project(user_id)
     if not project_data:
         raise HTTPException(status_code=404, detail="No project loaded")
 
     # Sync in-memory state if out of sync
     if current_project_id != project_data['id']:
-        load_project_from_db(project_data['id'])
+        await load_project(project_data['id'])
 
-    task_count = len(db.get_tasks(project_data['id']))
+    task_count = len(await adb.get_tasks(project_data['id']))
 
     return {
         "project_id": project_data['id'],
@@ -603,7 +820,7 @@ async def update_project_metadata(metadata: ProjectMetadata):
     start_date_changed = old_start_date != metadata.start_date
 
     # Update in database
-    db.update_project_metadata(
+    await adb.update_project_metadata(
         current_project_id,
         metadata.name,
         metadata.start_date,
@@ -624,8 +841,7 @@ async def update_project_metadata(metadata: ProjectMetadata):
 
         # Persist recalculated task dates to database immediately
         # This ensures consistency across multiple container instances
-        for task in current_project.get("tasks", []):
-            db.update_task(task["id"], task)
+        await adb.run(update_tasks, task_snapshot(current_project.get("tasks", [])))
         print(f"[Metadata Update] Saved recalculated task dates to database")
 
     return {"success": True, "metadata": metadata, "dates_recalculated": start_date_changed}
@@ -643,56 +859,41 @@ async def save_project():
         raise HTTPException(status_code=404, detail="No project loaded")
 
     try:
-        # Update project metadata
-        db.update_project_metadata(
-            current_project_id,
-            current_project.get('name', 'Unnamed Project'),
-            current_project.get('start_date', '2024-01-01'),
-            current_project.get('status_date', '2024-01-01')
-        )
-
-        # Save all tasks - use upsert approach for proper handling of new tasks
-        # (e.g., summary tasks created by organize_project)
         tasks = current_project.get("tasks", [])
-
-        # Get existing task IDs from database
-        existing_task_ids = set(db.get_task_ids(current_project_id))
-
-        new_tasks = 0
-        updated_tasks = 0
-
+        refresh_link_outlines(tasks)
         for task in tasks:
-            task_id = task.get("id")
-            if task_id in existing_task_ids:
-                # Update existing task
-                db.update_task(task_id, task)
-                updated_tasks += 1
-            else:
-                # Insert new task (e.g., summary tasks created by organize)
-                db.create_task(current_project_id, task)
-                new_tasks += 1
-
-        # Delete tasks that are no longer in memory (were deleted)
-        current_task_ids = {t.get("id") for t in tasks}
-        deleted_task_ids = existing_task_ids - current_task_ids
-        for task_id in deleted_task_ids:
-            db.delete_task(task_id)
-
-        # Save XML template if available
-        if xml_processor.xml_root is not None:
-            xml_str = ET.tostring(xml_processor.xml_root, encoding='unicode')
-            db.save_xml_template(current_project_id, xml_str)
+            if not task.get("id"):
+                task["id"] = str(uuid.uuid4())
 
-        print(f"[SAVE] Project saved: {current_project.get('name', 'Unknown')} (ID: {current_project_id})")
-        print(f"[SAVE] Tasks: {new_tasks} new, {updated_tasks} updated, {len(deleted_task_ids)} deleted")
+        # Written on a database thread from a snapshot, so edits arriving
+        # while the save runs are neither blocked nor half-saved
+        project_id, project = current_project_id, dict(current_project)
+        xml_str = ET.tostring(xml_processor.xml_root, encoding='unicode') if xml_processor.xml_root is not None else None
+        dirty_ids, dirty_links = set(dirty_task_ids), set(dirty_link_ids)
+        dirty_task_ids.clear()
+        dirty_link_ids.clear()
+        try:
+            changes = await adb.run(write_project, project_id, project, task_snapshot(tasks), xml_str,
+                                    dirty_ids, dirty_links)
+        except Exception:
+            # Rolled back: still unsaved (unless another project was loaded meanwhile)
+            if current_project_id == project_id:
+                mark_dirty(dirty_ids)
+                mark_dirty(dirty_links, links=True)
+            raise
+
+        print(f"[SAVE] Project saved: {project.get('name', 'Unknown')} (ID: {project_id})")
+        print(f"[SAVE] Tasks: {changes['created']} new, {changes['updated']} updated, "
+              f"{changes['relinked']} relinked, {changes['deleted']} deleted (of {len(tasks)})")
 
         return {
             "success": True,
-            "message": f"Project '{current_project.get('name', 'Unknown')}' saved successfully",
+            "message": f"Project '{project.get('name', 'Unknown')}' saved successfully",
             "task_count": len(tasks),
-            "new_tasks": new_tasks,
-            "updated_tasks": updated_tasks,
-            "deleted_tasks": len(deleted_task_ids)
+            "new_tasks": changes["created"],
+            "updated_tasks": changes["updated"],
+            "relinked_tasks": changes["relinked"],
+            "deleted_tasks": changes["deleted"]
         }
     except Exception as e:
         print(f"[SAVE ERROR] Failed to save project: {e}")
@@ -700,38 +901,73 @@ async def save_project():
 
 
 @app.get("/api/tasks")
-async def get_tasks(current_user: Optional[dict] = Depends(get_optional_user)):
-    """Get all tasks in the current project - returns in-memory state for manual save mode"""
+async def get_tasks(filter: Optional[str] = None, offset: int = 0, limit: Optional[int] = None,
+                    collapsed: Optional[str] = None, current_user: Optional[dict] = Depends(get_optional_user)):
+    """
+    Get all tasks in the current project - returns in-memory state for manual save mode
+
+    filter selects tasks on the server, e.g. "critical and float<2" or
+    "subtree:3.2 and start>=2026-11-01" (see task_filter.py for the terms).
+    limit returns one window of rows [offset, offset + limit) in WBS order for
+    virtualized rendering, skipping the descendants of the comma-separated
+    collapsed task ids; expand them with GET /api/tasks/{task_id}/children.
+    """
     global current_project, current_project_id
 
+    if offset < 0 or (limit is not None and limit < 1):
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit >= 1")
+
+    task_filter = None
+    if filter:
+        try:
+            task_filter = TaskFilter(filter)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid filter: {e}")
+
     # Check active project for THIS USER from database
     user_id = current_user.get("id") if current_user else None
-    project_data = db.get_active_project(user_id)
+    project_data = await adb.get_active_project(user_id)
     if not project_data:
         raise HTTPException(status_code=404, detail="No project loaded")
 
     # If no in-memory state or different project, load from database
     if not current_project or current_project_id != project_data['id']:
-        load_project_from_db(project_data['id'])
+        await load_project(project_data['id'])
 
     # MANUAL SAVE MODE: Return in-memory state (may have unsaved changes)
     if current_project and current_project.get("tasks"):
         tasks = current_project["tasks"]
 
-        # Auto-calculate dates if tasks are missing dates (common for AI-generated projects)
-        tasks_without_dates = [t for t in tasks if not t.get("start_date") and not t.get("summary")]
-        if tasks_without_dates:
-            # Calculate dates based on dependencies
-            current_project = ai_project_editor.recalculate_dates(current_project)
-            tasks = current_project["tasks"]
-
-        # Ensure summary tasks are calculated (roll up from children)
-        tasks = xml_processor._calculate_summary_tasks(tasks)
+        # Auto-calculate dates if tasks are missing dates (common for AI-generated projects);
+        # checked once per schedule version so windowed reads stay O(window)
+        if not schedule_cache.get(current_project_id, "dates_checked"):
+            tasks_without_dates = [t for t in tasks if not t.get("start_date") and not t.get("summary")]
+            if tasks_without_dates:
+                # Calculate dates based on dependencies
+                current_project = ai_project_editor.recalculate_dates(current_project)
+                tasks = current_project["tasks"]
+                schedule_cache.bump(current_project_id)
+            schedule_cache.put(current_project_id, "dates_checked", True)
+
+        # Ensure summary tasks are calculated (roll up from children), unless
+        # they are still rolled up from the last read or an incremental edit
+        if not schedule_cache.get(current_project_id, "summaries_rolled_up"):
+            tasks = xml_processor._calculate_summary_tasks(tasks, get_wbs_index(tasks))
+            schedule_cache.put(current_project_id, "summaries_rolled_up", True)
+
+        # Links keep their predecessor's id through renumbering; show its current outline
+        if not schedule_cache.get(current_project_id, "link_outlines"):
+            refresh_link_outlines(tasks)
+            schedule_cache.put(current_project_id, "link_outlines", True)
         current_project["tasks"] = tasks
+        if task_filter:
+            return paged(filtered_tasks(task_filter, tasks, cache_id=current_project_id), offset, limit)
+        if limit is not None:
+            return task_window(get_wbs_index(tasks), offset, limit, collapsed)
         return {"tasks": tasks}
 
     # Fallback: Load from database if no in-memory state
-    tasks = db.get_tasks(project_data['id'])
+    tasks = await adb.get_tasks(project_data['id'])
 
     # Auto-calculate dates if tasks are missing dates
     tasks_without_dates = [t for t in tasks if not t.get("start_date") and not t.get("summary")]
@@ -745,6 +981,10 @@ async def get_tasks(current_user: Optional[dict] = Depends(get_optional_user)):
     if current_project:
         current_project["tasks"] = tasks
 
+    if task_filter:
+        return paged(filtered_tasks(task_filter, tasks), offset, limit)
+    if limit is not None:
+        return task_window(WBSIndex(tasks), offset, limit, collapsed)
     return {"tasks": tasks}
 
 
@@ -755,13 +995,13 @@ async def create_task(task: TaskCreate, current_user: Optional[Dict] = Depends(g
 
     # Get active project for THIS USER from database
     user_id = current_user.get("id") if current_user else None
-    project_data = db.get_active_project(user_id)
+    project_data = await adb.get_active_project(user_id)
     if not project_data:
         raise HTTPException(status_code=404, detail="No project loaded")
 
     # If no in-memory state or different project, load from database
     if not current_project or current_project_id != project_data['id']:
-        load_project_from_db(project_data['id'])
+        await load_project(project_data['id'])
 
     if not current_project or not current_project_id:
         raise HTTPException(status_code=404, detail="No project loaded")
@@ -777,6 +1017,7 @@ async def create_task(task: TaskCreate, current_user: Optional[Dict] = Depends(g
     # Add the task to in-memory project
     # This also recalculates summary tasks for all affected tasks
     new_task = xml_processor.add_task(current_project, task_dict)
+    mark_dirty([new_task["id"]], links=True)
 
     # MANUAL SAVE MODE: Changes kept in memory only until user saves
     # db.create_task(current_project_id, new_task)
@@ -795,13 +1036,13 @@ async def update_task(task_id: str, task: TaskUpdate, current_user: Optional[Dic
 
     # Get active project for THIS USER from database
     user_id = current_user.get("id") if current_user else None
-    project_data = db.get_active_project(user_id)
+    project_data = await adb.get_active_project(user_id)
     if not project_data:
         raise HTTPException(status_code=404, detail="No project loaded")
 
     # If no in-memory state or different project, load from database
     if not current_project or current_project_id != project_data['id']:
-        load_project_from_db(project_data['id'])
+        await load_project(project_data['id'])
 
     if not current_project or not current_project_id:
         raise HTTPException(status_code=404, detail="No project loaded")
@@ -823,16 +1064,38 @@ async def update_task(task_id: str, task: TaskUpdate, current_user: Optional[Dic
     merged_task = {**existing_task, **updates}
 
     # Validate the updated task
-    validation = validator.validate_task(merged_task, current_project.get("tasks", []))
+    index = get_wbs_index(current_project["tasks"])
+    validation = validator.validate_task(merged_task, current_project["tasks"], index)
     if not validation["valid"]:
         raise HTTPException(status_code=400, detail=validation["errors"])
 
+    # Summaries are rolled up now if nothing has touched them since the last roll-up
+    rolled_up = schedule_cache.get(current_project_id, "summaries_rolled_up")
+
+    # The link network stays valid unless the edit relinks or renumbers the task
+    network = None
+    if not {"predecessors", "outline_number"} & updates.keys():
+        network = get_schedule_network(current_project["tasks"])
+
     # Update the task in memory
-    # This also recalculates summary tasks for all affected tasks
-    updated_task = xml_processor.update_task(current_project, task_id, updates)
+    # This also reschedules the edited task's successors and rolls up its ancestors
+    updated_task = xml_processor.update_task(current_project, task_id, updates, network=network)
 
     if not updated_task:
         raise HTTPException(status_code=404, detail="Task not found")
+    mark_dirty([updated_task["id"]], links="predecessors" in updates)
+
+    # Keep the roll-up (unless a summary's own dates were typed over) and the
+    # hierarchy index (unless the task was renumbered) across this edit
+    dates_typed = {"start_date", "finish_date", "duration"} & updates.keys()
+    if rolled_up and not (updated_task.get("summary") and dates_typed):
+        schedule_cache.carry(current_project_id, "summaries_rolled_up", True)
+    if "outline_number" not in updates:
+        schedule_cache.carry(current_project_id, "wbs_index", index)
+        schedule_cache.carry(current_project_id, "link_outlines", True)
+    if network is not None and network.tasks is current_project["tasks"]:
+        network.refresh_durations([network.index_by_id[updated_task["id"]]])
+        schedule_cache.carry(current_project_id, "schedule_network", network)
 
     # MANUAL SAVE MODE: Changes kept in memory only until user saves
     # for task in current_project.get("tasks", []):
@@ -842,6 +1105,71 @@ async def update_task(task_id: str, task: TaskUpdate, current_user: Optional[Dic
     return {"success": True, "task": updated_task}
 
 
+@app.patch("/api/tasks")
+async def batch_update_tasks(request: TaskBatchRequest, current_user: Optional[Dict] = Depends(get_current_user)):
+    """
+    Apply ordered create/update/delete/move operations as one transaction.
+
+    Validation, renumbering, summary roll-up and rescheduling run once for the
+    whole batch; if any operation fails, nothing is changed. Returns the tasks
+    that were created or changed (including rescheduled ones) and the deleted ids.
+    """
+    global current_project, current_project_id
+
+    # Get active project for THIS USER from database
+    user_id = current_user.get("id") if current_user else None
+    project_data = await adb.get_active_project(user_id)
+    if not project_data:
+        raise HTTPException(status_code=404, detail="No project loaded")
+
+    # If no in-memory state or different project, load from database
+    if not current_project or current_project_id != project_data['id']:
+        await load_project(project_data['id'])
+
+    if not current_project or not current_project_id:
+        raise HTTPException(status_code=404, detail="No project loaded")
+
+    # Check the fields of each operation against the single-task models
+    operations = []
+    for number, operation in enumerate(request.operations):
+        op = operation.model_dump()
+        try:
+            if operation.op == "create":
+                op["task"] = TaskCreate(**(operation.task or {})).model_dump()
+            elif operation.op == "update":
+                op["task"] = TaskUpdate(**(operation.task or {})).model_dump(exclude_unset=True)
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=[{"operation": number, "message": str(e)}])
+        operations.append(op)
+
+    # Inside a scenario, work on a copy of the scenario's project
+    scenario = get_scenario(request.scenario_id) if request.scenario_id else None
+    project = scenario.working_copy(current_project) if scenario else current_project
+
+    # Updates that neither relink nor renumber keep the link network valid
+    keeps_links = all(op["op"] == "update" and not {"predecessors", "outline_number"} & op["task"].keys()
+                      for op in operations)
+    network = get_schedule_network(current_project["tasks"]) if keeps_links and not scenario else None
+    result = xml_processor.apply_batch(project, operations, network=network)
+    if not result["success"]:
+        raise HTTPException(status_code=400, detail=result["errors"])
+
+    if scenario:
+        scenario.update(current_project, project)
+    else:
+        # The batch left the summaries rolled up
+        schedule_cache.carry(current_project_id, "summaries_rolled_up", True)
+        if network is not None:
+            network.refresh_durations(network.index_by_id[task["id"]] for task in result["changed"])
+            schedule_cache.carry(current_project_id, "schedule_network", network)
+        mark_dirty(task["id"] for task in result["changed"])
+        mark_dirty((op["task_id"] for op in operations
+                    if op["op"] == "update" and "predecessors" in op["task"] and op.get("task_id")), links=True)
+
+    # MANUAL SAVE MODE: Changes kept in memory only until user saves
+    return {"success": True, "changed": result["changed"], "deleted": result["deleted"]}
+
+
 @app.delete("/api/tasks/{task_id}")
 async def delete_task(task_id: str, current_user: Optional[Dict] = Depends(get_current_user)):
     """Delete a task"""
@@ -849,13 +1177,13 @@ async def delete_task(task_id: str, current_user: Optional[Dict] = Depends(get_c
 
     # Get active project for THIS USER from database
     user_id = current_user.get("id") if current_user else None
-    project_data = db.get_active_project(user_id)
+    project_data = await adb.get_active_project(user_id)
     if not project_data:
         raise HTTPException(status_code=404, detail="No project loaded")
 
     # If no in-memory state or different project, load from database
     if not current_project or current_project_id != project_data['id']:
-        load_project_from_db(project_data['id'])
+        await load_project(project_data['id'])
 
     if not current_project or not current_project_id:
         raise HTTPException(status_code=404, detail="No project loaded")
@@ -886,13 +1214,13 @@ async def ungroup_task(task_id: str, current_user: Optional[Dict] = Depends(get_
 
     # Get active project for THIS USER from database
     user_id = current_user.get("id") if current_user else None
-    project_data = db.get_active_project(user_id)
+    project_data = await adb.get_active_project(user_id)
     if not project_data:
         raise HTTPException(status_code=404, detail="No project loaded")
 
     # If no in-memory state or different project, load from database
     if not current_project or current_project_id != project_data['id']:
-        load_project_from_db(project_data['id'])
+        await load_project(project_data['id'])
 
     if not current_project or not current_project_id:
         raise HTTPException(status_code=404, detail="No project loaded")
@@ -920,6 +1248,53 @@ async def ungroup_task(task_id: str, current_user: Optional[Dict] = Depends(get_
     }
 
 
+@app.get("/api/tasks/{task_id}/children")
+async def get_task_children(task_id: str, offset: int = 0, limit: Optional[int] = None):
+    """Direct children of a task in WBS order, for expanding a summary lazily"""
+    if not current_project or not current_project_id:
+        raise HTTPException(status_code=404, detail="No project loaded")
+    if offset < 0 or (limit is not None and limit < 1):
+        raise HTTPException(status_code=400, detail="offset must be >= 0 and limit >= 1")
+
+    index = get_wbs_index(current_project.get("tasks", []))
+    if not index.task(task_id):
+        raise HTTPException(status_code=404, detail="Task not found")
+
+    child_ids = index.child_ids(task_id)
+    page = child_ids[offset:] if limit is None else child_ids[offset:offset + limit]
+    return {
+        "task_id": task_id,
+        "tasks": [index.task(child_id) for child_id in page],
+        "offset": offset,
+        "total_children": len(child_ids),
+        "has_children": {child_id: index.has_children(child_id) for child_id in page}
+    }
+
+
+@app.get("/api/tasks/{task_id}/impact")
+async def get_task_impact(task_id: str):
+    """
+    Everything a change to this task reaches: the transitive successor and
+    predecessor sets, the earliest downstream finish, and how many days the
+    task can slip before the project finish moves
+    """
+    if not current_project or not current_project_id:
+        raise HTTPException(status_code=404, detail="No project loaded")
+
+    tasks = current_project.get("tasks", [])
+
+    def compute():
+        critical = schedule_cache.get_or_compute(
+            current_project_id, "critical_path", lambda: critical_path(tasks)
+        )
+        return scheduling_engine.impact(get_schedule_network(tasks), task_id, critical.get("task_floats", {}))
+
+    result = schedule_cache.get_or_compute(current_project_id, f"impact:{task_id}", compute)
+    if result is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return result
+
+
 @app.get("/api/tasks/{task_id}/children-count")
 async def get_task_children_count(task_id: str):
     """Get the count of children for a task (used for delete warning)"""
@@ -929,22 +1304,17 @@ async def get_task_children_count(task_id: str):
         raise HTTPException(status_code=404, detail="No project loaded")
 
     # Find the task
-    task = next((t for t in current_project.get("tasks", []) if t["id"] == task_id), None)
+    index = get_wbs_index(current_project.get("tasks", []))
+    task = index.task(task_id)
     if not task:
         raise HTTPException(status_code=404, detail="Task not found")
 
-    # Count children
-    outline = task["outline_number"]
-    children = [t for t in current_project.get("tasks", [])
-                if t["outline_number"].startswith(outline + ".")]
-
     return {
         "task_id": task_id,
         "task_name": task["name"],
         "is_summary": task.get("summary", False),
-        "children_count": len(children),
-        "direct_children_count": len([t for t in children
-                                       if t["outline_number"].count(".") == outline.count(".") + 1])
+        "children_count": index.subtree_size(task_id),
+        "direct_children_count": len(index.child_ids(task_id))
     }
 
 
@@ -952,6 +1322,7 @@ class MoveTaskRequest(BaseModel):
     """Request model for moving a task"""
     target_outline: str = Field(..., description="Outline number of the target task")
     position: str = Field(..., description="Position relative to target: 'under', 'before', or 'after'")
+    scenario_id: Optional[str] = Field(default=None, description="Move inside this what-if scenario")
 
 
 class MoveTaskResponse(BaseModel):
@@ -989,20 +1360,24 @@ async def move_task(task_id: str, request: MoveTaskRequest, current_user: Option
 
     # Ensure we have fresh data from database for THIS USER
     user_id = current_user.get("id") if current_user else None
-    project_data = db.get_active_project(user_id)
+    project_data = await adb.get_active_project(user_id)
     if not project_data:
         raise HTTPException(status_code=404, detail="No project loaded")
 
     # Sync in-memory state if needed
     if current_project_id != project_data['id']:
-        load_project_from_db(project_data['id'])
+        await load_project(project_data['id'])
 
     if not current_project or not current_project_id:
         raise HTTPException(status_code=404, detail="No project loaded")
 
+    # Inside a scenario, work on a copy of the scenario's project
+    scenario = get_scenario(request.scenario_id) if request.scenario_id else None
+    project = scenario.working_copy(current_project) if scenario else current_project
+
     # Find the source task by ID
     source_task = None
-    for task in current_project.get("tasks", []):
+    for task in project.get("tasks", []):
         if task["id"] == task_id:
             source_task = task
             break
@@ -1015,7 +1390,7 @@ async def move_task(task_id: str, request: MoveTaskRequest, current_user: Option
 
     # Find target task
     target_task = None
-    for task in current_project.get("tasks", []):
+    for task in project.get("tasks", []):
         if task["outline_number"] == target_outline:
             target_task = task
             break
@@ -1040,7 +1415,7 @@ async def move_task(task_id: str, request: MoveTaskRequest, current_user: Option
 
     # Execute the move using ai_project_editor
     result = ai_project_editor._move_task(
-        current_project,
+        project,
         source_outline,
         target_outline,
         request.position
@@ -1050,10 +1425,13 @@ async def move_task(task_id: str, request: MoveTaskRequest, current_user: Option
         raise HTTPException(status_code=400, detail=result["message"])
 
     # Get the updated project
-    updated_project = result.get("project", current_project)
+    updated_project = result.get("project", project)
 
-    # Update in-memory state
-    current_project = updated_project
+    # Update in-memory state (or the scenario overlay)
+    if scenario:
+        scenario.update(current_project, updated_project)
+    else:
+        current_project = updated_project
 
     # MANUAL SAVE MODE: Changes kept in memory only until user saves
     # existing_task_ids = {t["id"] for t in db.get_tasks(current_project_id)}
@@ -1087,6 +1465,60 @@ async def move_task(task_id: str, request: MoveTaskRequest, current_user: Option
     )
 
 
+@app.post("/api/tasks/{task_id}/clone")
+async def clone_task_subtree(task_id: str, request: CloneSubtreeRequest, current_user: Optional[dict] = Depends(get_optional_user)):
+    """
+    Clone a task and all its children several times, e.g. to repeat a building
+    template. Copies get new ids and outline numbers, links inside the subtree
+    point within each copy, and with chain=True each copy follows the previous one.
+    """
+    global current_project, current_project_id
+
+    # Ensure we have fresh data from database for THIS USER
+    user_id = current_user.get("id") if current_user else None
+    project_data = await adb.get_active_project(user_id)
+    if not project_data:
+        raise HTTPException(status_code=404, detail="No project loaded")
+
+    # Sync in-memory state if needed
+    if current_project_id != project_data['id']:
+        await load_project(project_data['id'])
+
+    if not current_project or not current_project_id:
+        raise HTTPException(status_code=404, detail="No project loaded")
+
+    # Inside a scenario, work on a copy of the scenario's project
+    scenario = get_scenario(request.scenario_id) if request.scenario_id else None
+    project = scenario.working_copy(current_project) if scenario else current_project
+
+    index = WBSIndex(project["tasks"])
+    source = index.task(task_id) or index.find(task_id)
+    if not source:
+        raise HTTPException(status_code=404, detail=f"Task with ID {task_id} not found")
+    if request.after_task_id:
+        after = index.task(request.after_task_id) or index.find(request.after_task_id)
+        if not after:
+            raise HTTPException(status_code=404, detail=f"Task with ID {request.after_task_id} not found")
+        if after is not source and after["id"] in index.subtree_ids(source["id"]):
+            raise HTTPException(status_code=400, detail="Cannot insert copies inside the task being cloned")
+
+    roots = xml_processor.clone_subtree(project, source["id"], request.copies, request.after_task_id,
+                                        chain=request.chain, number_names=request.number_names)
+
+    # Update in-memory state (or the scenario overlay)
+    if scenario:
+        scenario.update(current_project, project)
+
+    # MANUAL SAVE MODE: Changes kept in memory only until user saves
+    subtree_size = index.subtree_size(source["id"]) + 1
+    return {
+        "success": True,
+        "message": f"Created {len(roots)} copies of '{source['name']}' ({len(roots) * subtree_size} tasks)",
+        "copies": [{"id": root["id"], "name": root["name"], "outline_number": root["outline_number"]} for root in roots],
+        "tasks_created": len(roots) * subtree_size
+    }
+
+
 @app.post("/api/project/recalculate-dates")
 async def recalculate_project_dates():
     """
@@ -1290,7 +1722,7 @@ async def _handle_xml_chat(request, user_id: Optional[str] = None) -> Dict:
     if any(keyword in message_lower for keyword in create_keywords):
         try:
             # Create project in database with user ownership
-            project_id = db.create_project(
+            project_id = await adb.create_project(
                 name=project_name,
                 start_date=parsed_data.get("start_date", datetime.now().strftime("%Y-%m-%d")),
                 status_date=parsed_data.get("status_date", datetime.now().strftime("%Y-%m-%d")),
@@ -1308,14 +1740,15 @@ async def _handle_xml_chat(request, user_id: Optional[str] = None) -> Dict:
                     task["id"] = str(uuid.uuid4())
                     task["uid"] = task["id"]
                     task["project_id"] = project_id
+                relink_by_outline(tasks)
 
-                db.bulk_create_tasks(project_id, tasks)
+                await adb.bulk_create_tasks(project_id, tasks)
 
             # Store XML template
-            db.save_xml_template(project_id, xml_content)
+            await adb.save_xml_template(project_id, xml_content)
 
             # Switch to new project for this user
-            db.switch_project(project_id, user_id=user_id)
+            await adb.switch_project(project_id, user_id=user_id)
 
             # Update in-memory state
             current_project = parsed_data
@@ -1323,7 +1756,7 @@ async def _handle_xml_chat(request, user_id: Optional[str] = None) -> Dict:
 
             # Clear XML processor state and reload
             xml_processor.xml_root = None
-            load_project_from_db(project_id, user_id=user_id)
+            await load_project(project_id, user_id=user_id)
 
             response_json = {
                 "type": "xml_project_created",
@@ -1562,10 +1995,10 @@ async def chat_with_ai(request: ChatRequest, current_user: Optional[dict] = Depe
 
         if request.project_id:
             # Use the specific project requested
-            project_data = db.get_project(request.project_id)
+            project_data = await adb.get_project(request.project_id)
             if project_data:
                 # Load tasks for this project
-                tasks = db.get_tasks(request.project_id)
+                tasks = await adb.get_tasks(request.project_id)
                 target_project = {
                     "name": project_data["name"],
                     "start_date": project_data["start_date"],
@@ -1625,20 +2058,20 @@ async def chat_with_ai(request: ChatRequest, current_user: Optional[dict] = Depe
             print(f"[AI Chat] user_id: {user_id}, request.project_id: {request.project_id}")
 
             # First try get_active_project
-            project_data = db.get_active_project(user_id)
+            project_data = await adb.get_active_project(user_id)
             print(f"[AI Chat] get_active_project result: {project_data is not None}")
 
             # If no active project found, try most recent project
             if not project_data:
                 print("[AI Chat] No active project found, trying to get most recent project")
-                all_projects = db.list_projects(user_id)
+                all_projects = await adb.list_projects(user_id)
                 if all_projects:
                     # Get the first (most recent) project
-                    project_data = db.get_project(all_projects[0]['id'])
+                    project_data = await adb.get_project(all_projects[0]['id'])
                     print(f"[AI Chat] Found most recent project: {project_data.get('name') if project_data else 'None'}")
 
             if project_data:
-                tasks = db.get_tasks(project_data['id'])
+                tasks = await adb.get_tasks(project_data['id'])
                 target_project = {
                     "name": project_data["name"],
                     "start_date": project_data["start_date"],
@@ -1757,7 +2190,7 @@ async def chat_with_ai(request: ChatRequest, current_user: Optional[dict] = Depe
 
         # No command detected, use normal AI chat with historical context
         print(f"[AI Chat] No command detected, using AI chat")
-        historical_data = db.get_historical_project_data(limit=5)
+        historical_data = await adb.get_historical_project_data(limit=5)
         response = await ai_service.chat(
             user_message=request.message,
             project_context=target_project,  # Use target project, not current
@@ -1847,7 +2280,7 @@ async def generate_project_from_description(
 
     try:
         # Get historical project data for AI learning
-        historical_data = db.get_historical_project_data(limit=5)
+        historical_data = await adb.get_historical_project_data(limit=5)
         print(f"Using {len(historical_data)} historical projects as guidelines")
 
         # Generate project using AI with historical context
@@ -1872,9 +2305,9 @@ async def generate_project_from_description(
 
         # If a specific project_id was provided, check if it's empty
         if request.project_id:
-            project_data = db.get_project(request.project_id)
+            project_data = await adb.get_project(request.project_id)
             if project_data:
-                existing_tasks = db.get_tasks(request.project_id)
+                existing_tasks = await adb.get_tasks(request.project_id)
                 non_summary_tasks = [t for t in existing_tasks if not t.get("summary")]
                 if len(non_summary_tasks) == 0:
                     # Empty project - populate it
@@ -1893,7 +2326,7 @@ async def generate_project_from_description(
 
         if not populate_existing:
             # Create new project in database
-            project_id = db.create_project(
+            project_id = await adb.create_project(
                 name=project_name,
                 start_date=start_date,
                 status_date=start_date,
@@ -1907,24 +2340,25 @@ async def generate_project_from_description(
             task["id"] = str(uuid.uuid4())
             task["uid"] = task["id"]
             task["project_id"] = project_id
+        relink_by_outline(tasks)
 
         # Insert generated tasks
         if tasks:
             if populate_existing:
                 # Clear any existing tasks first (should be none, but just in case)
-                db.delete_all_tasks(project_id)
+                await adb.delete_all_tasks(project_id)
 
-            db.bulk_create_tasks(project_id, tasks)
+            await adb.bulk_create_tasks(project_id, tasks)
 
         # Update project metadata if populating existing
         if populate_existing:
-            db.update_project_metadata(project_id, project_name, start_date, start_date)
+            await adb.update_project_metadata(project_id, project_name, start_date, start_date)
 
         # IMPORTANT: Switch to the new/populated project for this user
-        db.switch_project(project_id, user_id=user_id)
+        await adb.switch_project(project_id, user_id=user_id)
 
         # Get fresh tasks from database with all computed fields
-        db_tasks = db.get_tasks(project_id)
+        db_tasks = await adb.get_tasks(project_id)
 
         # Update in-memory state with database tasks
         current_project = {
@@ -1977,37 +2411,139 @@ async def optimize_project_duration(request: OptimizeDurationRequest):
     if not current_project:
         raise HTTPException(status_code=404, detail="No project loaded")
 
+    project = get_scenario(request.scenario_id).project(current_project) if request.scenario_id else current_project
+
     try:
         result = ai_service.optimize_project_duration(
             target_days=request.target_days,
-            project_context=current_project
+            project_context=project
         )
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Optimization failed: {str(e)}")
 
 
+@app.post("/api/ai/duration-cost-curve")
+async def get_duration_cost_curve(request: DurationCostCurveRequest):
+    """
+    Duration-vs-cost tradeoff curve for a range of target durations.
+
+    Returns the minimum crashing cost of every target from max_days down to
+    min_days (step_days apart), from a single crashing run whose steps are
+    shared by all targets. Cached per schedule version.
+    """
+    global current_project, current_project_id
+
+    if not current_project:
+        raise HTTPException(status_code=404, detail="No project loaded")
+
+    tasks = current_project.get("tasks", [])
+    max_days = request.max_days
+    if max_days is None:
+        max_days = math.ceil(critical_path(tasks)["project_duration"]) if tasks else request.min_days
+    if max_days < request.min_days:
+        raise HTTPException(status_code=400, detail="max_days must not be less than min_days")
+    targets = list(range(max_days, request.min_days - 1, -request.step_days))
+    if len(targets) > 1000:
+        raise HTTPException(status_code=400, detail="Too many target durations (max 1000), increase step_days")
+
+    try:
+        return schedule_cache.get_or_compute(
+            current_project_id,
+            f"duration_cost_curve:{request.min_days}:{max_days}:{request.step_days}",
+            lambda: ai_service.duration_cost_curve(targets, current_project)
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Duration-cost curve failed: {str(e)}")
+
+
+@app.get("/api/timeline")
+async def get_timeline(width: int, start: Optional[str] = None, end: Optional[str] = None,
+                       bucket_px: int = 4, max_level: int = 1,
+                       current_user: Optional[Dict] = Depends(get_optional_user)):
+    """
+    Aggregated Gantt bars for zoomed-out views.
+
+    The date range (default: the whole schedule) is split into buckets of
+    about bucket_px pixels out of width; each bucket counts the leaf bars
+    active in it and flags critical work, and summaries up to max_level come
+    back as single spans. Buckets are cached per schedule version and bucket
+    size, so panning at one zoom level only slices them.
+    """
+    global current_project, current_project_id
+
+    user_id = current_user.get("id") if current_user else None
+    project_data = await adb.get_active_project(user_id)
+    if not project_data:
+        raise HTTPException(status_code=404, detail="No project loaded")
+    if not current_project or current_project_id != project_data['id']:
+        await load_project(project_data['id'])
+    if not current_project:
+        raise HTTPException(status_code=404, detail="No project loaded")
+    if not 1 <= width <= 20000 or bucket_px < 1:
+        raise HTTPException(status_code=400, detail="width must be 1-20000 pixels and bucket_px >= 1")
+
+    tasks = current_project.get("tasks", [])
+    if not schedule_cache.get(current_project_id, "summaries_rolled_up"):
+        tasks = xml_processor._calculate_summary_tasks(tasks, get_wbs_index(tasks))
+        current_project["tasks"] = tasks
+        schedule_cache.put(current_project_id, "summaries_rolled_up", True)
+
+    def build_arrays():
+        critical = schedule_cache.get_or_compute(
+            current_project_id, "critical_path", lambda: critical_path(tasks)
+        )
+        critical_ids = {task["id"] for task in critical.get("critical_tasks", [])}
+        return timeline_arrays(tasks, critical_ids, get_wbs_index(tasks))
+
+    arrays = schedule_cache.get_or_compute(current_project_id, "timeline_arrays", build_arrays)
+    span = project_span(arrays)
+    try:
+        start_day = date.fromisoformat(start) if start else (span[0] if span else None)
+        end_day = date.fromisoformat(end) if end else (span[1] if span else None)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="start and end must be dates like 2026-11-01")
+    if start_day is None or end_day is None:
+        return {"bucket_days": 1, "buckets": [], "summaries": [], "total_leaves": 0}
+    if end_day < start_day:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+
+    days = (end_day - start_day).days + 1
+    bucket_days = max(1, math.ceil(days * bucket_px / width))
+    buckets = schedule_cache.get_or_compute(
+        current_project_id, f"timeline:{bucket_days}", lambda: bucket_counts(arrays, bucket_days)
+    )
+    return timeline_window(arrays, buckets, bucket_days, start_day, end_day, max_level)
+
+
 @app.get("/api/critical-path")
-async def get_critical_path(current_user: Optional[Dict] = Depends(get_current_user)):
+async def get_critical_path(float_threshold: float = 0.0, current_user: Optional[Dict] = Depends(get_current_user)):
     """
     Calculate and return the critical path for the current project.
 
+    Args:
+        float_threshold: Also return non-critical work tasks whose total float
+                         is below this many days (near-critical band)
+
     Returns:
         - critical_tasks: List of tasks on the critical path
         - project_duration: Total project duration in days
         - task_floats: Dictionary of task_id -> total_float (slack time)
+        - near_critical_tasks: Tasks under the float threshold, lowest float first
+        - driving_paths: Chains of task ids linked by zero-float driving links
+        - driving_links: [predecessor_id, successor_id] pairs of driving links
     """
     global current_project, current_project_id
 
     # Get active project for THIS USER from database
     user_id = current_user.get("id") if current_user else None
-    project_data = db.get_active_project(user_id)
+    project_data = await adb.get_active_project(user_id)
     if not project_data:
         raise HTTPException(status_code=404, detail="No project loaded")
 
     # If no in-memory state or different project, load from database
     if not current_project or current_project_id != project_data['id']:
-        load_project_from_db(project_data['id'])
+        await load_project(project_data['id'])
 
     if not current_project:
         raise HTTPException(status_code=404, detail="No project loaded")
@@ -2019,26 +2555,118 @@ async def get_critical_path(current_user: Optional[Dict] = Depends(get_current_u
             "critical_tasks": [],
             "project_duration": 0,
             "task_floats": {},
-            "critical_task_ids": []
+            "critical_task_ids": [],
+            "near_critical_tasks": [],
+            "near_critical_task_ids": [],
+            "driving_paths": [],
+            "driving_links": []
         }
 
     try:
-        # Use the AI service's critical path calculation
-        result = ai_service._calculate_critical_path(tasks)
+        # Use the AI service's critical path calculation, cached per schedule version
+        result = schedule_cache.get_or_compute(
+            current_project_id, "critical_path", lambda: critical_path(tasks)
+        )
 
         # Extract just the IDs for easier frontend use
         critical_task_ids = [task["id"] for task in result["critical_tasks"]]
 
+        # CPM fields are added to copies so the live task dicts stay clean
+        critical_tasks = [
+            {**task, **result["task_schedule"][task["id"]], "is_critical": True}
+            for task in result["critical_tasks"]
+        ]
+
+        # Near-critical band: filtered from the cached floats, no recalculation
+        near_critical_tasks = []
+        if float_threshold > 0:
+            critical_ids = set(critical_task_ids)
+            near_critical_tasks = sorted(
+                (
+                    {**task, **result["task_schedule"][task["id"]], "is_critical": False}
+                    for task in tasks
+                    if not task.get("summary", False)
+                    and task["id"] not in critical_ids
+                    and result["task_floats"][task["id"]] < float_threshold
+                ),
+                key=lambda task: task["total_float"]
+            )
+
         return {
-            "critical_tasks": result["critical_tasks"],
+            "critical_tasks": critical_tasks,
             "project_duration": result["project_duration"],
             "task_floats": result["task_floats"],
-            "critical_task_ids": critical_task_ids
+            "critical_task_ids": critical_task_ids,
+            "near_critical_tasks": near_critical_tasks,
+            "near_critical_task_ids": [task["id"] for task in near_critical_tasks],
+            "driving_paths": result["driving_paths"],
+            "driving_links": result["driving_links"]
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Critical path calculation failed: {str(e)}")
 
 
+@app.post("/api/schedule/risk")
+async def simulate_schedule_risk(request: ScheduleRiskRequest, current_user: Optional[Dict] = Depends(get_current_user)):
+    """
+    Monte Carlo schedule risk analysis for the current project.
+
+    Runs the requested number of CPM iterations with task durations sampled
+    from PERT or triangular distributions around the planned durations.
+    The optimistic/pessimistic factors set the range, or, with
+    use_learned_norms, the category duration spreads learned from saved projects.
+
+    Returns:
+        - finish_days / finish_dates: P50, P80 and P95 project finish
+        - deterministic_finish_date and probability_on_time
+        - task_criticality: share of iterations each task was critical in
+    """
+    global current_project, current_project_id
+
+    # Get active project for THIS USER from database
+    user_id = current_user.get("id") if current_user else None
+    project_data = await adb.get_active_project(user_id)
+    if not project_data:
+        raise HTTPException(status_code=404, detail="No project loaded")
+
+    # If no in-memory state or different project, load from database
+    if not current_project or current_project_id != project_data['id']:
+        await load_project(project_data['id'])
+
+    if not current_project or not current_project.get("tasks"):
+        raise HTTPException(status_code=404, detail="No tasks in project")
+
+    duration_norms = None
+    if request.use_learned_norms:
+        projects = [
+            {"name": p["name"], "tasks": await adb.get_tasks(p["id"])}
+            for p in (await adb.list_projects())[:request.max_projects]
+        ]
+        duration_norms = project_template_learner.learn_from_multiple_projects(projects).get("category_duration_norms", {})
+
+    # Simulated on a thread (long runs must not block other requests) over a
+    # copy of the task list, with the calendar loaded on a database thread
+    project = {**current_project, "tasks": list(current_project["tasks"])}
+    calendar = await adb.run(calendar_cache.get, current_project_id)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(None, partial(
+            schedule_risk_simulator.simulate,
+            project,
+            iterations=request.iterations,
+            distribution=request.distribution,
+            optimistic_factor=request.optimistic_factor,
+            pessimistic_factor=request.pessimistic_factor,
+            duration_norms=duration_norms,
+            workers=request.workers,
+            seed=request.seed,
+            calendar=calendar
+        ))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Risk simulation failed: {str(e)}")
+
+
 @app.post("/api/ai/apply-optimization")
 async def apply_optimization_strategy(request: ApplyOptimizationRequest):
     """
@@ -2046,7 +2674,7 @@ async def apply_optimization_strategy(request: ApplyOptimizationRequest):
     Updates tasks and saves changes to disk.
 
     MS Project Compliant:
-    - Updates LinkLag values in minutes (480 min = 1 day)
+    - Updates LinkLag values (stored in days, written to XML as tenth-minutes)
     - Updates Duration in ISO 8601 format (PT{hours}H0M0S)
     - Preserves all MS Project XML schema requirements
     """
@@ -2055,33 +2683,51 @@ async def apply_optimization_strategy(request: ApplyOptimizationRequest):
     if not current_project:
         raise HTTPException(status_code=404, detail="No project loaded")
 
+    # Inside a scenario, apply to a copy of the scenario's project
+    scenario = get_scenario(request.scenario_id) if request.scenario_id else None
+    project = scenario.working_copy(current_project) if scenario else current_project
+
     try:
-        tasks = current_project.get("tasks", [])
+        tasks = project.get("tasks", [])
+        refresh_link_outlines(tasks)
+        index_by_id = {t["id"]: i for i, t in enumerate(tasks)}
+        index_by_outline = {t.get("outline_number"): i for i, t in enumerate(tasks)}
+        hours_per_day = scheduling_engine._day_axis(project, None).hours_per_day
         changes_applied = 0
 
         # Apply each change based on type
         for change in request.changes:
             # Find the task
-            task = next((t for t in tasks if t["id"] == change["task_id"]), None)
-            if not task:
+            task_index = index_by_id.get(change.task_id)
+            if task_index is None:
                 continue
+            task = tasks[task_index]
 
-            if change["change_type"] == "lag_reduction":
-                # Update lag in predecessor relationship
+            if change.change_type == "lag_reduction":
+                # Update lag in predecessor relationship (lags are stored in days)
+                # Match by the predecessor's id; outline numbers go stale after moves
+                target = (index_by_id.get(change.predecessor_id) if change.predecessor_id
+                          else index_by_outline.get(change.predecessor_outline))
                 for pred in task.get("predecessors", []):
-                    if pred["outline_number"] == change.get("predecessor_outline"):
-                        # Update lag in MS Project format (minutes)
-                        new_lag_minutes = int(change["suggested_value"] * 480)
-                        pred["lag"] = new_lag_minutes
+                    if target is not None and link_target(pred, index_by_id, index_by_outline) == target:
+                        pred["lag"] = change.suggested_value
                         changes_applied += 1
-                        print(f"Updated lag for task {task['name']}: {change['current_value']:.1f}d → {change['suggested_value']:.1f}d")
+                        print(f"Updated lag for task {task['name']}: {change.current_value:.1f}d → {change.suggested_value:.1f}d")
 
-            elif change["change_type"] == "duration_compression":
+            elif change.change_type == "duration_compression":
                 # Update task duration in MS Project ISO 8601 format
-                new_duration_hours = int(change["suggested_value"] * 8)
+                new_duration_hours = int(round(change.suggested_value * hours_per_day))
                 task["duration"] = f"PT{new_duration_hours}H0M0S"
                 changes_applied += 1
-                print(f"Compressed task {task['name']}: {change['current_value']:.1f}d → {change['suggested_value']:.1f}d")
+                print(f"Compressed task {task['name']}: {change.current_value:.1f}d → {change.suggested_value:.1f}d")
+
+        if scenario:
+            scenario.update(current_project, project)
+        else:
+            mark_dirty(change.task_id for change in request.changes
+                       if change.change_type == "duration_compression")
+            mark_dirty((change.task_id for change in request.changes
+                        if change.change_type == "lag_reduction"), links=True)
 
         # MANUAL SAVE MODE: Changes kept in memory only until user saves
         # for task in current_project.get("tasks", []):
@@ -2091,7 +2737,7 @@ async def apply_optimization_strategy(request: ApplyOptimizationRequest):
 
         return {
             "success": True,
-            "message": f"Applied {changes_applied} changes successfully. Remember to Save!",
+            "message": f"Applied {changes_applied} changes successfully." + ("" if scenario else " Remember to Save!"),
             "changes_applied": changes_applied,
             "strategy_id": request.strategy_id
         }
@@ -2100,6 +2746,104 @@ async def apply_optimization_strategy(request: ApplyOptimizationRequest):
         raise HTTPException(status_code=500, detail=f"Failed to apply optimization: {str(e)}")
 
 
+# ============================================================================
+# WHAT-IF SCENARIOS
+# ============================================================================
+
+def get_scenario(scenario_id: str):
+    """Scenario layered on the loaded project, or 404"""
+    scenario = scenario_store.get(scenario_id, current_project_id)
+    if not scenario:
+        raise HTTPException(status_code=404, detail=f"Scenario {scenario_id} not found")
+    return scenario
+
+
+@app.get("/api/scenarios")
+async def list_scenarios():
+    """List the what-if scenarios of the current project"""
+    if not current_project_id:
+        raise HTTPException(status_code=404, detail="No project loaded")
+    return {"scenarios": [scenario.to_dict() for scenario in scenario_store.list(current_project_id)]}
+
+
+@app.post("/api/scenarios")
+async def create_scenario(request: ScenarioCreateRequest):
+    """
+    Create a what-if scenario on the current project.
+
+    The scenario is a copy-on-write overlay: nothing is copied now, and only
+    tasks changed inside the scenario are stored. Run AI edits, moves and
+    optimizations in it by passing its scenario_id.
+    """
+    if not current_project or not current_project_id:
+        raise HTTPException(status_code=404, detail="No project loaded")
+    scenario = scenario_store.create(current_project_id, request.name)
+    return {"success": True, "scenario": scenario.to_dict()}
+
+
+@app.get("/api/scenarios/compare")
+async def compare_scenarios(scenario_ids: Optional[str] = None):
+    """
+    Compare scenario finish dates and critical paths against the base project.
+
+    Args:
+        scenario_ids: Comma-separated scenario ids (default: all scenarios of the project)
+    """
+    if not current_project or not current_project_id:
+        raise HTTPException(status_code=404, detail="No project loaded")
+
+    if scenario_ids:
+        scenarios = [get_scenario(scenario_id.strip()) for scenario_id in scenario_ids.split(",") if scenario_id.strip()]
+    else:
+        scenarios = scenario_store.list(current_project_id)
+
+    def outcome(project):
+        finish = scheduling_engine.project_finish(project)
+        critical = critical_path(project.get("tasks", []), project)
+        return {
+            "finish_date": finish["finish_date"],
+            "duration_days": finish["duration_days"],
+            "critical_task_ids": [task["id"] for task in critical["critical_tasks"]]
+        }
+
+    try:
+        base = outcome(current_project)
+        base_critical = set(base["critical_task_ids"])
+        comparisons = []
+        for scenario in scenarios:
+            result = outcome(scenario.project(current_project))
+            critical = set(result["critical_task_ids"])
+            comparisons.append({
+                **scenario.to_dict(),
+                **result,
+                "finish_delta_days": result["duration_days"] - base["duration_days"],
+                "added_to_critical_path": [task_id for task_id in result["critical_task_ids"] if task_id not in base_critical],
+                "removed_from_critical_path": [task_id for task_id in base["critical_task_ids"] if task_id not in critical]
+            })
+        return {"base": base, "scenarios": comparisons}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Scenario comparison failed: {str(e)}")
+
+
+@app.get("/api/scenarios/{scenario_id}")
+async def get_scenario_project(scenario_id: str):
+    """The scenario's view of the project: base tasks with the scenario's changes applied"""
+    if not current_project:
+        raise HTTPException(status_code=404, detail="No project loaded")
+    scenario = get_scenario(scenario_id)
+    return {"scenario": scenario.to_dict(), "project": scenario.project(current_project)}
+
+
+@app.delete("/api/scenarios/{scenario_id}")
+async def delete_scenario(scenario_id: str):
+    """Discard a what-if scenario (the base project is unaffected)"""
+    get_scenario(scenario_id)
+    scenario_store.delete(scenario_id)
+    return {"success": True, "message": "Scenario deleted"}
+
+
 # ============================================================================
 # CALENDAR MANAGEMENT ENDPOINTS
 # ============================================================================
@@ -2116,7 +2860,7 @@ async def get_calendar():
         raise HTTPException(status_code=404, detail="No project loaded")
 
     try:
-        calendar = db.get_project_calendar(current_project_id)
+        calendar = await adb.get_project_calendar(current_project_id)
         return calendar
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get calendar: {str(e)}")
@@ -2135,7 +2879,7 @@ async def update_calendar(calendar: ProjectCalendar):
 
     try:
         # Save calendar settings
-        db.save_project_calendar(
+        await adb.save_project_calendar(
             current_project_id,
             calendar.work_week,
             calendar.hours_per_day
@@ -2143,23 +2887,24 @@ async def update_calendar(calendar: ProjectCalendar):
 
         # Update exceptions if provided
         # First, get existing exceptions to compare
-        existing = db.get_calendar_exceptions(current_project_id)
+        existing = await adb.get_calendar_exceptions(current_project_id)
         existing_dates = {e['exception_date'] for e in existing}
         new_dates = {e.exception_date for e in calendar.exceptions}
 
         # Remove exceptions that are no longer in the list
         for exc in existing:
             if exc['exception_date'] not in new_dates:
-                db.remove_calendar_exception(current_project_id, exc['exception_date'])
+                await adb.remove_calendar_exception(current_project_id, exc['exception_date'])
 
         # Add or update exceptions
         for exc in calendar.exceptions:
-            db.add_calendar_exception(
+            await adb.add_calendar_exception(
                 current_project_id,
                 exc.exception_date,
                 exc.name,
                 exc.is_working
             )
+        calendar_cache.invalidate(current_project_id)
 
         return {"success": True, "message": "Calendar updated successfully"}
     except Exception as e:
@@ -2177,12 +2922,13 @@ async def add_calendar_exception(exception: CalendarExceptionCreate):
         raise HTTPException(status_code=404, detail="No project loaded")
 
     try:
-        exception_id = db.add_calendar_exception(
+        exception_id = await adb.add_calendar_exception(
             current_project_id,
             exception.exception_date,
             exception.name,
             exception.is_working
         )
+        calendar_cache.invalidate(current_project_id)
 
         return {
             "success": True,
@@ -2205,9 +2951,10 @@ async def remove_calendar_exception(exception_date: str):
         raise HTTPException(status_code=404, detail="No project loaded")
 
     try:
-        removed = db.remove_calendar_exception(current_project_id, exception_date)
+        removed = await adb.remove_calendar_exception(current_project_id, exception_date)
 
         if removed:
+            calendar_cache.invalidate(current_project_id)
             return {"success": True, "message": f"Exception removed for {exception_date}"}
         else:
             raise HTTPException(status_code=404, detail=f"No exception found for {exception_date}")
@@ -2232,8 +2979,8 @@ async def get_baselines():
         raise HTTPException(status_code=400, detail="No project loaded")
 
     try:
-        baselines = db.get_project_baselines(current_project_id)
-        tasks = db.get_tasks(current_project_id)
+        baselines = await adb.get_project_baselines(current_project_id)
+        tasks = await adb.get_tasks(current_project_id)
 
         baseline_infos = [
             BaselineInfo(
@@ -2264,7 +3011,7 @@ async def set_baseline(request: SetBaselineRequest):
         raise HTTPException(status_code=400, detail="No project loaded")
 
     try:
-        count = db.set_baseline(
+        count = await adb.set_baseline(
             current_project_id,
             request.baseline_number,
             request.task_ids
@@ -2294,7 +3041,7 @@ async def clear_baseline(request: ClearBaselineRequest):
         raise HTTPException(status_code=400, detail="No project loaded")
 
     try:
-        count = db.clear_baseline(
+        count = await adb.clear_baseline(
             current_project_id,
             request.baseline_number,
             request.task_ids
@@ -2340,9 +3087,9 @@ async def execute_ai_edit_command(request: AIEditCommandRequest):
         target_project_id = current_project_id
 
         if request.project_id:
-            project_data = db.get_project(request.project_id)
+            project_data = await adb.get_project(request.project_id)
             if project_data:
-                tasks = db.get_tasks(request.project_id)
+                tasks = await adb.get_tasks(request.project_id)
                 target_project = {
                     "name": project_data["name"],
                     "start_date": project_data["start_date"],
@@ -2356,6 +3103,14 @@ async def execute_ai_edit_command(request: AIEditCommandRequest):
         if not target_project:
             raise HTTPException(status_code=404, detail="No project loaded")
 
+        # Inside a scenario, commands see the scenario's project and edits go to its overlay
+        scenario = None
+        if request.scenario_id:
+            if target_project_id != current_project_id:
+                raise HTTPException(status_code=400, detail="Scenarios apply to the current project only")
+            scenario = get_scenario(request.scenario_id)
+            target_project = scenario.project(current_project)
+
         # Parse the command
         command = ai_project_editor.parse_command(request.command)
 
@@ -2363,12 +3118,17 @@ async def execute_ai_edit_command(request: AIEditCommandRequest):
             # Try the basic command handler as fallback
             basic_command = ai_command_handler.parse_command(request.command)
             if basic_command:
+                if scenario:
+                    # Basic commands edit in place
+                    target_project = scenario.working_copy(current_project)
                 result = ai_command_handler.execute_command(basic_command, target_project)
 
                 # MANUAL SAVE MODE: Changes kept in memory only until user saves
                 if result["success"]:
+                    if scenario:
+                        scenario.update(current_project, target_project)
                     # Update in-memory if this is the current project
-                    if target_project_id == current_project_id:
+                    elif target_project_id == current_project_id:
                         current_project = target_project
                     # Note: User must click Save to persist changes
 
@@ -2395,8 +3155,10 @@ async def execute_ai_edit_command(request: AIEditCommandRequest):
             # Update the project with modified tasks
             updated_project = result.get("project", target_project)
 
-            # Update in-memory state if this is the current project
-            if target_project_id == current_project_id:
+            # Update the scenario overlay, or in-memory state if this is the current project
+            if scenario:
+                scenario.update(current_project, updated_project)
+            elif target_project_id == current_project_id:
                 current_project = updated_project
 
             # MANUAL SAVE MODE: Changes kept in memory only until user saves
@@ -2461,9 +3223,9 @@ async def get_ai_suggestions(request: AISuggestionRequest):
         target_project_id = current_project_id
 
         if request.project_id:
-            project_data = db.get_project(request.project_id)
+            project_data = await adb.get_project(request.project_id)
             if project_data:
-                tasks = db.get_tasks(request.project_id)
+                tasks = await adb.get_tasks(request.project_id)
                 target_project = {
                     "name": project_data["name"],
                     "start_date": project_data["start_date"],
@@ -2542,9 +3304,10 @@ async def get_ai_suggestions(request: AISuggestionRequest):
         # Analyze for phase reorganization opportunities
         if request.suggestion_type in ["all", "phases", "reorganize"]:
             phases = [t for t in tasks if t.get("summary") and t.get("outline_level", 0) == 1]
+            index = WBSIndex(tasks)
 
             for phase in phases:
-                children = ai_project_editor._get_direct_children(tasks, phase["outline_number"])
+                children = ai_project_editor._get_direct_children(tasks, phase["outline_number"], index)
                 if len(children) >= 3:
                     # Check if children are in good order
                     categories = [ai_project_editor._detect_construction_category(c["name"]) for c in children]
@@ -2644,19 +3407,19 @@ async def learn_from_projects(request: TemplateLearnRequest):
         if request.project_ids:
             projects = []
             for pid in request.project_ids[:request.max_projects]:
-                project_data = db.get_project(pid)
+                project_data = await adb.get_project(pid)
                 if project_data:
-                    tasks = db.get_tasks(pid)
+                    tasks = await adb.get_tasks(pid)
                     projects.append({
                         "name": project_data["name"],
                         "tasks": tasks
                     })
         else:
             # Get all projects
-            all_projects = db.list_projects()
+            all_projects = await adb.list_projects()
             projects = []
             for p in all_projects[:request.max_projects]:
-                tasks = db.get_tasks(p['id'])
+                tasks = await adb.get_tasks(p['id'])
                 projects.append({
                     "name": p["name"],
                     "tasks": tasks
@@ -2742,9 +3505,9 @@ async def generate_project_from_template(
         historical_data = []
 
         if use_learned_patterns:
-            all_projects = db.list_projects()
+            all_projects = await adb.list_projects()
             for p in all_projects[:10]:  # Use up to 10 projects for learning
-                tasks = db.get_tasks(p['id'])
+                tasks = await adb.get_tasks(p['id'])
                 historical_data.append({
                     "name": p["name"],
                     "tasks": tasks
@@ -2768,7 +3531,7 @@ async def generate_project_from_template(
         tasks = result.get("tasks", [])
 
         # Create new project
-        project_id = db.create_project(
+        project_id = await adb.create_project(
             name=project_name,
             start_date=start_date,
             status_date=start_date
@@ -2780,10 +3543,11 @@ async def generate_project_from_template(
             task["id"] = str(uuid.uuid4())
             task["uid"] = task["id"]
             task["project_id"] = project_id
+        relink_by_outline(tasks)
 
         # Insert generated tasks
         if tasks:
-            db.bulk_create_tasks(project_id, tasks)
+            await adb.bulk_create_tasks(project_id, tasks)
 
         # Update in-memory state
         current_project = {
@@ -22,6 +22,7 @@ class Predecessor(BaseModel):
     type: int = Field(default=1, description="Dependency type: 0=FF, 1=FS, 2=SF, 3=SS (per MS Project XML schema)")
     lag: int = Field(default=0, description="Lag time in the specified format")
     lag_format: int = Field(default=7, description="Lag format: 7=days, 8=hours")
+    predecessor_id: Optional[str] = Field(default=None, description="Id of the predecessor task; set by the server from the outline number")
 
 
 class TaskBaseline(BaseModel):
@@ -77,6 +78,31 @@ class TaskUpdate(BaseModel):
     finish_date: Optional[str] = None
 
 
+class TaskOperation(BaseModel):
+    """One operation in a batch task edit"""
+    op: str = Field(..., description="Operation: 'create', 'update', 'delete' or 'move'")
+    task_id: Optional[str] = Field(default=None, description="Task to update, delete or move (id or outline number)")
+    task: Optional[Dict[str, Any]] = Field(default=None, description="Fields of the new task (create, as TaskCreate) or the changed fields (update, as TaskUpdate)")
+    target_id: Optional[str] = Field(default=None, description="Move: id of the target task")
+    target_outline: Optional[str] = Field(default=None, description="Move: outline number of the target task")
+    position: Optional[str] = Field(default=None, description="Move: 'under', 'before' or 'after' the target")
+
+
+class TaskBatchRequest(BaseModel):
+    """Ordered task operations applied as one transaction"""
+    operations: List[TaskOperation] = Field(..., description="Operations, applied in order")
+    scenario_id: Optional[str] = Field(default=None, description="Apply inside this what-if scenario")
+
+
+class CloneSubtreeRequest(BaseModel):
+    """Request to clone a task and its subtree (e.g. a building section) several times"""
+    copies: int = Field(..., ge=1, le=200, description="Number of copies to insert")
+    after_task_id: Optional[str] = Field(default=None, description="Insert the copies after this task (default: after the source)")
+    chain: bool = Field(default=False, description="Make each copy start after the previous one finishes")
+    number_names: bool = Field(default=True, description="Count up a trailing number in the name (Building 1 -> Building 2)")
+    scenario_id: Optional[str] = Field(default=None, description="Clone inside this what-if scenario")
+
+
 class Task(TaskBase):
     """Full task model with all fields"""
     id: str = Field(..., description="Unique task ID")
@@ -142,6 +168,24 @@ class GenerateProjectRequest(BaseModel):
 class OptimizeDurationRequest(BaseModel):
     """Request to optimize project duration"""
     target_days: int = Field(..., description="Target project duration in days", gt=0)
+    scenario_id: Optional[str] = Field(default=None, description="Optimize this what-if scenario instead of the project")
+
+class ScheduleRiskRequest(BaseModel):
+    """Request for a Monte Carlo schedule risk simulation"""
+    iterations: int = Field(default=10000, description="Number of CPM iterations", ge=1, le=100000)
+    distribution: str = Field(default="pert", description="Duration distribution: pert or triangular")
+    optimistic_factor: float = Field(default=0.8, description="Optimistic duration as a fraction of planned", ge=0, le=1)
+    pessimistic_factor: float = Field(default=1.5, description="Pessimistic duration as a multiple of planned", ge=1)
+    use_learned_norms: bool = Field(default=False, description="Use category duration spreads learned from saved projects")
+    max_projects: int = Field(default=10, description="Maximum number of projects to learn norms from")
+    workers: int = Field(default=0, description="Worker processes for batches (0 = in-process)", ge=0, le=32)
+    seed: Optional[int] = Field(default=None, description="Random seed for repeatable results")
+
+class DurationCostCurveRequest(BaseModel):
+    """Request for the duration-vs-cost tradeoff curve over a range of targets"""
+    min_days: int = Field(..., description="Tightest target duration in days", gt=0)
+    max_days: Optional[int] = Field(default=None, description="Loosest target duration in days (default: current duration)")
+    step_days: int = Field(default=1, description="Spacing between target durations in days", ge=1)
 
 class OptimizationChange(BaseModel):
     """Represents a single change in an optimization strategy"""
@@ -158,9 +202,19 @@ class OptimizationChange(BaseModel):
 
     # MS Project specific fields
     predecessor_outline: Optional[str] = Field(default=None, description="For lag changes: predecessor outline number")
+    predecessor_id: Optional[str] = Field(default=None, description="For lag changes: predecessor task ID")
     lag_format: Optional[int] = Field(default=7, description="MS Project lag format: 7=days, 8=hours")
     duration_format: Optional[str] = Field(default=None, description="MS Project duration format (ISO 8601)")
 
+class CrashingStep(BaseModel):
+    """One step of a crashing plan, with its savings measured by re-running CPM"""
+    step: int = Field(..., description="Step number")
+    elements: List[str] = Field(default_factory=list, description="Durations and lags cut together in this step")
+    cut_days: float = Field(..., description="Days cut from each element")
+    savings_days: float = Field(..., description="Actual reduction of the project duration")
+    cost_usd: float = Field(default=0, description="Cost of this step in USD")
+    project_duration_days: float = Field(..., description="Project duration after this step")
+
 class OptimizationStrategy(BaseModel):
     """Represents a complete optimization strategy"""
     strategy_id: str = Field(..., description="Unique strategy identifier")
@@ -172,6 +226,8 @@ class OptimizationStrategy(BaseModel):
     recommended: bool = Field(default=False, description="Whether this is the recommended strategy")
     description: str = Field(..., description="Strategy description")
     changes: List[OptimizationChange] = Field(..., description="List of changes in this strategy")
+    steps: List[CrashingStep] = Field(default_factory=list, description="Crashing steps with their actual savings")
+    achieves_target: bool = Field(default=False, description="Whether this strategy alone reaches the target duration")
 
     # Impact analysis
     tasks_affected: int = Field(..., description="Number of tasks affected")
@@ -192,6 +248,13 @@ class ApplyOptimizationRequest(BaseModel):
     """Request to apply an optimization strategy"""
     strategy_id: str = Field(..., description="ID of strategy to apply")
     changes: List[OptimizationChange] = Field(..., description="Changes to apply")
+    scenario_id: Optional[str] = Field(default=None, description="Apply to this what-if scenario instead of the project")
+
+
+# What-if Scenario Models
+class ScenarioCreateRequest(BaseModel):
+    """Request to create a what-if scenario on the current project"""
+    name: str = Field(..., description="Scenario name", min_length=1)
 
 
 # Calendar Models
@@ -254,6 +317,7 @@ class AIEditCommandRequest(BaseModel):
     """Request to execute an AI project editing command"""
     command: str = Field(..., description="Natural language command to execute (e.g., 'move task 1.3 under phase 2')")
     project_id: Optional[str] = Field(default=None, description="Optional project ID. Uses current project if not specified.")
+    scenario_id: Optional[str] = Field(default=None, description="Run the command inside this what-if scenario")
 
 
 class AIEditChange(BaseModel):
@@ -0,0 +1,323 @@
+"""
+What-if Scenarios for Sturgis Project
+Copy-on-write overlays on a base project: only what differs from the base is stored
+"""
+import uuid
+from copy import deepcopy
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+_MISSING = object()
+
+
+def _plain(value: Any) -> Any:
+    """Value with TaskCopy and nested copy wrappers turned back into plain dicts and lists"""
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_plain(item) for item in value]
+    return value
+
+
+class _NestedDict(dict):
+    """Dict inside a TaskCopy (e.g. one predecessor); writes mark the task touched"""
+
+    __slots__ = ("owner",)
+
+    def __setitem__(self, key, value):
+        if dict.get(self, key, _MISSING) != value:
+            self.owner.touched = True
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self.owner.touched = True
+        dict.__delitem__(self, key)
+
+    def pop(self, key, *default):
+        if key in self:
+            self.owner.touched = True
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        self.owner.touched = True
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.owner.touched = True
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        self.owner.touched = True
+        dict.update(self, *args, **kwargs)
+
+    def clear(self):
+        self.owner.touched = True
+        dict.clear(self)
+
+    def __copy__(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def __deepcopy__(self, memo) -> Dict[str, Any]:
+        return deepcopy(_plain(self), memo)
+
+
+class _NestedList(list):
+    """List inside a TaskCopy (e.g. predecessors); changes mark the task touched"""
+
+    __slots__ = ("owner",)
+
+    def __setitem__(self, index, value):
+        self.owner.touched = True
+        list.__setitem__(self, index, value)
+
+    def __delitem__(self, index):
+        self.owner.touched = True
+        list.__delitem__(self, index)
+
+    def __iadd__(self, values):
+        self.owner.touched = True
+        return list.__iadd__(self, values)
+
+    def __imul__(self, count):
+        self.owner.touched = True
+        return list.__imul__(self, count)
+
+    def append(self, value):
+        self.owner.touched = True
+        list.append(self, value)
+
+    def extend(self, values):
+        self.owner.touched = True
+        list.extend(self, values)
+
+    def insert(self, index, value):
+        self.owner.touched = True
+        list.insert(self, index, value)
+
+    def pop(self, *index):
+        self.owner.touched = True
+        return list.pop(self, *index)
+
+    def remove(self, value):
+        self.owner.touched = True
+        list.remove(self, value)
+
+    def clear(self):
+        self.owner.touched = True
+        list.clear(self)
+
+    def sort(self, *args, **kwargs):
+        self.owner.touched = True
+        list.sort(self, *args, **kwargs)
+
+    def reverse(self):
+        self.owner.touched = True
+        list.reverse(self)
+
+    def __copy__(self) -> List[Any]:
+        return list(self)
+
+    def __deepcopy__(self, memo) -> List[Any]:
+        return deepcopy(_plain(self), memo)
+
+
+class TaskCopy(dict):
+    """
+    Task of a scenario working copy, copied on write.
+
+    A shallow copy of the task whose nested lists and dicts (predecessors,
+    baselines), at any depth, are copied into wrappers, so nothing written through it
+    reaches the base task. Any change, at the top level or inside a nested
+    value, marks it touched; writes that store the value already there do
+    not. Scenario.update compares only touched tasks with the base.
+    """
+
+    __slots__ = ("touched",)
+
+    def __init__(self, task: Dict[str, Any]):
+        dict.__init__(self, task)
+        self.touched = False
+        for key, value in task.items():
+            if isinstance(value, (list, dict)):
+                dict.__setitem__(self, key, self._wrap(value))
+
+    def _wrap(self, value):
+        """Copy of a nested list or dict, at any depth, that reports changes to this task"""
+        if isinstance(value, list):
+            wrapped = _NestedList([self._wrap(item) if isinstance(item, (list, dict)) else item for item in value])
+        else:
+            wrapped = _NestedDict(value)
+            for key, item in value.items():
+                if isinstance(item, (list, dict)):
+                    dict.__setitem__(wrapped, key, self._wrap(item))
+        wrapped.owner = self
+        return wrapped
+
+    def __setitem__(self, key, value):
+        if dict.get(self, key, _MISSING) != value:
+            self.touched = True
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key):
+        self.touched = True
+        dict.__delitem__(self, key)
+
+    def pop(self, key, *default):
+        if key in self:
+            self.touched = True
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        self.touched = True
+        return dict.popitem(self)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.touched = True
+        return dict.setdefault(self, key, default)
+
+    def update(self, *args, **kwargs):
+        self.touched = True
+        dict.update(self, *args, **kwargs)
+
+    def clear(self):
+        self.touched = True
+        dict.clear(self)
+
+    def __copy__(self) -> Dict[str, Any]:
+        return dict(self)
+
+    def __deepcopy__(self, memo) -> Dict[str, Any]:
+        return deepcopy(_plain(self), memo)
+
+
+class Scenario:
+    """
+    Named what-if overlay on a base project.
+
+    Stores only the tasks that differ from the base (modified or added, by
+    id), the ids of deleted tasks, the task order when it differs, and any
+    changed project fields (e.g. start_date). Reads fall through to the base,
+    so creating a scenario copies nothing and edits to base tasks the
+    scenario has not touched show through.
+    """
+
+    def __init__(self, name: str, project_id: str):
+        self.id = str(uuid.uuid4())
+        self.name = name
+        self.project_id = project_id
+        self.created_at = datetime.now().isoformat()
+        self.overrides: Dict[str, Dict[str, Any]] = {}
+        self.deleted: set = set()
+        self.order: Optional[List[str]] = None
+        self.fields: Dict[str, Any] = {}
+
+    def tasks(self, base_tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Task list of the scenario. Untouched entries are the base task dicts
+        themselves: treat the list as read-only and edit through working_copy().
+        """
+        if self.order is None:
+            return [self.overrides.get(t["id"], t) for t in base_tasks if t["id"] not in self.deleted]
+
+        base_by_id = {t["id"]: t for t in base_tasks}
+        view = [self.overrides.get(task_id) or base_by_id[task_id]
+                for task_id in self.order if task_id in self.overrides or task_id in base_by_id]
+        # Tasks added to the base after the scenario was reordered go last
+        ordered = set(self.order)
+        view.extend(t for t in base_tasks if t["id"] not in ordered and t["id"] not in self.deleted)
+        return view
+
+    def project(self, base_project: Dict[str, Any]) -> Dict[str, Any]:
+        """Read-only project dict of the scenario"""
+        return {**base_project, **self.fields, "tasks": self.tasks(base_project.get("tasks", []))}
+
+    def working_copy(self, base_project: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Editable project of the scenario for operations that edit in place.
+
+        The task list is new and its tasks are TaskCopy entries: shallow
+        copies that record whether an operation changed them.
+        """
+        return {**base_project, **deepcopy(self.fields),
+                "tasks": [TaskCopy(task) for task in self.tasks(base_project.get("tasks", []))]}
+
+    def update(self, base_project: Dict[str, Any], edited_project: Dict[str, Any]) -> None:
+        """
+        Fold an edited working copy into the overlay, keeping only what differs from the base.
+
+        Only touched tasks (and tasks that are not TaskCopy entries, e.g. new
+        ones) are compared with the base; untouched ones keep their current
+        override, if any.
+        """
+        base_tasks = base_project.get("tasks", [])
+        tasks = edited_project.get("tasks", [])
+        base_by_id = {t["id"]: t for t in base_tasks}
+
+        overrides = {}
+        for task in tasks:
+            task_id = task["id"]
+            if isinstance(task, TaskCopy) and not task.touched:
+                if task_id in self.overrides:
+                    overrides[task_id] = self.overrides[task_id]
+                continue
+            edited = _plain(task)
+            if base_by_id.get(task_id) != edited:
+                overrides[task_id] = edited
+        self.overrides = overrides
+
+        ids = [t["id"] for t in tasks]
+        kept = set(ids)
+        self.deleted = {task_id for task_id in base_by_id if task_id not in kept}
+        self.order = None if ids == [t["id"] for t in base_tasks if t["id"] not in self.deleted] else ids
+        self.fields = {
+            key: value for key, value in edited_project.items()
+            if key != "tasks" and base_project.get(key) != value
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "project_id": self.project_id,
+            "created_at": self.created_at,
+            "changed_tasks": len(self.overrides),
+            "deleted_tasks": len(self.deleted),
+            "reordered": self.order is not None,
+            "changed_fields": sorted(self.fields)
+        }
+
+
+class ScenarioStore:
+    """In-memory scenarios by id (like the loaded project, kept until the server restarts)"""
+
+    def __init__(self):
+        self._scenarios: Dict[str, Scenario] = {}
+
+    def create(self, project_id: str, name: str) -> Scenario:
+        scenario = Scenario(name, project_id)
+        self._scenarios[scenario.id] = scenario
+        return scenario
+
+    def get(self, scenario_id: str, project_id: Optional[str] = None) -> Optional[Scenario]:
+        """Scenario by id; None if missing or layered on another project"""
+        scenario = self._scenarios.get(scenario_id)
+        if scenario is None or (project_id is not None and scenario.project_id != project_id):
+            return None
+        return scenario
+
+    def list(self, project_id: str) -> List[Scenario]:
+        return [s for s in self._scenarios.values() if s.project_id == project_id]
+
+    def delete(self, scenario_id: str) -> bool:
+        return self._scenarios.pop(scenario_id, None) is not None
+
+    def drop_project(self, project_id: str) -> None:
+        """Forget every scenario of a deleted project"""
+        for scenario in self.list(project_id):
+            del self._scenarios[scenario.id]
+
+
+# Singleton instance
+scenario_store = ScenarioStore()
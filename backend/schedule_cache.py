@@ -0,0 +1,73 @@
+"""
+Schedule Cache for Sturgis Project
+Per-project schedule version counter, with derived results cached against it
+"""
+from typing import Any, Callable, Dict, Optional
+
+
+class ScheduleCache:
+    """
+    Version-keyed cache for results derived from a project's schedule.
+
+    Every mutation of a project bumps its version. A cached value is only
+    returned while the version it was computed for is still current, so
+    repeated reads between edits (e.g. browsing the Gantt) never recompute.
+    Cached values live here, never in the task dicts. A write that keeps a
+    value current itself (e.g. rolls summaries up incrementally) can carry
+    it over its own bump instead of having it recomputed from scratch.
+    """
+
+    def __init__(self):
+        self._versions: Dict[str, int] = {}
+        # project_id -> {key: (version, value)}
+        self._entries: Dict[str, Dict[str, tuple]] = {}
+        # project_id -> {key: value} to keep across the next bump
+        self._carried: Dict[str, Dict[str, Any]] = {}
+
+    def version(self, project_id: Optional[str]) -> int:
+        """Current schedule version of a project"""
+        return self._versions.get(project_id, 0)
+
+    def bump(self, project_id: Optional[str]) -> int:
+        """Record a mutation: advance the version and drop cached results"""
+        if not project_id:
+            return 0
+        version = self._versions.get(project_id, 0) + 1
+        self._versions[project_id] = version
+        self._entries.pop(project_id, None)
+        carried = self._carried.pop(project_id, None)
+        if carried:
+            self._entries[project_id] = {key: (version, value) for key, value in carried.items()}
+        return version
+
+    def get(self, project_id: Optional[str], key: str) -> Optional[Any]:
+        """Cached value for the current version, or None"""
+        entry = self._entries.get(project_id, {}).get(key)
+        if entry is None or entry[0] != self.version(project_id):
+            return None
+        return entry[1]
+
+    def put(self, project_id: Optional[str], key: str, value: Any) -> Any:
+        """Cache a value against the current version"""
+        if project_id:
+            self._entries.setdefault(project_id, {})[key] = (self.version(project_id), value)
+        return value
+
+    def carry(self, project_id: Optional[str], key: str, value: Any) -> None:
+        """
+        Keep a value across the bump that ends the current write. Only for
+        values the write itself has kept up to date.
+        """
+        if project_id:
+            self._carried.setdefault(project_id, {})[key] = value
+
+    def get_or_compute(self, project_id: Optional[str], key: str, compute: Callable[[], Any]) -> Any:
+        """Cached value for the current version, computing and caching it on a miss"""
+        value = self.get(project_id, key)
+        if value is None:
+            value = self.put(project_id, key, compute())
+        return value
+
+
+# Singleton instance
+schedule_cache = ScheduleCache()
@@ -0,0 +1,420 @@
+"""
+Schedule Crashing for Sturgis Project
+Time-cost tradeoff: repeatedly cut the cheapest set of critical activities and re-run CPM
+"""
+import math
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from task_links import link_target
+from scheduling_engine import (
+    CONSTRAINT_ALAP, CONSTRAINT_FNET, CONSTRAINT_MFO, CONSTRAINT_MSO, CONSTRAINT_SNET,
+    LINK_FF, LINK_FS, LINK_SF, ScheduleNetwork, parse_duration_days, scheduling_engine
+)
+
+LAG_REDUCTION_LIMIT = 0.4          # Share of a lag that can be removed
+COMPRESSION_LIMIT = 0.2            # Share of a duration that can be removed (extra crew/overtime)
+MIN_COMPRESSIBLE_DAYS = 2.0        # Shorter tasks are not compressed
+COMPRESSION_COST_PER_DAY = 500.0   # USD per day of compression
+STEP_DAYS = 1.0 / 8                # Cuts are made in whole hours
+MAX_STEPS = 1000
+TOLERANCE = 1e-6
+INF = float("inf")
+
+
+class CrashingOptimizer:
+    """
+    Time-cost crashing of the project duration.
+
+    Each step finds the cheapest set of crashable activities (task durations
+    and link lags) that shortens every critical path at once: a minimum cut
+    of the critical start/finish event graph, which also handles parallel
+    critical paths. The cut is applied for as long as it stays valid (until
+    a capacity runs out or another path becomes critical), early dates are
+    re-propagated from the cut tasks (see SchedulingEngine.forward_from) and
+    the late dates recomputed, and the actual savings are recorded and shared
+    among the elements cut. The loop stops when the target is reached or no
+    finite cut remains.
+    """
+
+    def crash(
+        self,
+        tasks: List[Dict[str, Any]],
+        target_days: float,
+        constraint_offset: Optional[Callable[[Optional[str]], Optional[float]]] = None,
+        compress_tasks: bool = True,
+        reduce_lags: bool = True,
+        checkpoints: Optional[List[float]] = None,
+        hours_per_day: float = 8
+    ) -> Dict[str, Any]:
+        """
+        Build the minimum-cost crashing plan to reach target_days.
+
+        Args:
+            tasks: Task dicts (not modified)
+            target_days: Target project duration in days
+            constraint_offset: Converts a constraint date to days from project start
+            compress_tasks: Allow compressing task durations
+            reduce_lags: Allow reducing link lags
+            checkpoints: Intermediate durations no step may cut past, so the
+                         plan passes through each of them exactly
+            hours_per_day: Working hours per day (the project calendar's), for
+                           hour durations and lags
+
+        Returns:
+            Dict with baseline/final duration, whether the target was reached,
+            total savings and cost, the steps taken and the resulting changes
+            (one per task or link, in the optimizer's change format)
+        """
+        network = ScheduleNetwork(tasks, hours_per_day=hours_per_day)
+        constraints = scheduling_engine._resolve_constraints(network, constraint_offset)
+        result = scheduling_engine.compute(tasks, constraint_offset, network=network)
+        baseline = result.project_end
+        # Cuts are re-evaluated by a forward pass over the tasks downstream of
+        # them; ALAP tasks have their early dates moved by compute() afterwards,
+        # so with any of those every step re-runs the whole CPM
+        incremental = not any(c and c[0] == CONSTRAINT_ALAP for c in constraints)
+
+        # Remaining crash capacity (days) per element: ("task", i) or ("lag", i, k)
+        capacity: Dict[tuple, float] = {}
+        for i, task in enumerate(tasks):
+            duration = network.durations[i]
+            if (compress_tasks and not task.get("summary") and not task.get("milestone")
+                    and duration > MIN_COMPRESSIBLE_DAYS):
+                capacity[("task", i)] = self._whole_steps(duration * COMPRESSION_LIMIT)
+            if reduce_lags:
+                for k, (_, _, lag) in enumerate(network.preds[i]):
+                    if lag > 0:
+                        capacity[("lag", i, k)] = self._whole_steps(lag * LAG_REDUCTION_LIMIT)
+        capacity = {element: days for element, days in capacity.items() if days >= STEP_DAYS}
+
+        stops = sorted({c for c in checkpoints or [] if c > target_days} | {target_days}, reverse=True)
+        steps = []
+        cut_totals: Dict[tuple, float] = {}
+        element_savings: Dict[tuple, float] = {}
+        stop_reason = "Target reached"
+        while result.project_end > target_days + TOLERANCE:
+            if len(steps) >= MAX_STEPS:
+                stop_reason = "Step limit reached"
+                break
+            cut = self._cheapest_cut(network, result, constraints, capacity)
+            if cut is None:
+                stop_reason = "No crashable activities left on the critical path"
+                break
+
+            # Cut as far as every element allows, but no further than the next
+            # checkpoint or the point where a parallel path with float becomes critical
+            next_stop = next(stop for stop in stops if stop < result.project_end - TOLERANCE)
+            amount = min(capacity[element] for element in cut)
+            amount = min(amount, result.project_end - next_stop, self._smallest_float(result))
+            amount = max(self._whole_steps(amount), STEP_DAYS)
+            amount = min(amount, min(capacity[element] for element in cut))
+
+            before = result.project_end
+            for element in cut:
+                self._shorten(network, element, amount)
+            if incremental:
+                moved = scheduling_engine.forward_from(network, result, constraints, [element[1] for element in cut])
+            else:
+                result = scheduling_engine.compute(tasks, constraint_offset, network=network)
+            savings = before - result.project_end
+
+            if savings <= TOLERANCE:
+                # Not effective (e.g. a start-to-start chain); undo and rule the cut out
+                for element in cut:
+                    self._shorten(network, element, -amount)
+                    capacity.pop(element)
+                if incremental:
+                    scheduling_engine.restore(result, moved, before)
+                else:
+                    result = scheduling_engine.compute(tasks, constraint_offset, network=network)
+                continue
+            if incremental:
+                scheduling_engine._backward_pass(network, result, constraints)
+
+            cost = 0.0
+            for element in cut:
+                capacity[element] -= amount
+                if capacity[element] < STEP_DAYS:
+                    capacity.pop(element)
+                cut_totals[element] = cut_totals.get(element, 0.0) + amount
+                # The step's measured savings, shared by the elements cut together
+                element_savings[element] = element_savings.get(element, 0.0) + savings / len(cut)
+                if element[0] == "task":
+                    cost += amount * COMPRESSION_COST_PER_DAY
+            steps.append({
+                "step": len(steps) + 1,
+                "elements": [self._describe(tasks, network, element) for element in cut],
+                "cut_days": amount,
+                "savings_days": savings,
+                "cost_usd": cost,
+                "project_duration_days": result.project_end
+            })
+
+        changes = [self._change(tasks, network, element, days, element_savings[element])
+                   for element, days in cut_totals.items()]
+        total_cost = sum(step["cost_usd"] for step in steps)
+        print(f"[Crashing] {baseline:.1f} -> {result.project_end:.1f} days (target {target_days}) "
+              f"in {len(steps)} steps, ${total_cost:,.0f}")
+
+        return {
+            "baseline_duration_days": baseline,
+            "final_duration_days": result.project_end,
+            "target_duration_days": target_days,
+            "achieved": result.project_end <= target_days + TOLERANCE,
+            "total_savings_days": baseline - result.project_end,
+            "total_cost_usd": total_cost,
+            "stop_reason": stop_reason,
+            "steps": steps,
+            "changes": changes
+        }
+
+    def cost_curve(
+        self,
+        tasks: List[Dict[str, Any]],
+        targets: List[float],
+        constraint_offset: Optional[Callable[[Optional[str]], Optional[float]]] = None,
+        hours_per_day: float = 8
+    ) -> Dict[str, Any]:
+        """
+        Time-cost tradeoff curve over a set of target durations.
+
+        One crashing run to the tightest target, with every target as a
+        checkpoint: the plan for a looser target is a prefix of the plan for
+        a tighter one, so each point is read off the same steps.
+
+        Returns:
+            Dict with the baseline duration, one point per target (loosest
+            first) and the crashing steps the points are taken from
+        """
+        targets = sorted(set(targets), reverse=True)
+        plan = self.crash(tasks, targets[-1], constraint_offset, checkpoints=targets, hours_per_day=hours_per_day)
+
+        points = []
+        duration, cost, taken = plan["baseline_duration_days"], 0.0, 0
+        steps = plan["steps"]
+        for target in targets:
+            while duration > target + TOLERANCE and taken < len(steps):
+                duration = steps[taken]["project_duration_days"]
+                cost += steps[taken]["cost_usd"]
+                taken += 1
+            points.append({
+                "target_days": target,
+                "achievable": duration <= target + TOLERANCE,
+                "duration_days": duration,
+                "cost_usd": cost,
+                "steps": taken
+            })
+
+        return {
+            "baseline_duration_days": plan["baseline_duration_days"],
+            "points": points,
+            "steps": steps,
+            "stop_reason": plan["stop_reason"]
+        }
+
+    # =========================================================================
+    # MINIMUM CUT OF THE CRITICAL EVENT GRAPH
+    # =========================================================================
+
+    def _cheapest_cut(self, network: ScheduleNetwork, result, constraints, capacity: Dict[tuple, float]) -> Optional[List[tuple]]:
+        """
+        Cheapest set of elements whose shortening shortens every critical path.
+
+        Events are task starts (2i) and finishes (2i + 1). Walking back from
+        the tasks that finish the project along tight links gives the critical
+        event graph; crashable durations and lags are edges with their cost
+        per day as capacity, everything else is uncuttable. Returns None when
+        only an infinite cut exists.
+        """
+        es, ef = result.early_start, result.early_finish
+        end = result.project_end
+        source, sink = -1, -2
+        edges: List[list] = []  # [from, to, capacity, element]
+
+        def cost(element):
+            if element not in capacity:
+                return INF
+            return COMPRESSION_COST_PER_DAY if element[0] == "task" else 0.0
+
+        def tight_links(i, to_finish):
+            target = ef[i] if to_finish else es[i]
+            for k, (p, link_type, lag) in enumerate(network.preds[i]):
+                if (link_type in (LINK_FF, LINK_SF)) != to_finish:
+                    continue
+                from_finish = link_type in (LINK_FS, LINK_FF)
+                value = (ef[p] if from_finish else es[p]) + lag
+                if abs(value - target) < TOLERANCE:
+                    yield 2 * p + (1 if from_finish else 0), ("lag", i, k)
+
+        def pinned(i):
+            constraint = constraints[i]
+            if not constraint:
+                return False
+            constraint_type, offset = constraint
+            duration = network.durations[i]
+            return (constraint_type in (CONSTRAINT_MSO, CONSTRAINT_MFO)
+                    or (constraint_type == CONSTRAINT_SNET and offset >= es[i] - TOLERANCE)
+                    or (constraint_type == CONSTRAINT_FNET and offset - duration >= es[i] - TOLERANCE))
+
+        def start_from_finish(i):
+            # Start derived from a finish-side link (FF/SF) rather than a start-side one
+            return any(True for _ in tight_links(i, True)) and not any(True for _ in tight_links(i, False))
+
+        queue = deque()
+        seen = set()
+        for i in range(len(network.tasks)):
+            if result.scheduled[i] and ef[i] >= end - TOLERANCE:
+                edges.append([2 * i + 1, sink, INF, None])
+                queue.append(2 * i + 1)
+                seen.add(2 * i + 1)
+
+        while queue:
+            event = queue.popleft()
+            i, is_finish = divmod(event, 2)
+            drivers = []
+            if is_finish:
+                drivers.extend(tight_links(i, True))
+                if not start_from_finish(i):
+                    drivers.append((2 * i, ("task", i)))
+            elif pinned(i) or es[i] <= TOLERANCE:
+                edges.append([source, event, INF, None])
+            else:
+                drivers.extend(tight_links(i, False))
+                if start_from_finish(i):
+                    drivers.append((2 * i + 1, None))
+            for driver, element in drivers:
+                edges.append([driver, event, cost(element) if element else INF, element])
+                if driver not in seen:
+                    seen.add(driver)
+                    queue.append(driver)
+
+        return self._min_cut(edges, source, sink)
+
+    def _min_cut(self, edges: List[list], source: int, sink: int) -> Optional[List[tuple]]:
+        """Edmonds-Karp max flow; returns the elements on the minimum cut"""
+        graph: Dict[int, List[int]] = {}
+        residual = []
+        for index, (u, v, cap, _) in enumerate(edges):
+            graph.setdefault(u, []).append(2 * index)
+            graph.setdefault(v, []).append(2 * index + 1)
+            residual.extend([cap, 0.0])
+
+        def head(arc):
+            return edges[arc // 2][1] if arc % 2 == 0 else edges[arc // 2][0]
+
+        while True:
+            parent_arc = {source: None}
+            queue = deque([source])
+            while queue and sink not in parent_arc:
+                node = queue.popleft()
+                for arc in graph.get(node, []):
+                    nxt = head(arc)
+                    if residual[arc] > TOLERANCE and nxt not in parent_arc:
+                        parent_arc[nxt] = arc
+                        queue.append(nxt)
+            if sink not in parent_arc:
+                break
+            path = []
+            node = sink
+            while parent_arc[node] is not None:
+                arc = parent_arc[node]
+                path.append(arc)
+                node = edges[arc // 2][0] if arc % 2 == 0 else edges[arc // 2][1]
+            flow = min(residual[arc] for arc in path)
+            if flow == INF:
+                return None
+            for arc in path:
+                residual[arc] -= flow
+                residual[arc ^ 1] += flow
+
+        reachable = set(parent_arc)
+        cut = [element for u, v, cap, element in edges if u in reachable and v not in reachable]
+        if not cut or any(element is None for element in cut):
+            return None
+        return list(dict.fromkeys(cut))
+
+    # =========================================================================
+    # HELPERS
+    # =========================================================================
+
+    def _smallest_float(self, result) -> float:
+        """Smallest positive total float: how far a cut stays valid"""
+        floats = (
+            result.late_start[i] - result.early_start[i]
+            for i in range(len(result.early_start))
+            if result.scheduled[i]
+        )
+        return min((value for value in floats if value > TOLERANCE), default=INF)
+
+    def _whole_steps(self, days: float) -> float:
+        return math.floor(days / STEP_DAYS + TOLERANCE) * STEP_DAYS
+
+    def _shorten(self, network: ScheduleNetwork, element: tuple, days: float) -> None:
+        if element[0] == "task":
+            network.durations[element[1]] -= days
+            return
+        _, i, k = element
+        p, link_type, lag = network.preds[i][k]
+        network.preds[i][k] = (p, link_type, lag - days)
+        succs = network.succs[p]
+        position = succs.index((i, link_type, lag))
+        succs[position] = (i, link_type, lag - days)
+
+    def _describe(self, tasks: List[Dict[str, Any]], network: ScheduleNetwork, element: tuple) -> str:
+        if element[0] == "task":
+            return f"Compress {tasks[element[1]].get('name', '')}"
+        _, i, k = element
+        return f"Lag {tasks[network.preds[i][k][0]].get('name', '')} -> {tasks[i].get('name', '')}"
+
+    def _change(self, tasks: List[Dict[str, Any]], network: ScheduleNetwork, element: tuple, days: float,
+                savings: float) -> Dict[str, Any]:
+        """Optimizer change dict (see models.OptimizationChange) for a crashed element cut by days"""
+        if element[0] == "task":
+            task = tasks[element[1]]
+            current = parse_duration_days(task.get("duration"), network.hours_per_day)
+            suggested = current - days
+            return {
+                "task_id": task["id"],
+                "task_name": task.get("name", ""),
+                "task_outline": task.get("outline_number", ""),
+                "change_type": "duration_compression",
+                "current_value": current,
+                "suggested_value": suggested,
+                "savings_days": savings,
+                "cost_usd": days * COMPRESSION_COST_PER_DAY,
+                "risk_level": "Medium",
+                "description": f"Compress from {current:.1f} to {suggested:.1f} days (add crew/overtime)",
+                "duration_format": f"PT{int(round(suggested * network.hours_per_day))}H0M0S"
+            }
+
+        _, i, k = element
+        task = tasks[i]
+        predecessor = tasks[network.preds[i][k][0]]
+        current = network.preds[i][k][2] + days
+        suggested = current - days
+        pred = next(
+            (pred for pred in task.get("predecessors", [])
+             if link_target(pred, network.index_by_id, network.index_by_outline) == network.preds[i][k][0]),
+            {}
+        )
+        return {
+            "task_id": task["id"],
+            "task_name": task.get("name", ""),
+            "task_outline": task.get("outline_number", ""),
+            "change_type": "lag_reduction",
+            "current_value": current,
+            "suggested_value": suggested,
+            "savings_days": savings,
+            "cost_usd": 0,
+            "risk_level": "Low",
+            "description": f"Reduce lag from {current:.1f} to {suggested:.1f} days",
+            "predecessor_outline": predecessor.get("outline_number"),
+            "predecessor_id": predecessor.get("id"),
+            "lag_format": pred.get("lag_format", 7),
+            "new_lag_days": suggested
+        }
+
+
+# Singleton instance
+crashing_optimizer = CrashingOptimizer()
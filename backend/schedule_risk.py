@@ -0,0 +1,221 @@
+"""
+Schedule Risk Simulation for Sturgis Project
+Monte Carlo CPM: sampled task durations run through the level-vectorized passes
+"""
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from scheduling_engine import NUMPY_AVAILABLE, LevelNetwork, ScheduleNetwork, np, scheduling_engine
+
+DISTRIBUTIONS = ("pert", "triangular")
+MAX_BATCH_CELLS = 2_000_000  # tasks x samples per batch (~16 MB per array)
+CRITICAL_TOLERANCE = 0.01    # days of total float still counted as critical
+MAX_PROCESSES = min(32, os.cpu_count() or 1)  # Size of the shared process pool
+
+# Process pool shared by every simulation, started on first use. Workers are
+# spawned rather than forked: the server calls in from threads.
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(max_workers=MAX_PROCESSES,
+                                                mp_context=multiprocessing.get_context("spawn"))
+        return _process_pool
+
+
+def _sample_durations(rng, low, mode, high, samples: int, distribution: str):
+    """
+    Durations of shape (tasks, samples) from triangular or PERT (scaled beta)
+    distributions. Tasks with no spread (low == high) keep their duration.
+    """
+    duration = np.repeat(mode[:, None], samples, axis=1)
+    spread = high - low
+    varying = spread > 0
+    if not varying.any():
+        return duration
+
+    a, c, b, r = low[varying][:, None], mode[varying][:, None], high[varying][:, None], spread[varying][:, None]
+    if distribution == "triangular":
+        # Inverse CDF, so degenerate modes (c == a or c == b) need no special case
+        u = rng.random((a.shape[0], samples))
+        left = a + np.sqrt(u * r * (c - a))
+        right = b - np.sqrt((1 - u) * r * (b - c))
+        duration[varying] = np.where(u < (c - a) / r, left, right)
+    else:
+        alpha = 1 + 4 * (c - a) / r
+        beta = 1 + 4 * (b - c) / r
+        duration[varying] = a + rng.beta(alpha, beta, (a.shape[0], samples)) * r
+    return duration
+
+
+def _simulate_batch(levels, low, mode, high, samples: int, distribution: str, seed) -> tuple:
+    """One batch of iterations: project finish per sample and critical counts per task"""
+    rng = np.random.default_rng(seed)
+    duration = _sample_durations(rng, low, mode, high, samples, distribution)
+    es, ef, ls, lf, project_end = levels.passes(duration)
+    critical = (np.abs(ls - es) < CRITICAL_TOLERANCE).sum(axis=1)
+    return project_end, critical
+
+
+def _simulate_batches(jobs: List[tuple]) -> List[tuple]:
+    """Several batches in one worker, in order"""
+    return [_simulate_batch(*job) for job in jobs]
+
+
+class ScheduleRiskSimulator:
+    """
+    Monte Carlo schedule risk analysis.
+
+    Each iteration samples every work task's duration and reruns CPM. The
+    samples of a batch are the columns of one duration matrix, and
+    LevelNetwork runs the forward and backward passes over all of them
+    together, one topological level at a time. Batches can be spread over a
+    process pool.
+    """
+
+    def simulate(
+        self,
+        project: Dict[str, Any],
+        iterations: int = 10000,
+        distribution: str = "pert",
+        optimistic_factor: float = 0.8,
+        pessimistic_factor: float = 1.5,
+        duration_norms: Optional[Dict[str, Any]] = None,
+        workers: int = 0,
+        seed: Optional[int] = None,
+        calendar: Optional[Any] = None
+    ) -> Dict[str, Any]:
+        """
+        Simulate the project finish under duration uncertainty.
+
+        Args:
+            project: Project dict (not modified)
+            iterations: Number of CPM iterations
+            distribution: "pert" or "triangular"
+            optimistic_factor: Optimistic duration as a fraction of the planned duration
+            pessimistic_factor: Pessimistic duration as a multiple of the planned duration
+            duration_norms: Learned category norms (ProjectTemplateLearner); a
+                            category's min_ratio/max_ratio replace the factors
+                            for tasks in that category
+            workers: Processes of the shared pool to spread batches over
+                     (0 or 1 runs in-process)
+            seed: Random seed, for repeatable results
+            calendar: CalendarService for finish dates; defaults to the
+                      calendar of the loaded project, if any
+
+        Returns:
+            Dict with P50/P80/P95 finish (days and dates), the deterministic
+            finish, the probability of meeting it and per-task criticality indexes
+        """
+        if not NUMPY_AVAILABLE:
+            raise RuntimeError("NumPy is required for schedule risk simulation")
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution '{distribution}', expected one of {', '.join(DISTRIBUTIONS)}")
+        if iterations < 1:
+            raise ValueError("iterations must be at least 1")
+
+        started = time.perf_counter()
+        tasks = project.get("tasks", [])
+        axis = scheduling_engine._day_axis(project, calendar)
+        network = ScheduleNetwork(tasks, hierarchy=True, hours_per_day=axis.hours_per_day)
+        levels = LevelNetwork(network, scheduling_engine._resolve_constraints(network, axis.offset))
+        mode = levels.duration
+        low, high = self._duration_ranges(tasks, levels, optimistic_factor, pessimistic_factor, duration_norms)
+
+        # Batches bound memory to a few arrays of MAX_BATCH_CELLS floats
+        batch = max(1, min(iterations, MAX_BATCH_CELLS // max(len(tasks), 1)))
+        sizes = [batch] * (iterations // batch) + ([iterations % batch] if iterations % batch else [])
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        jobs = [(levels, low, mode, high, size, distribution, batch_seed) for size, batch_seed in zip(sizes, seeds)]
+        if workers > 1 and len(jobs) > 1:
+            # At most `workers` batch groups in flight on the shared pool
+            groups = [jobs[i::workers] for i in range(min(workers, len(jobs)))]
+            grouped = list(_pool().map(_simulate_batches, groups))
+            outcomes = [outcome for group in grouped for outcome in group]
+        else:
+            outcomes = [_simulate_batch(*job) for job in jobs]
+
+        finishes = np.concatenate([finish for finish, _ in outcomes])
+        critical_counts = sum(counts for _, counts in outcomes)
+        deterministic = float(levels.passes(mode)[4])
+        p50, p80, p95 = (float(value) for value in np.percentile(finishes, [50, 80, 95]))
+
+        criticality = []
+        for i, task in enumerate(tasks):
+            if levels.is_summary[i] or not levels.scheduled[i] or not critical_counts[i]:
+                continue
+            criticality.append({
+                "id": task["id"],
+                "name": task.get("name", ""),
+                "outline_number": task.get("outline_number", ""),
+                "criticality_index": round(float(critical_counts[i]) / iterations, 4)
+            })
+        criticality.sort(key=lambda entry: -entry["criticality_index"])
+
+        elapsed = time.perf_counter() - started
+        print(f"[Risk] {iterations} iterations over {len(tasks)} tasks in {elapsed:.2f}s "
+              f"(P50 {p50:.1f}, P80 {p80:.1f}, P95 {p95:.1f} days)")
+
+        return {
+            "iterations": iterations,
+            "distribution": distribution,
+            "deterministic_finish_days": deterministic,
+            "deterministic_finish_date": self._finish_date(axis, deterministic),
+            "probability_on_time": float(np.mean(finishes <= deterministic + CRITICAL_TOLERANCE)),
+            "finish_days": {
+                "p50": p50,
+                "p80": p80,
+                "p95": p95,
+                "mean": float(finishes.mean()),
+                "min": float(finishes.min()),
+                "max": float(finishes.max())
+            },
+            "finish_dates": {
+                "p50": self._finish_date(axis, p50),
+                "p80": self._finish_date(axis, p80),
+                "p95": self._finish_date(axis, p95)
+            },
+            "task_criticality": criticality,
+            "elapsed_seconds": round(elapsed, 3)
+        }
+
+    def _duration_ranges(
+        self,
+        tasks: List[Dict[str, Any]],
+        levels: LevelNetwork,
+        optimistic_factor: float,
+        pessimistic_factor: float,
+        duration_norms: Optional[Dict[str, Any]]
+    ) -> tuple:
+        """Optimistic and pessimistic durations per work task, bracketing the planned duration"""
+        low_factor = np.full(len(tasks), min(optimistic_factor, 1.0))
+        high_factor = np.full(len(tasks), max(pessimistic_factor, 1.0))
+        if duration_norms:
+            from ai_project_editor import project_template_learner
+            for i, task in enumerate(tasks):
+                norm = duration_norms.get(project_template_learner._detect_category(task.get("name", "")))
+                if isinstance(norm, dict) and norm.get("max_ratio", 1.0) > norm.get("min_ratio", 1.0):
+                    low_factor[i] = min(norm["min_ratio"], 1.0)
+                    high_factor[i] = max(norm["max_ratio"], 1.0)
+        # Summaries roll up from their children; sampling them would be wasted work
+        low_factor[levels.is_summary] = 1.0
+        high_factor[levels.is_summary] = 1.0
+        low_factor = np.maximum(low_factor, 0.0)
+        return levels.duration * low_factor, levels.duration * high_factor
+
+    def _finish_date(self, axis, days: float) -> str:
+        """Finish date of a finish offset, rounding part days up"""
+        return axis.date(math.ceil(days - 1e-9))
+
+
+# Singleton instance
+schedule_risk_simulator = ScheduleRiskSimulator()
@@ -0,0 +1,1246 @@
+"""
+Scheduling Engine for Sturgis Project
+Single-pass CPM scheduling shared by date recalculation and critical path analysis
+"""
+import heapq
+import os
+import re
+from collections import deque
+from itertools import chain
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from task_links import link_target
+
+# NumPy is optional: without it the dict-based passes are always used
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+
+# Dependency types (MS Project XML schema)
+LINK_FF = 0  # Finish-to-Finish
+LINK_FS = 1  # Finish-to-Start (default)
+LINK_SF = 2  # Start-to-Finish
+LINK_SS = 3  # Start-to-Start
+
+# Constraint types (MS Project compatible, see models.ConstraintType)
+CONSTRAINT_ALAP = 1
+CONSTRAINT_MSO = 2
+CONSTRAINT_MFO = 3
+CONSTRAINT_SNET = 4
+CONSTRAINT_SNLT = 5
+CONSTRAINT_FNET = 6
+CONSTRAINT_FNLT = 7
+
+# Vectorized CPM switch: "auto" (NumPy for large, wide networks), "true" or "false"
+CPM_VECTORIZED = os.getenv("CPM_VECTORIZED", "auto").lower()
+VECTORIZED_MIN_TASKS = int(os.getenv("CPM_VECTORIZED_MIN_TASKS", "5000"))
+VECTORIZED_MIN_LEVEL_WIDTH = 32  # auto mode: average tasks per level needed to pay off
+
+_DURATION_PATTERN = re.compile(
+    r'^P(?:(\d+(?:\.\d+)?)D)?(?:T(?:(\d+(?:\.\d+)?)H)?(?:(\d+(?:\.\d+)?)M)?(?:(\d+(?:\.\d+)?)S)?)?$'
+)
+
+
+def parse_duration_days(duration_str: Optional[str], hours_per_day: float = 8) -> float:
+    """Parse an ISO 8601 duration (PT8H0M0S, P5D) to working days"""
+    if not duration_str:
+        return 0.0
+    match = _DURATION_PATTERN.match(duration_str)
+    if not match:
+        return 0.0
+    days, hours, minutes, seconds = (float(g) if g else 0.0 for g in match.groups())
+    return days + (hours + minutes / 60.0 + seconds / 3600.0) / hours_per_day
+
+
+def parse_lag_days(lag: Any, hours_per_day: float = 8) -> float:
+    """Parse a predecessor lag (stored internally as days) to days"""
+    if isinstance(lag, (int, float)):
+        return float(lag)
+    if isinstance(lag, str):
+        return parse_duration_days(lag, hours_per_day)
+    return 0.0
+
+
+def outline_hierarchy(tasks: List[Dict[str, Any]], index_by_outline: Dict[str, int]) -> tuple:
+    """Parent index (-1 for top level) and child index lists, derived from outline numbers"""
+    parent: List[int] = [-1] * len(tasks)
+    children: List[List[int]] = [[] for _ in tasks]
+    for i, task in enumerate(tasks):
+        outline = task.get("outline_number", "")
+        if "." in outline:
+            p = index_by_outline.get(outline.rsplit(".", 1)[0], -1)
+            if p >= 0 and p != i:
+                parent[i] = p
+                children[p].append(i)
+    return parent, children
+
+
+class DayAxis:
+    """
+    Maps dates to whole-day offsets from the project start, and back.
+
+    With a calendar, offsets count working days through the calendar's
+    prefix-sum index, so weekends and holidays are skipped in O(1) per
+    lookup. Without one, offsets are calendar days. hours_per_day is the
+    calendar's working day length (8 without one), for converting hour
+    durations and lags to days.
+    """
+
+    def __init__(self, project_start: datetime, calendar: Optional[Any] = None):
+        self.base = project_start.toordinal()
+        self.hours_per_day = getattr(calendar, "hours_per_day", None) or 8
+        self.index = calendar.index if calendar is not None and calendar.has_working_days else None
+        self.base_number = self.index.number(self.base) if self.index else 0
+        self._offsets: Dict[str, Optional[int]] = {}
+        self._dates: Dict[int, str] = {}
+
+    def offset(self, date_str: Optional[str]) -> Optional[int]:
+        """Offset of a date string (None if missing or invalid); non-working days map to the next working day"""
+        if not date_str:
+            return None
+        key = date_str[:10]
+        if key not in self._offsets:
+            try:
+                ordinal = date.fromisoformat(key).toordinal()
+                if self.index:
+                    self._offsets[key] = self.index.number(ordinal) - self.base_number
+                else:
+                    self._offsets[key] = ordinal - self.base
+            except ValueError:
+                self._offsets[key] = None
+        return self._offsets[key]
+
+    def date(self, offset: int) -> str:
+        """YYYY-MM-DD of an offset"""
+        text = self._dates.get(offset)
+        if text is None:
+            if self.index:
+                text = date.fromordinal(self.index.ordinal(self.base_number + offset)).isoformat()
+            else:
+                text = date.fromordinal(self.base + offset).isoformat()
+            self._dates[offset] = text
+        return text
+
+
+class ScheduleNetwork:
+    """
+    Predecessor graph over a task list, indexed by task position.
+
+    Built once per calculation: links are resolved by predecessor id (by
+    outline number for links that have none yet), and a
+    topological order is computed with Kahn's algorithm. Tasks caught in a
+    dependency cycle are left out of the order and are not scheduled.
+
+    With hierarchy=True, summary tasks are scheduled from their children
+    (start = min child start, finish = max child finish) and links placed on
+    a summary are applied to its leaf tasks, as MS Project does.
+
+    Hour durations and lags are converted to days of hours_per_day hours
+    (the calendar's working day).
+    """
+
+    def __init__(self, tasks: List[Dict[str, Any]], hierarchy: bool = False, whole_days: bool = False,
+                 hours_per_day: float = 8):
+        self.tasks = tasks
+        self.hierarchy = hierarchy
+        self.whole_days = whole_days
+        self.hours_per_day = hours_per_day
+        n = len(tasks)
+
+        self.index_by_outline: Dict[str, int] = {}
+        self.index_by_id: Dict[str, int] = {}
+        for i, task in enumerate(tasks):
+            self.index_by_outline[task.get("outline_number", "")] = i
+            self.index_by_id[task.get("id")] = i
+
+        self.durations: List[float] = [0.0] * n
+        self.refresh_durations(range(n))
+
+        # Hierarchy (parent pointer and child lists) derived from outline numbers
+        if hierarchy:
+            self.parent, self.children = outline_hierarchy(tasks, self.index_by_outline)
+        else:
+            self.parent: List[int] = [-1] * n
+            self.children: List[List[int]] = [[] for _ in range(n)]
+        self.is_summary: List[bool] = [bool(c) for c in self.children]
+
+        # Links: preds[i] / succs[i] hold (other_index, link_type, lag_days)
+        self.preds: List[List[tuple]] = [[] for _ in range(n)]
+        self.succs: List[List[tuple]] = [[] for _ in range(n)]
+        for i, task in enumerate(tasks):
+            links = self._resolve_links(task)
+            if not links:
+                continue
+            targets = self._leaf_descendants(i) if self.is_summary[i] else [i]
+            for j in targets:
+                for p, link_type, lag in links:
+                    if p == j:
+                        continue
+                    self.preds[j].append((p, link_type, lag))
+                    self.succs[p].append((j, link_type, lag))
+
+        self._order: Optional[List[int]] = None
+        self._position: Optional[Dict[int, int]] = None
+
+    def refresh_durations(self, indices: Iterable[int]) -> None:
+        """Re-read the durations of some tasks (after an edit that kept links and outline numbers)"""
+        for i in indices:
+            duration = max(parse_duration_days(self.tasks[i].get("duration"), self.hours_per_day), 0.0)
+            self.durations[i] = float(int(duration)) if self.whole_days else duration
+
+    def _resolve_links(self, task: Dict[str, Any]) -> List[tuple]:
+        links = []
+        for pred in task.get("predecessors") or []:
+            p = link_target(pred, self.index_by_id, self.index_by_outline)
+            if p is None:
+                continue
+            link_type = pred.get("type", LINK_FS)
+            if link_type not in (LINK_FF, LINK_FS, LINK_SF, LINK_SS):
+                link_type = LINK_FS
+            lag = parse_lag_days(pred.get("lag", 0), self.hours_per_day)
+            if self.whole_days:
+                lag = float(int(lag))
+            links.append((p, link_type, lag))
+        return links
+
+    def _leaf_descendants(self, index: int) -> List[int]:
+        leaves = []
+        stack = [index]
+        while stack:
+            node = stack.pop()
+            if self.children[node]:
+                stack.extend(self.children[node])
+            else:
+                leaves.append(node)
+        return leaves
+
+    def _topological_order(self) -> List[int]:
+        """Kahn's algorithm over link edges (plus child -> summary edges)"""
+        n = len(self.tasks)
+        indegree = [0] * n
+        for i in range(n):
+            for s, _, _ in self.succs[i]:
+                indegree[s] += 1
+            if self.parent[i] >= 0:
+                indegree[self.parent[i]] += 1
+
+        queue = deque(i for i in range(n) if indegree[i] == 0)
+        order = []
+        while queue:
+            i = queue.popleft()
+            order.append(i)
+            for s, _, _ in self.succs[i]:
+                indegree[s] -= 1
+                if indegree[s] == 0:
+                    queue.append(s)
+            parent = self.parent[i]
+            if parent >= 0:
+                indegree[parent] -= 1
+                if indegree[parent] == 0:
+                    queue.append(parent)
+        return order
+
+    @property
+    def order(self) -> List[int]:
+        """Topological order (computed on first use; the vectorized pass does its own leveling)"""
+        if self._order is None:
+            self._order = self._topological_order()
+        return self._order
+
+    @property
+    def position(self) -> Dict[int, int]:
+        """Place of each ordered task in the topological order"""
+        if self._position is None:
+            self._position = {i: k for k, i in enumerate(self.order)}
+        return self._position
+
+    @property
+    def has_cycle(self) -> bool:
+        return len(self.order) < len(self.tasks)
+
+    def reachable(self, starts: List[int], downstream: bool = True) -> List[int]:
+        """
+        Indices reachable from starts along links, breadth first; starts
+        (and the tasks inside a summary start) excluded. Downstream follows
+        successors and rolls up into parent summaries; upstream follows
+        predecessors and down into the children a summary is driven by.
+        """
+        seeds = set()
+        for i in starts:
+            seeds.add(i)
+            if self.is_summary[i]:
+                seeds.update(self._leaf_descendants(i))
+                stack = list(self.children[i])
+                while stack:
+                    child = stack.pop()
+                    seeds.add(child)
+                    stack.extend(self.children[child])
+        seen = set(seeds)
+        queue = deque(seeds)
+        found = []
+        while queue:
+            i = queue.popleft()
+            if downstream:
+                neighbours = [j for j, _, _ in self.succs[i]]
+                if self.parent[i] >= 0:
+                    neighbours.append(self.parent[i])
+            else:
+                neighbours = [j for j, _, _ in self.preds[i]] + self.children[i]
+            for j in neighbours:
+                if j not in seen:
+                    seen.add(j)
+                    found.append(j)
+                    queue.append(j)
+        return found
+
+
+class ScheduleResult:
+    """Early/late start and finish (in days from project start) per task index"""
+
+    def __init__(self, network: ScheduleNetwork):
+        n = len(network.tasks)
+        self.network = network
+        self.early_start: List[float] = [0.0] * n
+        self.early_finish: List[float] = [0.0] * n
+        self.late_start: List[float] = [0.0] * n
+        self.late_finish: List[float] = [0.0] * n
+        self.scheduled: List[bool] = [False] * n
+        self.project_end: float = 0.0
+
+    def total_float(self, index: int) -> float:
+        return self.late_start[index] - self.early_start[index]
+
+
+def topological_levels(n: int, src, dst, max_depth: Optional[int] = None):
+    """
+    Topological level of each task (-1 inside a dependency cycle), found by
+    peeling zero in-degree frontiers with array operations. Returns None once
+    the depth passes max_depth.
+    """
+    order = np.argsort(src, kind="stable")
+    targets_by_source = dst[order]
+    pointers = np.searchsorted(src[order], np.arange(n + 1))
+    indegree = np.bincount(dst, minlength=n)
+    level = np.full(n, -1, dtype=np.int64)
+
+    frontier = np.nonzero(indegree == 0)[0]
+    depth = 0
+    while frontier.size:
+        if max_depth is not None and depth >= max_depth:
+            return None
+        level[frontier] = depth
+        counts = pointers[frontier + 1] - pointers[frontier]
+        total = int(counts.sum())
+        if not total:
+            break
+        firsts = np.repeat(pointers[frontier] - (np.cumsum(counts) - counts), counts)
+        targets = targets_by_source[firsts + np.arange(total)]
+        indegree -= np.bincount(targets, minlength=n)
+        frontier = np.unique(targets[indegree[targets] == 0])
+        depth += 1
+    return level
+
+
+def _segments(keys):
+    """Distinct values of a sorted key array and the index where each run starts"""
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if keys.size else keys
+    return keys[starts], starts
+
+
+class LevelNetwork:
+    """
+    ScheduleNetwork packed into NumPy arrays, grouped by topological level.
+
+    Tasks are grouped by level (longest path from a source) and links are
+    sorted by level, then by the task they update, so every task in a level
+    is computed with a few segmented max/min reductions instead of a Python
+    loop per task. passes() takes one duration per task, or a matrix with
+    one column per sample to run many duration scenarios in the same loop.
+
+    depth is None when the network is deeper than max_depth.
+    """
+
+    def __init__(self, network: ScheduleNetwork, constraints: List[Optional[tuple]], max_depth: Optional[int] = None):
+        n = len(network.tasks)
+        self.size = n
+        self.depth: Optional[int] = None
+
+        # Pack links (pred -> succ) and hierarchy (child -> summary)
+        link_counts = np.fromiter(map(len, network.preds), dtype=np.int64, count=n)
+        links = np.fromiter(
+            chain.from_iterable(chain.from_iterable(network.preds)), dtype=float, count=3 * int(link_counts.sum())
+        ).reshape(-1, 3)
+        src = links[:, 0].astype(np.int64)
+        dst = np.repeat(np.arange(n, dtype=np.int64), link_counts)
+        kinds = links[:, 1].astype(np.int64)
+        lags = links[:, 2]
+        parent = np.array(network.parent, dtype=np.int64)
+        child = np.nonzero(parent >= 0)[0]
+        self.duration = np.array(network.durations, dtype=float)
+        self.is_summary = is_summary = np.array(network.is_summary, dtype=bool)
+
+        level = topological_levels(n, np.concatenate([src, child]), np.concatenate([dst, parent[child]]), max_depth)
+        if level is None:
+            return
+        self.scheduled = scheduled = level >= 0
+        self.depth = depth = int(level.max()) + 1 if scheduled.any() else 0
+
+        constraint_type = np.zeros(n, dtype=np.int64)
+        constraint_offset = np.zeros(n, dtype=float)
+        constrained = [i for i, constraint in enumerate(constraints) if constraint]
+        if constrained:
+            values = np.fromiter(
+                chain.from_iterable(constraints[i] for i in constrained), dtype=float, count=2 * len(constrained)
+            ).reshape(-1, 2)
+            constraint_type[constrained] = values[:, 0].astype(np.int64)
+            constraint_offset[constrained] = values[:, 1]
+
+        node_keys = np.where(scheduled, level, depth)
+        nodes = np.argsort(node_keys, kind="stable")
+        node_bounds = np.searchsorted(node_keys[nodes], np.arange(depth + 1))
+        live = scheduled[dst]
+        src, dst, kinds, lags = src[live], dst[live], kinds[live], lags[live]
+        from_finish = (kinds == LINK_FS) | (kinds == LINK_FF)
+        minus_duration = (kinds == LINK_FF) | (kinds == LINK_SF)
+        to_start = (kinds == LINK_FS) | (kinds == LINK_SS)
+        plus_duration = (kinds == LINK_SS) | (kinds == LINK_SF)
+
+        fwd = np.lexsort((dst, level[dst]))
+        fwd_bounds = np.searchsorted(level[dst][fwd], np.arange(depth + 1))
+        bwd = np.lexsort((src, level[src]))
+        bwd_bounds = np.searchsorted(level[src][bwd], np.arange(depth + 1))
+        child = child[scheduled[child]]
+        child = child[np.lexsort((parent[child], level[parent[child]]))]
+        child_bounds = np.searchsorted(level[parent[child]], np.arange(depth + 1))
+
+        # Per-level slices, precomputed once so repeated passes only do arithmetic
+        self.forward_levels = []
+        self.backward_levels = []
+        for level_index in range(depth):
+            level_nodes = nodes[node_bounds[level_index]:node_bounds[level_index + 1]]
+            work = level_nodes[~is_summary[level_nodes]]
+
+            e = fwd[fwd_bounds[level_index]:fwd_bounds[level_index + 1]]
+            targets, segments = _segments(dst[e])
+            c = child[child_bounds[level_index]:child_bounds[level_index + 1]]
+            summaries, child_segments = _segments(parent[c])
+            self.forward_levels.append((
+                (src[e], dst[e], lags[e], from_finish[e], minus_duration[e], targets, segments),
+                (work, constraint_type[work], constraint_offset[work]),
+                (c, summaries, child_segments)
+            ))
+
+            e = bwd[bwd_bounds[level_index]:bwd_bounds[level_index + 1]]
+            targets, segments = _segments(src[e])
+            p = parent[level_nodes]
+            self.backward_levels.append((
+                (dst[e], src[e], lags[e], to_start[e], plus_duration[e], targets, segments),
+                (level_nodes, p >= 0, np.where(p >= 0, p, 0),
+                 constraint_type[level_nodes], constraint_offset[level_nodes])
+            ))
+
+    def passes(self, duration) -> tuple:
+        """
+        Forward and backward passes with the arithmetic of the dict-based passes.
+
+        Args:
+            duration: Durations in days, shape (n,) or (n, samples)
+
+        Returns:
+            (early_start, early_finish, late_start, late_finish, project_end),
+            shaped like duration; project_end has one value per sample
+        """
+        if duration.ndim == 2:
+            def col(a):
+                return a[:, None]
+        else:
+            def col(a):
+                return a
+        shape = duration.shape
+
+        # Forward pass
+        es = np.zeros(shape)
+        ef = np.zeros(shape)
+        es[self.is_summary] = np.inf
+        ef[self.is_summary] = -np.inf
+        start = np.zeros(shape)
+        for links, work_nodes, children in self.forward_levels:
+            src, dst, lags, from_finish, minus_duration, targets, segments = links
+            if targets.size:
+                base = np.where(col(from_finish), ef[src], es[src]) + col(lags)
+                candidate = np.where(col(minus_duration), base - duration[dst], base)
+                start[targets] = np.maximum(start[targets], np.maximum.reduceat(candidate, segments, axis=0))
+
+            work, ct, offset = work_nodes
+            if work.size:
+                st = start[work]
+                d = duration[work]
+                ct, offset = col(ct), col(offset)
+                st = np.where(ct == CONSTRAINT_MSO, offset, st)
+                st = np.where(ct == CONSTRAINT_MFO, offset - d, st)
+                st = np.where(ct == CONSTRAINT_SNET, np.maximum(st, offset), st)
+                st = np.where(ct == CONSTRAINT_FNET, np.maximum(st, offset - d), st)
+                es[work] = st
+                ef[work] = st + d
+
+            c, summaries, segments = children
+            if c.size:
+                es[summaries] = np.minimum(es[summaries], np.minimum.reduceat(es[c], segments, axis=0))
+                ef[summaries] = np.maximum(ef[summaries], np.maximum.reduceat(ef[c], segments, axis=0))
+
+        if self.depth:
+            project_end = ef[self.scheduled].max(axis=0)
+        else:
+            project_end = np.zeros(shape[1:])
+
+        # Backward pass
+        span = np.where(col(self.is_summary), ef - es, duration)
+        ls = np.zeros(shape)
+        lf = np.zeros(shape)
+        finish = np.broadcast_to(project_end, shape).copy()
+        for links, level_nodes in reversed(self.backward_levels):
+            dst, src, lags, to_start, plus_duration, targets, segments = links
+            if targets.size:
+                base = np.where(col(to_start), ls[dst], lf[dst]) - col(lags)
+                candidate = np.where(col(plus_duration), base + span[src], base)
+                finish[targets] = np.minimum(finish[targets], np.minimum.reduceat(candidate, segments, axis=0))
+
+            nodes, has_parent, parent, ct, offset = level_nodes
+            f = finish[nodes]
+            f = np.where(col(has_parent), np.minimum(f, lf[parent]), f)
+            d = span[nodes]
+            ct, offset = col(ct), col(offset)
+            f = np.where(ct == CONSTRAINT_MSO, offset + d, f)
+            f = np.where(ct == CONSTRAINT_MFO, offset, f)
+            f = np.where(ct == CONSTRAINT_SNLT, np.minimum(f, offset + d), f)
+            f = np.where(ct == CONSTRAINT_FNLT, np.minimum(f, offset), f)
+            lf[nodes] = f
+            ls[nodes] = f - d
+
+        unscheduled = ~self.scheduled
+        es[unscheduled] = 0.0
+        ef[unscheduled] = 0.0
+        return es, ef, ls, lf, project_end
+
+
+class SchedulingEngine:
+    """
+    Critical Path Method scheduler.
+
+    One topological sort, one forward pass and one backward pass: O(V + E).
+    Supports all four link types (FF, FS, SF, SS) and constraint types 0-7.
+    """
+
+    def __init__(self):
+        # Returns the CalendarService of the loaded project (set by the API layer)
+        self.calendar_resolver: Optional[Callable[[], Any]] = None
+        self.vectorized_mode = CPM_VECTORIZED
+
+    def compute(
+        self,
+        tasks: List[Dict[str, Any]],
+        constraint_offset: Optional[Callable[[Optional[str]], Optional[float]]] = None,
+        hierarchy: bool = False,
+        whole_days: bool = False,
+        network: Optional[ScheduleNetwork] = None,
+        vectorized: Optional[bool] = None,
+        hours_per_day: float = 8
+    ) -> ScheduleResult:
+        """
+        Run the forward and backward passes.
+
+        Args:
+            tasks: Task dicts (predecessors referenced by outline_number)
+            constraint_offset: Converts a constraint date to days from project start.
+                               Returning None ignores the constraint.
+            hierarchy: Schedule summary tasks from their children
+            whole_days: Truncate durations and lags to whole days (date scheduling)
+            network: Pre-built network to reuse
+            vectorized: Force the NumPy level-by-level passes on (True) or off
+                        (False); None follows CPM_VECTORIZED
+            hours_per_day: Working hours per day, for hour durations and lags
+                           (ignored with a pre-built network)
+
+        Returns:
+            ScheduleResult with early/late dates in days from project start
+        """
+        if network is None:
+            network = ScheduleNetwork(tasks, hierarchy=hierarchy, whole_days=whole_days, hours_per_day=hours_per_day)
+        result = ScheduleResult(network)
+        if not tasks:
+            return result
+
+        constraints = self._resolve_constraints(network, constraint_offset)
+        if not self._vectorized_passes(network, result, constraints, vectorized):
+            self._forward_pass(network, result, constraints)
+            self._backward_pass(network, result, constraints)
+
+        # As Late As Possible: push early dates to late dates
+        for i, constraint in enumerate(constraints):
+            if constraint and constraint[0] == CONSTRAINT_ALAP and result.scheduled[i]:
+                result.early_start[i] = result.late_start[i]
+                result.early_finish[i] = result.late_finish[i]
+
+        return result
+
+    def _resolve_constraints(self, network: ScheduleNetwork, constraint_offset) -> List[Optional[tuple]]:
+        constraints: List[Optional[tuple]] = [None] * len(network.tasks)
+        for i, task in enumerate(network.tasks):
+            if network.is_summary[i]:
+                continue
+            constraint_type = task.get("constraint_type", 0) or 0
+            if constraint_type == CONSTRAINT_ALAP:
+                constraints[i] = (constraint_type, 0.0)
+            elif CONSTRAINT_MSO <= constraint_type <= CONSTRAINT_FNLT and constraint_offset:
+                offset = constraint_offset(task.get("constraint_date"))
+                if offset is not None:
+                    constraints[i] = (constraint_type, offset)
+        return constraints
+
+    def _forward_pass(self, network: ScheduleNetwork, result: ScheduleResult, constraints: List[Optional[tuple]]) -> None:
+        es, ef = result.early_start, result.early_finish
+        for i in network.order:
+            es[i], ef[i] = self._early_dates(network, es, ef, constraints, i)
+            result.scheduled[i] = True
+
+        result.project_end = max((ef[i] for i in network.order), default=0.0)
+
+    def _early_dates(self, network: ScheduleNetwork, es: List[float], ef: List[float],
+                     constraints: List[Optional[tuple]], i: int) -> tuple:
+        """Early start and finish of one task from its predecessors' (or children's) early dates"""
+        if network.is_summary[i]:
+            children = network.children[i]
+            return min(es[c] for c in children), max(ef[c] for c in children)
+
+        duration = network.durations[i]
+        start = 0.0
+        for p, link_type, lag in network.preds[i]:
+            if link_type == LINK_FS:
+                candidate = ef[p] + lag
+            elif link_type == LINK_SS:
+                candidate = es[p] + lag
+            elif link_type == LINK_FF:
+                candidate = ef[p] + lag - duration
+            else:  # LINK_SF
+                candidate = es[p] + lag - duration
+            if candidate > start:
+                start = candidate
+
+        constraint = constraints[i]
+        if constraint:
+            constraint_type, offset = constraint
+            if constraint_type == CONSTRAINT_MSO:
+                start = offset
+            elif constraint_type == CONSTRAINT_MFO:
+                start = offset - duration
+            elif constraint_type == CONSTRAINT_SNET:
+                start = max(start, offset)
+            elif constraint_type == CONSTRAINT_FNET:
+                start = max(start, offset - duration)
+            # ALAP, SNLT, FNLT only affect the backward pass
+
+        return start, start + duration
+
+    def forward_from(
+        self,
+        network: ScheduleNetwork,
+        result: ScheduleResult,
+        constraints: List[Optional[tuple]],
+        starts: List[int]
+    ) -> Dict[int, tuple]:
+        """
+        Redo the forward pass for the tasks an edit of starts can reach.
+
+        After durations or incoming lags of the start tasks change in the
+        network, their early dates are recomputed and the change is pushed to
+        successors (and parent summaries) in topological order; propagation
+        stops at any task whose early dates come out unchanged. Late dates are
+        left as they were. The result must come from a forward pass without
+        the ALAP adjustment of compute(), which moves early dates afterwards.
+
+        Returns:
+            Previous (early_start, early_finish) of every task whose early
+            dates changed, to undo the edit with restore()
+        """
+        es, ef = result.early_start, result.early_finish
+        position = network.position
+        heap = [(position[i], i) for i in set(starts) if i in position]
+        heapq.heapify(heap)
+        queued = {i for _, i in heap}
+        moved: Dict[int, tuple] = {}
+
+        while heap:
+            _, i = heapq.heappop(heap)
+            dates = self._early_dates(network, es, ef, constraints, i)
+            if dates == (es[i], ef[i]):
+                continue
+            moved.setdefault(i, (es[i], ef[i]))
+            es[i], ef[i] = dates
+            dependents = [s for s, _, _ in network.succs[i]]
+            if network.parent[i] >= 0:
+                dependents.append(network.parent[i])
+            for j in dependents:
+                if j not in queued and j in position:
+                    queued.add(j)
+                    heapq.heappush(heap, (position[j], j))
+
+        if moved:
+            result.project_end = max((ef[i] for i in network.order), default=0.0)
+        return moved
+
+    def restore(self, result: ScheduleResult, moved: Dict[int, tuple], project_end: float) -> None:
+        """Put back the early dates forward_from() changed"""
+        for i, (start, finish) in moved.items():
+            result.early_start[i] = start
+            result.early_finish[i] = finish
+        result.project_end = project_end
+
+    def _backward_pass(self, network: ScheduleNetwork, result: ScheduleResult, constraints: List[Optional[tuple]]) -> None:
+        ls, lf = result.late_start, result.late_finish
+        scheduled = result.scheduled
+        project_end = result.project_end
+
+        for i in reversed(network.order):
+            if network.is_summary[i]:
+                duration = result.early_finish[i] - result.early_start[i]
+            else:
+                duration = network.durations[i]
+
+            finish = project_end
+            for s, link_type, lag in network.succs[i]:
+                if not scheduled[s]:
+                    continue
+                if link_type == LINK_FS:
+                    candidate = ls[s] - lag
+                elif link_type == LINK_SS:
+                    candidate = ls[s] - lag + duration
+                elif link_type == LINK_FF:
+                    candidate = lf[s] - lag
+                else:  # LINK_SF
+                    candidate = lf[s] - lag + duration
+                if candidate < finish:
+                    finish = candidate
+
+            parent = network.parent[i]
+            if parent >= 0 and lf[parent] < finish:
+                finish = lf[parent]
+
+            constraint = constraints[i]
+            if constraint:
+                constraint_type, offset = constraint
+                if constraint_type == CONSTRAINT_MSO:
+                    finish = offset + duration
+                elif constraint_type == CONSTRAINT_MFO:
+                    finish = offset
+                elif constraint_type == CONSTRAINT_SNLT:
+                    finish = min(finish, offset + duration)
+                elif constraint_type == CONSTRAINT_FNLT:
+                    finish = min(finish, offset)
+
+            lf[i] = finish
+            ls[i] = finish - duration
+
+    # =========================================================================
+    # VECTORIZED PASSES (NumPy)
+    # =========================================================================
+
+    def _vectorized_passes(
+        self,
+        network: ScheduleNetwork,
+        result: ScheduleResult,
+        constraints: List[Optional[tuple]],
+        vectorized: Optional[bool]
+    ) -> bool:
+        """
+        Forward and backward passes on NumPy arrays, one topological level at a
+        time (see LevelNetwork). The arithmetic matches _forward_pass and
+        _backward_pass, so results are identical.
+
+        Returns False (nothing computed) when the dict-based passes should run
+        instead: switched off, NumPy missing, or in auto mode a schedule that is
+        small or too deep (few tasks per level) to benefit.
+        """
+        n = len(network.tasks)
+        max_depth = None
+        if vectorized is None and self.vectorized_mode == "auto":
+            if n < VECTORIZED_MIN_TASKS or not NUMPY_AVAILABLE:
+                return False
+            max_depth = max(n // VECTORIZED_MIN_LEVEL_WIDTH, 1)
+        elif not (vectorized if vectorized is not None else self.vectorized_mode == "true"):
+            return False
+        elif not NUMPY_AVAILABLE:
+            print("[Scheduling] NumPy not installed, using the dict-based CPM passes")
+            return False
+
+        levels = LevelNetwork(network, constraints, max_depth)
+        if levels.depth is None:
+            return False
+        es, ef, ls, lf, project_end = levels.passes(levels.duration)
+
+        result.early_start = es.tolist()
+        result.early_finish = ef.tolist()
+        result.late_start = ls.tolist()
+        result.late_finish = lf.tolist()
+        result.scheduled = levels.scheduled.tolist()
+        result.project_end = float(project_end)
+        return True
+
+    # =========================================================================
+    # DRIVING PATHS
+    # =========================================================================
+
+    def driving_paths(self, result: ScheduleResult, tolerance: float = 0.01) -> tuple:
+        """
+        Zero-float links that set the finish date, and the chains they form.
+
+        A link is driving when both ends have zero total float and the link
+        alone determines the successor's early start. Chains are found by
+        walking back from each zero-float task in reverse topological order,
+        claiming every task once, so the whole search is O(V + E) however
+        many source-to-finish paths the network has. The first chain ends at
+        the task that finishes the project; later chains end where they
+        branch into an already claimed chain.
+
+        Returns:
+            (links, chains): links as (pred_index, succ_index) pairs, chains
+            as lists of task indices in schedule order
+        """
+        network = result.network
+        es, ef = result.early_start, result.early_finish
+        critical = [
+            result.scheduled[i] and not network.is_summary[i] and abs(result.total_float(i)) < tolerance
+            for i in range(len(network.tasks))
+        ]
+
+        links = []
+        driving_preds: List[List[int]] = [[] for _ in network.tasks]
+        for i in network.order:
+            if not critical[i]:
+                continue
+            duration = network.durations[i]
+            for p, link_type, lag in network.preds[i]:
+                if not critical[p]:
+                    continue
+                if link_type == LINK_FS:
+                    candidate = ef[p] + lag
+                elif link_type == LINK_SS:
+                    candidate = es[p] + lag
+                elif link_type == LINK_FF:
+                    candidate = ef[p] + lag - duration
+                else:  # LINK_SF
+                    candidate = es[p] + lag - duration
+                if abs(candidate - es[i]) < tolerance:
+                    links.append((p, i))
+                    driving_preds[i].append(p)
+
+        # Tasks finishing the project first, so the main chain is chains[0]
+        finishing = [i for i in network.order if critical[i] and abs(ef[i] - result.project_end) < tolerance]
+        claimed = [False] * len(network.tasks)
+        chains = []
+        for start in chain(finishing, reversed(network.order)):
+            if not critical[start] or claimed[start]:
+                continue
+            path = [start]
+            claimed[start] = True
+            node = start
+            while True:
+                node = next((p for p in driving_preds[node] if not claimed[p]), None)
+                if node is None:
+                    break
+                claimed[node] = True
+                path.append(node)
+            path.reverse()
+            chains.append(path)
+
+        return links, chains
+
+    # =========================================================================
+    # IMPACT ANALYSIS
+    # =========================================================================
+
+    def impact(self, network: ScheduleNetwork, task_id: str, task_floats: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        """
+        What a change to one task reaches: every task downstream and upstream
+        of it (transitively, by BFS over the network's link lists), the
+        earliest finish among the downstream tasks, and how many days the
+        task can slip before the project finish moves (its total float; for a
+        summary, the least float of its leaves).
+
+        Returns:
+            None if the task is not in the network
+        """
+        index = network.index_by_id.get(task_id)
+        if index is None:
+            return None
+        tasks = network.tasks
+        downstream = sorted(network.reachable([index]))
+        upstream = sorted(network.reachable([index], downstream=False))
+        finishes = [tasks[i]["finish_date"] for i in downstream if tasks[i].get("finish_date")]
+        # A summary slips as a whole: its least float among its leaves
+        leaves = network._leaf_descendants(index) if network.is_summary[index] else [index]
+        leaf_floats = [task_floats[tasks[i]["id"]] for i in leaves if tasks[i]["id"] in task_floats]
+        total_float = min(leaf_floats) if leaf_floats else None
+        return {
+            "task_id": task_id,
+            "successors": [tasks[i]["id"] for i in downstream],
+            "predecessors": [tasks[i]["id"] for i in upstream],
+            "earliest_affected_finish": min(finishes) if finishes else None,
+            "absorbable_slip_days": round(max(total_float, 0.0), 2) if total_float is not None else None,
+        }
+
+    # =========================================================================
+    # DATE SCHEDULING
+    # =========================================================================
+
+    def schedule_dates(self, project: Dict[str, Any], calendar: Optional[Any] = None) -> Dict[str, Any]:
+        """
+        Recalculate start/finish dates for every task in the project.
+
+        Work tasks are scheduled from the project start date through their
+        predecessors and constraints; summary tasks roll up from children.
+        Durations and lags are counted in whole days (working days when the
+        project has a calendar), matching how dates have always been written
+        (08:00 start, 17:00 finish).
+
+        Args:
+            project: Project dict (tasks are updated in place)
+            calendar: CalendarService to schedule on; defaults to the
+                      calendar of the loaded project, if any
+
+        Returns:
+            Stats dict with counts of scheduled work tasks, summaries and
+            tasks skipped because of a dependency cycle.
+        """
+        tasks = project.get("tasks", [])
+        stats = {"scheduled": 0, "summaries": 0, "cyclic": 0}
+        if not tasks:
+            return stats
+
+        axis = self._day_axis(project, calendar)
+        network = ScheduleNetwork(tasks, hierarchy=True, whole_days=True, hours_per_day=axis.hours_per_day)
+        result = self.compute(tasks, constraint_offset=axis.offset, network=network)
+
+        for i, task in enumerate(tasks):
+            if network.is_summary[i] or not result.scheduled[i]:
+                continue
+            task["start_date"] = f"{axis.date(int(result.early_start[i]))}T08:00:00"
+            task["finish_date"] = f"{axis.date(int(result.early_finish[i]))}T17:00:00"
+            stats["scheduled"] += 1
+
+        stats["summaries"] = self.roll_up_summaries(tasks, network, axis)
+        stats["cyclic"] = len(tasks) - sum(result.scheduled)
+        return stats
+
+    def project_finish(self, project: Dict[str, Any], calendar: Optional[Any] = None) -> Dict[str, Any]:
+        """
+        Finish date and duration schedule_dates would give the project,
+        without writing any task dates (for read-only views such as scenarios).
+        """
+        tasks = project.get("tasks", [])
+        axis = self._day_axis(project, calendar)
+        result = self.compute(tasks, constraint_offset=axis.offset, hierarchy=True, whole_days=True,
+                              hours_per_day=axis.hours_per_day)
+        if not any(result.scheduled):
+            return {"finish_date": None, "duration_days": 0}
+        end = int(result.project_end)
+        return {"finish_date": f"{axis.date(end)}T17:00:00", "duration_days": end}
+
+    def roll_up_summaries(
+        self,
+        tasks: List[Dict[str, Any]],
+        network: Optional[ScheduleNetwork] = None,
+        axis: Optional[DayAxis] = None
+    ) -> int:
+        """
+        Set summary start/finish/duration from their direct children, deepest first.
+        Returns the number of summaries updated.
+        """
+        if network is None:
+            network = ScheduleNetwork(tasks, hierarchy=True)
+        if axis is None:
+            axis = DayAxis(datetime.now())
+
+        summaries = [i for i in range(len(tasks)) if network.is_summary[i]]
+        summaries.sort(key=lambda i: -tasks[i].get("outline_number", "").count("."))
+
+        updated = 0
+        for i in summaries:
+            if self._roll_up_summary(tasks, i, network.children[i], axis) is not None:
+                updated += 1
+        return updated
+
+    def _roll_up_summary(self, tasks: List[Dict[str, Any]], index: int, children: List[int], axis: DayAxis) -> Optional[bool]:
+        """
+        Roll one summary up from its direct children.
+        Returns None if the children have no dates, else whether the summary dates changed.
+        """
+        min_start = None
+        max_finish = None
+        for c in children:
+            child = tasks[c]
+            child_start = (child.get("start_date") or "")[:10]
+            child_finish = (child.get("finish_date") or "")[:10]
+            if child_start and (min_start is None or child_start < min_start):
+                min_start = child_start
+            if child_finish and (max_finish is None or child_finish > max_finish):
+                max_finish = child_finish
+
+        return self._set_summary_dates(tasks[index], min_start, max_finish, axis)
+
+    def _roll_up_changes(
+        self,
+        tasks: List[Dict[str, Any]],
+        index: int,
+        children: List[int],
+        changes: Optional[List[tuple]],
+        axis: DayAxis
+    ) -> Optional[bool]:
+        """
+        Update one summary from the date changes of some of its children.
+
+        The summary's own start/finish are the running min/max of its
+        children, so a child moving outward just extends them. Only when the
+        child that held the extreme moves inward (or loses its date) are the
+        direct children aggregated again. changes is a list of
+        ((old_start, old_finish), (new_start, new_finish)) day strings; None
+        means unknown and re-aggregates. Same result as _roll_up_summary.
+        """
+        summary = tasks[index]
+        min_start = (summary.get("start_date") or "")[:10]
+        max_finish = (summary.get("finish_date") or "")[:10]
+        if changes is None or not (min_start and max_finish):
+            return self._roll_up_summary(tasks, index, children, axis)
+
+        for (old_start, old_finish), (new_start, new_finish) in changes:
+            if new_start and new_start < min_start:
+                min_start = new_start
+            elif old_start == min_start and new_start != old_start:
+                return self._roll_up_summary(tasks, index, children, axis)
+            if new_finish and new_finish > max_finish:
+                max_finish = new_finish
+            elif old_finish == max_finish and new_finish != old_finish:
+                return self._roll_up_summary(tasks, index, children, axis)
+
+        return self._set_summary_dates(summary, min_start, max_finish, axis)
+
+    def _set_summary_dates(self, summary: Dict[str, Any], min_start: Optional[str], max_finish: Optional[str],
+                           axis: DayAxis) -> Optional[bool]:
+        before = (summary.get("start_date"), summary.get("finish_date"))
+        if min_start:
+            summary["start_date"] = f"{min_start}T08:00:00"
+        if max_finish:
+            summary["finish_date"] = f"{max_finish}T17:00:00"
+        if not (min_start and max_finish):
+            return None
+        start, finish = axis.offset(min_start), axis.offset(max_finish)
+        if start is not None and finish is not None:
+            summary["duration"] = f"PT{(finish - start) * axis.hours_per_day}H0M0S"
+        return before != (summary["start_date"], summary["finish_date"])
+
+    # =========================================================================
+    # INCREMENTAL RESCHEDULING
+    # =========================================================================
+
+    def reschedule_from(
+        self,
+        project: Dict[str, Any],
+        task_ids: List[str],
+        anchored: Optional[List[str]] = None,
+        keep_start: Optional[List[str]] = None,
+        calendar: Optional[Any] = None,
+        network: Optional[ScheduleNetwork] = None
+    ) -> Dict[str, Any]:
+        """
+        Reschedule only the part of the project an edit can affect.
+
+        Starting from the edited tasks, dates are recomputed along their
+        successor cone and ancestor summaries, and propagation stops at any
+        task whose dates come out unchanged. Summaries are updated from the
+        changes of their children (see _roll_up_changes) rather than
+        re-aggregated. Tasks that are not reached keep
+        their dates, so the project is assumed to be scheduled before the edit.
+        Results match schedule_dates() on the same project.
+
+        Args:
+            project: Project dict (tasks are updated in place)
+            task_ids: IDs of the edited tasks
+            anchored: IDs whose dates were set directly by the edit (e.g. a
+                      typed finish date); they are kept and only pushed on to
+                      their successors
+            keep_start: IDs among task_ids whose start date is kept (e.g. a
+                        typed start); only their finish is derived
+            calendar: CalendarService to schedule on (see schedule_dates)
+            network: Hierarchical network of the tasks to reuse (e.g. the one
+                     cached for the schedule version); it must reflect the
+                     current links and outline numbers. Durations are read
+                     from the tasks. Built here if missing.
+
+        Returns:
+            Stats dict with "changed" (IDs whose dates changed), "visited"
+            (tasks recomputed) and "full" (True when an ALAP task was reached
+            and the whole project had to be rescheduled).
+        """
+        tasks = project.get("tasks", [])
+        stats = {"changed": [], "visited": 0, "full": False}
+        if not tasks:
+            return stats
+
+        axis = self._day_axis(project, calendar)
+        offset = axis.offset
+        hours_per_day = axis.hours_per_day
+
+        if network is None or network.tasks is not tasks or not network.hierarchy:
+            network = ScheduleNetwork(tasks, hierarchy=True, hours_per_day=hours_per_day)
+        index_by_id = network.index_by_id
+        parent, children = network.parent, network.children
+        leaf_descendants = network._leaf_descendants
+
+        kept = {index_by_id[task_id] for task_id in keep_start or [] if task_id in index_by_id}
+
+        def leaf_dates(i: int) -> Optional[tuple]:
+            """Same rules as the forward pass, reading predecessor dates from the tasks"""
+            task = tasks[i]
+            duration = int(max(parse_duration_days(task.get("duration"), hours_per_day), 0.0))
+            if i in kept:
+                start = offset(task.get("start_date"))
+                if start is not None:
+                    return start, start + duration
+            start = 0
+            for p, link_type, lag in network.preds[i]:  # including links on ancestor summaries
+                p_start = offset(tasks[p].get("start_date"))
+                p_finish = offset(tasks[p].get("finish_date"))
+                if p_start is None or p_finish is None:
+                    continue
+                lag = int(lag)
+                if link_type == LINK_SS:
+                    candidate = p_start + lag
+                elif link_type == LINK_FF:
+                    candidate = p_finish + lag - duration
+                elif link_type == LINK_SF:
+                    candidate = p_start + lag - duration
+                else:  # LINK_FS
+                    candidate = p_finish + lag
+                if candidate > start:
+                    start = candidate
+
+            constraint_type = task.get("constraint_type", 0) or 0
+            if constraint_type == CONSTRAINT_ALAP:
+                return None  # needs the backward pass
+            constraint = offset(task.get("constraint_date")) if constraint_type in (
+                CONSTRAINT_MSO, CONSTRAINT_MFO, CONSTRAINT_SNET, CONSTRAINT_FNET
+            ) else None
+            if constraint is not None:
+                if constraint_type == CONSTRAINT_MSO:
+                    start = constraint
+                elif constraint_type == CONSTRAINT_MFO:
+                    start = constraint - duration
+                elif constraint_type == CONSTRAINT_SNET:
+                    start = max(start, constraint)
+                else:  # CONSTRAINT_FNET
+                    start = max(start, constraint - duration)
+            return start, start + duration
+
+        queue: deque = deque()
+        queued = set()
+
+        def push(index: int) -> None:
+            if index not in queued:
+                queued.add(index)
+                queue.append(index)
+
+        # Summary -> date changes of its children since it was last rolled up
+        # (None: unknown, roll up from all children)
+        child_changes: Dict[int, Optional[List[tuple]]] = {}
+
+        def day_span(task: Dict[str, Any]) -> tuple:
+            return (task.get("start_date") or "")[:10], (task.get("finish_date") or "")[:10]
+
+        def push_dependents(index: int, before: Optional[tuple] = None) -> None:
+            for s, _, _ in network.succs[index]:  # links into a summary drive its leaves
+                push(s)
+            p = parent[index]
+            if p >= 0:
+                pending = child_changes.get(p, [])
+                if before is None or pending is None:
+                    child_changes[p] = None
+                else:
+                    pending.append((before, day_span(tasks[index])))
+                    child_changes[p] = pending
+                push(p)
+
+        changed = set()
+        fixed = {index_by_id[task_id] for task_id in anchored or [] if task_id in index_by_id}
+        for index in fixed:
+            changed.add(index)
+            push_dependents(index)
+        for task_id in task_ids:
+            index = index_by_id.get(task_id)
+            if index is None or index in fixed:
+                continue
+            push(index)
+            if children[index]:  # links on a summary drive its leaf tasks
+                for leaf in leaf_descendants(index):
+                    push(leaf)
+
+        # Each task is normally recomputed once; far more than that means a cycle
+        budget = 4 * len(tasks)
+        while queue:
+            i = queue.popleft()
+            queued.discard(i)
+            if i in fixed:
+                continue
+            stats["visited"] += 1
+            if stats["visited"] > budget:
+                print("[Reschedule] Stopped propagation: dependency cycle in the affected tasks")
+                break
+
+            before = day_span(tasks[i])
+            if children[i]:
+                if i not in child_changes:
+                    child_changes[i] = None  # seeded directly
+                if not self._roll_up_changes(tasks, i, children[i], child_changes.pop(i), axis):
+                    continue
+            else:
+                dates = leaf_dates(i)
+                if dates is None:
+                    self.schedule_dates(project, calendar)
+                    stats["full"] = True
+                    break
+                task = tasks[i]
+                start_date = f"{axis.date(dates[0])}T08:00:00"
+                finish_date = f"{axis.date(dates[1])}T17:00:00"
+                if task.get("start_date") == start_date and task.get("finish_date") == finish_date:
+                    continue
+                task["start_date"] = start_date
+                task["finish_date"] = finish_date
+
+            changed.add(i)
+            push_dependents(i, before)
+
+        stats["changed"] = [tasks[i].get("id") for i in sorted(changed)]
+        return stats
+
+    def _day_axis(self, project: Dict[str, Any], calendar: Optional[Any]) -> DayAxis:
+        project_start = self._parse_date(project.get("start_date", "")) or datetime.now().replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        if calendar is None and self.calendar_resolver is not None:
+            calendar = self.calendar_resolver()
+        return DayAxis(project_start, calendar)
+
+    def _parse_date(self, date_str: Optional[str]) -> Optional[datetime]:
+        if not date_str:
+            return None
+        try:
+            return datetime.fromisoformat(date_str.replace('Z', '+00:00').split('T')[0])
+        except ValueError:
+            return None
+
+
+# Singleton instance
+scheduling_engine = SchedulingEngine()
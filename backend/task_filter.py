@@ -0,0 +1,197 @@
+"""
+Task Filter for Sturgis Project
+Small query language for selecting tasks on the server, e.g. "critical and float<2"
+"""
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from scheduling_engine import parse_duration_days, parse_lag_days
+from wbs_index import WBSIndex, task_key
+
+
+# Terms, combined with and / or / not and parentheses:
+#   critical, milestone, summary, has_lag        flags
+#   float<2  percent_complete>=50  duration>5    numbers (days for float and duration)
+#   start>=2026-11-01  finish<2027-01-01         dates
+#   name:foundation  name:"slab on grade"        name contains (case-insensitive)
+#   subtree:3.2                                  the task at 3.2 and its descendants
+#   level<=2                                     outline level
+FLAGS = {"critical", "milestone", "summary", "has_lag"}
+NUMBER_FIELDS = {"float", "percent_complete", "duration", "level"}
+DATE_FIELDS = {"start", "finish"}
+COMPARISONS = {
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "=": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+}
+
+_TOKEN = re.compile(
+    r'\s*(?:(?P<paren>[()])'
+    r'|(?P<field>[A-Za-z_][\w-]*)\s*(?P<op><=|>=|!=|=|<|>|:)\s*(?P<value>"[^"]*"|[^\s()]+)'
+    r'|(?P<word>[A-Za-z_][\w-]*))'
+)
+_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+class TaskFilter:
+    """
+    A parsed filter expression.
+
+    Parsing validates the expression up front (ValueError with the reason).
+    Schedule terms (critical, float) read from a critical path result that
+    the caller supplies only when needs_schedule is set, and a top-level
+    subtree term narrows the scan to that subtree through the WBS index.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.needs_schedule = False
+        self.subtree: Optional[str] = None  # Outline all matches must lie under
+        self._schedule: Dict[str, Any] = {}
+        self._critical_ids: set = set()
+        self._tokens = self._tokenize(text)
+        self._pos = 0
+        self._predicate = self._parse_or(top_level=True)
+        if self._pos < len(self._tokens):
+            raise ValueError(f"Unexpected '{self._tokens[self._pos][1]}' in filter")
+
+    def select(self, tasks: List[Dict[str, Any]], index: Optional[WBSIndex] = None,
+               schedule: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Matching tasks, in task order (WBS order within a subtree)"""
+        self._schedule = schedule or {}
+        self._critical_ids = {task["id"] for task in self._schedule.get("critical_tasks", [])}
+        if self.subtree is not None:
+            if index is None or index.tasks is not tasks:
+                index = WBSIndex(tasks)
+            root = index.find(self.subtree)
+            candidates = index.subtree(task_key(root)) if root is not None else []
+        else:
+            candidates = tasks
+        return [task for task in candidates if self._predicate(task)]
+
+    # =========================================================================
+    # PARSING
+    # =========================================================================
+
+    def _tokenize(self, text: str) -> List[tuple]:
+        tokens = []
+        pos = 0
+        text = text.strip()
+        while pos < len(text):
+            match = _TOKEN.match(text, pos)
+            if not match or match.end() == pos:
+                raise ValueError(f"Cannot parse filter at '{text[pos:].strip()}'")
+            if match.group("paren"):
+                tokens.append(("paren", match.group("paren")))
+            elif match.group("field"):
+                value = match.group("value")
+                if value.startswith('"'):
+                    value = value[1:-1]
+                tokens.append(("term", (match.group("field").lower().replace("-", "_"), match.group("op"), value)))
+            else:
+                word = match.group("word").lower().replace("-", "_")
+                tokens.append(("keyword" if word in ("and", "or", "not") else "flag", word))
+            pos = match.end()
+        if not tokens:
+            raise ValueError("Empty filter")
+        return tokens
+
+    def _peek(self) -> Optional[tuple]:
+        return self._tokens[self._pos] if self._pos < len(self._tokens) else None
+
+    def _parse_or(self, top_level: bool = False) -> Predicate:
+        parts = [self._parse_and(top_level)]
+        while self._peek() == ("keyword", "or"):
+            self._pos += 1
+            parts.append(self._parse_and(False))
+        if len(parts) > 1:
+            if top_level:
+                self.subtree = None  # "a or b" cannot be narrowed to a subtree
+            return lambda task: any(part(task) for part in parts)
+        return parts[0]
+
+    def _parse_and(self, top_level: bool) -> Predicate:
+        parts = [self._parse_not(top_level)]
+        # "and" may be left out: "critical float<2"
+        while self._peek() is not None and self._peek() not in (("keyword", "or"), ("paren", ")")):
+            if self._peek() == ("keyword", "and"):
+                self._pos += 1
+            parts.append(self._parse_not(top_level))
+        if len(parts) > 1:
+            return lambda task: all(part(task) for part in parts)
+        return parts[0]
+
+    def _parse_not(self, top_level: bool) -> Predicate:
+        token = self._peek()
+        if token is None:
+            raise ValueError("Filter ends unexpectedly")
+        self._pos += 1
+        if token == ("keyword", "not"):
+            inner = self._parse_not(False)
+            return lambda task: not inner(task)
+        if token == ("paren", "("):
+            inner = self._parse_or(False)
+            if self._peek() != ("paren", ")"):
+                raise ValueError("Missing ')' in filter")
+            self._pos += 1
+            return inner
+        if token[0] == "flag":
+            return self._flag(token[1])
+        if token[0] == "term":
+            field, op, value = token[1]
+            if field == "subtree" and top_level and op in (":", "="):
+                self.subtree = value
+            return self._term(field, op, value)
+        raise ValueError(f"Unexpected '{token[1]}' in filter")
+
+    def _flag(self, name: str) -> Predicate:
+        if name not in FLAGS:
+            raise ValueError(f"Unknown filter term '{name}'")
+        if name == "critical":
+            self.needs_schedule = True
+            return lambda task: task.get("id") in self._critical_ids
+        if name == "has_lag":
+            return lambda task: any(parse_lag_days(pred.get("lag", 0)) != 0 for pred in task.get("predecessors") or [])
+        return lambda task: bool(task.get(name))
+
+    def _term(self, field: str, op: str, value: str) -> Predicate:
+        if field == "name":
+            if op not in (":", "="):
+                raise ValueError("Use name:text to match names")
+            needle = value.lower()
+            return lambda task: needle in (task.get("name") or "").lower()
+
+        if field == "subtree":
+            if op not in (":", "="):
+                raise ValueError("Use subtree:1.2 to match a subtree")
+            prefix = value + "."
+            return lambda task: task.get("outline_number") == value or task.get("outline_number", "").startswith(prefix)
+
+        compare = COMPARISONS.get("=" if op == ":" else op)
+        if field in DATE_FIELDS:
+            if not _DATE.match(value):
+                raise ValueError(f"Expected a date like 2026-11-01 for {field}, got '{value}'")
+            key = f"{field}_date"
+            return lambda task: bool(task.get(key)) and compare(task[key][:10], value)
+
+        if field in NUMBER_FIELDS:
+            try:
+                number = float(value)
+            except ValueError:
+                raise ValueError(f"Expected a number for {field}, got '{value}'")
+            if field == "float":
+                self.needs_schedule = True
+                return lambda task: (task.get("id") in self._schedule.get("task_floats", {})
+                                     and compare(self._schedule["task_floats"][task["id"]], number))
+            if field == "duration":
+                return lambda task: compare(parse_duration_days(task.get("duration")), number)
+            if field == "level":
+                return lambda task: compare(task.get("outline_number", "").count(".") + 1, number)
+            return lambda task: compare(task.get(field) or 0, number)
+
+        raise ValueError(f"Unknown filter field '{field}'")
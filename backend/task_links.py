@@ -0,0 +1,81 @@
+"""
+Task Links for Sturgis Project
+Dependency links point at the predecessor's stable task id; their outline numbers are display values
+"""
+from typing import Any, Dict, List, Optional
+
+
+# A link is a predecessor dict: {"predecessor_id", "outline_number", "type", "lag", "lag_format"}.
+# predecessor_id is authoritative whenever it is set, so inserting, moving,
+# deleting or renumbering tasks never has to rewrite links. outline_number is
+# what clients, MS Project XML and the AI commands read and write; it is
+# refreshed from the id at those boundaries. Links without an id (from a
+# client, an XML import or an AI command) are resolved from their outline.
+
+
+def link_target(pred: Dict[str, Any], index_by_id: Dict[str, int], index_by_outline: Dict[str, int]) -> Optional[int]:
+    """Index of the task a link points at, or None if it is dangling"""
+    pred_id = pred.get("predecessor_id")
+    if pred_id is not None:
+        return index_by_id.get(pred_id)
+    return index_by_outline.get(pred.get("outline_number"))
+
+
+def resolve_link_ids(tasks: List[Dict[str, Any]], links: Optional[List[Dict[str, Any]]] = None) -> int:
+    """
+    Set predecessor_id from the outline number.
+
+    Args:
+        tasks: Task list the outline numbers refer to
+        links: Links to resolve (always from their outline, e.g. links sent by
+               a client); default: every link in tasks that has no id yet
+
+    Returns:
+        Number of links resolved
+    """
+    if links is None:
+        links = [pred for task in tasks for pred in task.get("predecessors") or [] if not pred.get("predecessor_id")]
+    if not links:
+        return 0
+    id_by_outline = {task.get("outline_number"): task.get("id") for task in tasks}
+    resolved = 0
+    for pred in links:
+        pred_id = id_by_outline.get(pred.get("outline_number"))
+        if pred_id is not None:
+            pred["predecessor_id"] = pred_id
+            resolved += 1
+        else:
+            pred.pop("predecessor_id", None)
+    return resolved
+
+
+def relink_by_outline(tasks: List[Dict[str, Any]]) -> int:
+    """Re-resolve every link from its outline number, e.g. after the tasks were given new ids"""
+    return resolve_link_ids(tasks, [pred for task in tasks for pred in task.get("predecessors") or []])
+
+
+def refresh_link_outlines(tasks: List[Dict[str, Any]]) -> int:
+    """Set every link's outline number from its predecessor id; returns the number changed"""
+    outline_by_id = {task.get("id"): task.get("outline_number") for task in tasks}
+    changed = 0
+    for task in tasks:
+        for pred in task.get("predecessors") or []:
+            outline = outline_by_id.get(pred.get("predecessor_id"))
+            if outline is not None and pred.get("outline_number") != outline:
+                pred["outline_number"] = outline
+                changed += 1
+    return changed
+
+
+def retarget_link(pred: Dict[str, Any], task: Dict[str, Any]) -> None:
+    """Point a link at another task"""
+    pred["outline_number"] = task.get("outline_number")
+    pred["predecessor_id"] = task.get("id")
+
+
+def links_to(pred: Dict[str, Any], task_ids: set, outlines: set) -> bool:
+    """Whether a link points at one of the given tasks (by id, or by outline for links without one)"""
+    pred_id = pred.get("predecessor_id")
+    if pred_id is not None:
+        return pred_id in task_ids
+    return pred.get("outline_number") in outlines
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""Test the SQLite persistence layer"""
+
+import asyncio
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from database import AsyncDatabaseService, DatabaseService
+from test_scheduling_engine import make_task
+
+
+class CountingDatabase(DatabaseService):
+    """DatabaseService that records every SQL statement it runs"""
+
+    def __init__(self, db_path: str):
+        self.statements = []
+        super().__init__(db_path)
+
+    @contextmanager
+    def get_connection(self):
+        with super().get_connection() as conn:
+            conn.set_trace_callback(self.statements.append)
+            try:
+                yield conn
+            finally:
+                conn.set_trace_callback(None)
+
+
+class SlowSaveDatabase(DatabaseService):
+    """DatabaseService whose saves hold the write transaction for a while"""
+
+    def save_task_changes(self, *args, **kwargs):
+        with self.get_connection():
+            changes = super().save_task_changes(*args, **kwargs)
+            time.sleep(0.5)
+        return changes
+
+
+def make_tasks(count):
+    tasks = [make_task("1", 0, id="t1", summary=True)]
+    for i in range(1, count):
+        preds = [{"outline_number": f"1.{i - 1}", "predecessor_id": f"t1.{i - 1}", "type": 1, "lag": 0}] if i > 1 else []
+        tasks.append(make_task(f"1.{i}", 8, preds, id=f"t1.{i}"))
+    return tasks
+
+
+def selects(db):
+    return [s for s in db.statements if s.lstrip().upper().startswith("SELECT")]
+
+
+def test_get_tasks_is_set_based():
+    """Tasks, predecessors and baselines load in three queries, grouped onto the right tasks"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CountingDatabase(str(Path(tmp) / "projects.db"))
+        project_id = db.create_project("P", "2024-01-01", "2024-01-01")
+        db.bulk_create_tasks(project_id, make_tasks(200))
+        db.set_baseline(project_id, 0)
+
+        db.statements.clear()
+        tasks = db.get_tasks(project_id)
+        assert len(selects(db)) == 3, selects(db)
+        assert len(tasks) == 200 and tasks[0]["id"] == "t1"
+        assert tasks[5]["predecessors"] == [{"outline_number": "1.4", "type": 1, "lag": 0.0, "lag_format": 7,
+                                             "predecessor_id": "t1.4"}]
+        assert all(len(task["baselines"]) == 1 and task["baselines"][0]["number"] == 0 for task in tasks)
+
+        db.statements.clear()
+        subtree = db.get_tasks(project_id, "1.10")
+        assert len(selects(db)) == 3
+        assert [t["id"] for t in subtree] == ["t1.10"] and subtree[0]["predecessors"][0]["predecessor_id"] == "t1.9"
+
+        db.statements.clear()
+        assert db.get_task("t1.5") == tasks[5]
+        assert len(selects(db)) == 3
+
+
+def test_historical_data_is_set_based():
+    """Historical learning data loads tasks and links for every project in one query each"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CountingDatabase(str(Path(tmp) / "projects.db"))
+        for name in ("A", "B", "C"):
+            project_id = db.create_project(name, "2024-01-01", "2024-01-01")
+            db.bulk_create_tasks(project_id, [dict(t, id=f"{name}{t['id']}") for t in make_tasks(10)])
+
+        db.statements.clear()
+        projects = db.get_historical_project_data()
+        assert len(selects(db)) == 3
+        assert sorted(p["name"] for p in projects) == ["A", "B", "C"]
+        assert all(len(p["tasks"]) == 10 and len(p["dependencies"]) == 8 for p in projects)
+
+
+def test_pooled_connections():
+    """One tuned WAL connection per thread; nested blocks share the outer transaction"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseService(str(Path(tmp) / "projects.db"))
+        with db.get_connection() as first:
+            assert first.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+            assert first.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+        with db.get_connection() as second:
+            assert second is first
+
+        other = []
+        thread = threading.Thread(target=lambda: other.append(db.get_project("missing") or db._local.conn))
+        thread.start()
+        thread.join()
+        assert other[0] is not first
+
+        project_id = db.create_project("P", "2024-01-01", "2024-01-01")
+        try:
+            with db.get_connection():
+                db.bulk_create_tasks(project_id, make_tasks(3))  # Joins the outer transaction
+                raise RuntimeError("abort")
+        except RuntimeError:
+            pass
+        assert db.get_tasks(project_id) == []
+
+        db.bulk_create_tasks(project_id, make_tasks(3))
+        assert db.delete_project(project_id)
+        with db.get_connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == 0  # Cascaded
+            assert conn.execute("SELECT COUNT(*) FROM predecessors").fetchone()[0] == 0
+        db.close()
+
+
+def test_save_writes_only_changes():
+    """A save diffs against the last load/save and writes just the changed rows in one transaction"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CountingDatabase(str(Path(tmp) / "projects.db"))
+        project_id = db.create_project("P", "2024-01-01", "2024-01-01")
+        db.bulk_create_tasks(project_id, make_tasks(5000))
+        tasks = db.get_tasks(project_id)
+
+        tasks[10]["name"] = "Renamed"
+        tasks[20]["percent_complete"] = 50
+        tasks[30]["predecessors"] = []
+        tasks.append(dict(make_task("1.5000", 8, [{"outline_number": "1.10", "predecessor_id": "t1.10",
+                                                    "type": 1, "lag": 0}]), id="new"))
+        del tasks[40]
+
+        db.statements.clear()
+        changes = db.save_task_changes(project_id, tasks)
+        assert changes == {"created": 1, "updated": 2, "relinked": 1, "deleted": 1}
+        writes = [s for s in db.statements if not s.lstrip().upper().startswith("SELECT")]
+        assert len(writes) <= 10, writes  # One per row written (executemany traces each), timestamp, BEGIN
+        stored = {t["id"]: t for t in db.get_tasks(project_id)}
+        assert sorted(stored) == sorted(t["id"] for t in tasks)
+        assert stored["t1.10"]["name"] == "Renamed" and stored["t1.20"]["percent_complete"] == 50
+        assert stored["t1.30"]["predecessors"] == [] and stored["new"]["predecessors"][0]["predecessor_id"] == "t1.10"
+
+        db.statements.clear()
+        assert db.save_task_changes(project_id, tasks) == {"created": 0, "updated": 0, "relinked": 0, "deleted": 0}
+        assert db.statements == []
+
+        # A write through another method forgets the recorded state; the next save reloads it
+        db.update_task("t1.1", {"name": "Elsewhere"})
+        assert db.save_task_changes(project_id, tasks)["updated"] == 1
+        assert db.get_task("t1.1")["name"] == "Task 1.1"
+
+
+def test_bulk_import():
+    """Bulk import stores tasks, links and baselines, with or without deferred indexes"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = CountingDatabase(str(Path(tmp) / "projects.db"))
+        tasks = make_tasks(50)
+        tasks[3]["baselines"] = [{"number": 0, "start": "2024-01-01", "finish": "2024-01-02", "interim": True}]
+        del tasks[4]["id"]
+
+        for defer_indexes in (False, True):
+            project_id = db.create_project("P", "2024-01-01", "2024-01-01")
+            batch = [dict(t, id=f"{defer_indexes}{t['id']}") if "id" in t else dict(t) for t in tasks]
+            assert db.bulk_create_tasks(project_id, batch, defer_indexes=defer_indexes) == 50
+
+            stored = db.get_tasks(project_id)
+            assert len(stored) == 50 and all(t["id"] for t in stored)
+            assert stored[3]["baselines"][0]["interim"] is True
+            assert stored[5]["predecessors"][0]["predecessor_id"] == "t1.4"
+
+        with db.get_connection() as conn:
+            indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert "idx_tasks_outline_key" in indexes and "idx_predecessors_task" in indexes
+
+
+def test_async_reads_during_a_save():
+    """A long save runs on a database thread; the event loop and other reads carry on meanwhile"""
+    async def scenario(adb, project_id, tasks):
+        save = asyncio.ensure_future(adb.save_task_changes(project_id, tasks))
+        await asyncio.sleep(0.05)  # Save under way
+        started = time.perf_counter()
+        project = await adb.get_project(project_id)
+        read_seconds = time.perf_counter() - started
+        assert not save.done()
+        thread_name = await adb.run(lambda: threading.current_thread().name)
+        return project, read_seconds, await save, thread_name
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = SlowSaveDatabase(str(Path(tmp) / "projects.db"))
+        project_id = db.create_project("P", "2024-01-01", "2024-01-01")
+        tasks = make_tasks(500)
+
+        project, read_seconds, changes, thread_name = asyncio.run(
+            scenario(AsyncDatabaseService(db), project_id, tasks))
+        assert project["name"] == "P"
+        assert read_seconds < 0.25, read_seconds
+        assert changes["created"] == 500 and len(db.get_tasks(project_id)) == 500
+        assert thread_name.startswith("sqlite")
+
+
+def test_save_baseline_follows_commits():
+    """A rolled-back save keeps the old baseline; dirty ids are written even when the baseline looks current"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseService(str(Path(tmp) / "projects.db"))
+        project_id = db.create_project("P", "2024-01-01", "2024-01-01")
+        db.bulk_create_tasks(project_id, make_tasks(20))
+        tasks = db.get_tasks(project_id)
+
+        tasks[5]["name"] = "Renamed"
+        try:
+            with db.get_connection():
+                db.save_task_changes(project_id, tasks)
+                raise RuntimeError("rolled back")
+        except RuntimeError:
+            pass
+        assert db.get_task("t1.5")["name"] == "Task 1.5"
+        assert db.save_task_changes(project_id, tasks)["updated"] == 1
+        assert db.get_task("t1.5")["name"] == "Renamed"
+
+        # Another process writes a task behind this instance's back, then the user sets it back
+        DatabaseService(str(Path(tmp) / "projects.db")).update_task("t1.6", {"name": "Elsewhere"})
+        assert db.save_task_changes(project_id, tasks)["updated"] == 0
+        changes = db.save_task_changes(project_id, tasks, dirty_ids={"t1.6"}, dirty_link_ids={"t1.6"})
+        assert changes["updated"] == 1 and changes["relinked"] == 1
+        assert db.get_task("t1.6")["name"] == "Task 1.6"
+
+
+def test_api_reads_during_a_save():
+    """Through the API, reads are answered while /api/project/save writes, and calendars load on database threads"""
+    import database
+    import httpx
+    from calendar_service import calendar_cache
+
+    async def scenario(main):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=30) as client:
+            registered = await client.post("/api/auth/register", json={
+                "name": "Tester", "email": f"{uuid.uuid4().hex}@example.com", "password": "secret12"})
+            client.headers["Authorization"] = f"Bearer {registered.json()['access_token']}"
+            assert (await client.post("/api/projects/new", params={"name": "P"})).status_code == 200
+            main.current_project["tasks"] = make_tasks(500)
+
+            save = asyncio.ensure_future(client.post("/api/project/save"))
+            await asyncio.sleep(0.05)  # Save under way
+            started = time.perf_counter()
+            reads = [await client.get("/api/projects"), await client.get("/api/timeline", params={"width": 800})]
+            read_seconds = time.perf_counter() - started
+            assert not save.done()
+            return reads, read_seconds, await save
+
+    with tempfile.TemporaryDirectory() as tmp:
+        data_dir, database.DATA_DIR = database.DATA_DIR, tmp  # For main's databases, if not imported yet
+        import main
+        database.DATA_DIR = data_dir
+        saved_db, saved_adb = main.db, main.adb
+        main.db = SlowSaveDatabase(str(Path(tmp) / "projects.db"))
+        main.adb = AsyncDatabaseService(main.db)
+        loads = []
+
+        def load_calendar(project_id):
+            loads.append(threading.current_thread().name)
+            return main.db.get_project_calendar(project_id)
+
+        calendar_cache.set_loader(load_calendar)
+        try:
+            reads, read_seconds, save = asyncio.run(scenario(main))
+            assert [read.status_code for read in reads] == [200, 200], [read.text for read in reads]
+            assert read_seconds < 0.25, read_seconds
+            assert save.status_code == 200 and save.json()["new_tasks"] == 500
+            assert len(main.db.get_tasks(main.current_project_id)) == 500
+            assert loads and all(name.startswith("sqlite") for name in loads), loads
+        finally:
+            main.db, main.adb = saved_db, saved_adb
+            calendar_cache.set_loader(saved_db.get_project_calendar)
+            calendar_cache.invalidate()
+            main.current_project, main.current_project_id = None, None
+
+
+if __name__ == "__main__":
+    for test in (test_get_tasks_is_set_based, test_historical_data_is_set_based, test_pooled_connections,
+                 test_save_writes_only_changes, test_bulk_import, test_async_reads_during_a_save,
+                 test_save_baseline_follows_commits, test_api_reads_during_a_save):
+        test()
+        print(f"✅ {test.__name__}")
+    print("✅ All database tests passed!")
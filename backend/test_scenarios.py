@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""Test copy-on-write what-if scenarios"""
+
+from copy import deepcopy
+
+from ai_project_editor import ai_project_editor
+from scenarios import ScenarioStore, TaskCopy
+from test_scheduling_engine import make_task
+
+
+def make_project():
+    return {"name": "Base", "start_date": "2024-01-01", "tasks": [
+        make_task("1", 40),
+        make_task("2", 16, [{"outline_number": "1", "type": 1, "lag": 0}]),
+        make_task("3", 8, [{"outline_number": "2", "type": 1, "lag": 0}]),
+    ]}
+
+
+def test_create_copies_nothing():
+    """A new scenario stores nothing and reads fall through to the base"""
+    base = make_project()
+    scenario = ScenarioStore().create("p1", "What if")
+    view = scenario.project(base)
+    assert all(view_task is base_task for view_task, base_task in zip(view["tasks"], base["tasks"]))
+    assert scenario.to_dict()["changed_tasks"] == 0
+
+    # Base edits to tasks the scenario has not touched show through
+    base["tasks"][0]["name"] = "Renamed"
+    assert scenario.project(base)["tasks"][0]["name"] == "Renamed"
+
+
+def test_update_keeps_only_differences():
+    """Only changed tasks, deletions, reordering and changed fields are stored"""
+    base = make_project()
+    scenario = ScenarioStore().create("p1", "What if")
+
+    copy = scenario.working_copy(base)
+    copy["tasks"][1]["duration"] = "PT8H0M0S"
+    copy["start_date"] = "2024-02-01"
+    scenario.update(base, copy)
+    assert set(scenario.overrides) == {"2"} and scenario.order is None
+    assert scenario.fields == {"start_date": "2024-02-01"}
+
+    copy = scenario.working_copy(base)
+    del copy["tasks"][0]
+    copy["tasks"].reverse()
+    scenario.update(base, copy)
+    assert scenario.deleted == {"1"} and scenario.order == ["3", "2"]
+    assert [t["id"] for t in scenario.project(base)["tasks"]] == ["3", "2"]
+    assert scenario.project(base)["tasks"][1]["duration"] == "PT8H0M0S"
+
+    # The base project is untouched
+    assert base == make_project()
+
+
+def test_edit_in_scenario_leaves_base_untouched():
+    """Editing operations run on a working copy; the base keeps its structure"""
+    base = make_project()
+    scenario = ScenarioStore().create("p1", "What if")
+
+    copy = scenario.working_copy(base)
+    result = ai_project_editor._move_task(copy, "3", "1", "under")
+    assert result["success"], result
+    scenario.update(base, result.get("project", copy))
+
+    assert base == make_project()
+    moved = next(t for t in scenario.project(base)["tasks"] if t["id"] == "3")
+    assert moved["outline_number"] == "1.1"
+
+
+def test_working_copy_copies_on_write():
+    """Working copy tasks get their own nested values on first write; update compares only those"""
+    base = make_project()
+    scenario = ScenarioStore().create("p1", "What if")
+
+    copy = scenario.working_copy(base)
+    first, second, third = copy["tasks"]
+    assert isinstance(first, TaskCopy) and first["name"] == "Task 1"
+    first["duration"] = first["duration"]  # Same value: not a change
+    second["predecessors"].append({"outline_number": "3", "type": 1, "lag": 0})
+    third.pop("missing", None)
+    assert [t.touched for t in copy["tasks"]] == [False, True, False]
+    assert len(base["tasks"][1]["predecessors"]) == 1  # The base list was not written through
+    cloned = deepcopy(second)
+    assert type(cloned) is dict and cloned == second
+
+    scenario.update(base, copy)
+    assert set(scenario.overrides) == {"2"} and len(scenario.overrides["2"]["predecessors"]) == 2
+    assert type(scenario.overrides["2"]) is dict
+
+    # An untouched task keeps its override; a task written back to the base value drops it
+    copy = scenario.working_copy(base)
+    copy["tasks"][2]["name"] = "Changed"
+    scenario.update(base, copy)
+    assert set(scenario.overrides) == {"2", "3"}
+    copy = scenario.working_copy(base)
+    copy["tasks"][2]["name"] = base["tasks"][2]["name"]
+    scenario.update(base, copy)
+    assert set(scenario.overrides) == {"2"}
+
+    # Edits deeper down (a list inside a link) are tracked too
+    base["tasks"][2]["predecessors"][0]["notes"] = ["original"]
+    copy = scenario.working_copy(base)
+    copy["tasks"][2]["predecessors"][0]["notes"].append("longer lag")
+    assert [t.touched for t in copy["tasks"]] == [False, False, True]
+    scenario.update(base, copy)
+    assert scenario.overrides["3"]["predecessors"][0]["notes"] == ["original", "longer lag"]
+    assert base["tasks"][2]["predecessors"][0]["notes"] == ["original"]
+    del base["tasks"][2]["predecessors"][0]["notes"]
+    assert base == make_project()
+
+
+def test_store_scopes_scenarios_to_project():
+    """Scenarios are looked up per project and dropped with it"""
+    store = ScenarioStore()
+    first = store.create("p1", "A")
+    store.create("p2", "B")
+    assert store.get(first.id, "p2") is None and store.get(first.id, "p1") is first
+    store.drop_project("p1")
+    assert store.get(first.id) is None and len(store.list("p2")) == 1
+
+
+if __name__ == "__main__":
+    for test in (test_create_copies_nothing, test_update_keeps_only_differences,
+                 test_edit_in_scenario_leaves_base_untouched, test_working_copy_copies_on_write,
+                 test_store_scopes_scenarios_to_project):
+        test()
+        print(f"✅ {test.__name__}")
+    print("✅ All scenario tests passed!")
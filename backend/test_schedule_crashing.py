@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""Test the time-cost crashing optimizer"""
+
+from schedule_crashing import crashing_optimizer
+from test_scheduling_engine import make_task
+
+
+def make_tasks():
+    # Two 10-day paths into task 3; the path through task 1 also has a 2-day lag
+    return [
+        make_task("1", 80),
+        make_task("2", 80),
+        make_task("3", 40, [{"outline_number": "1", "type": 1, "lag": 2},
+                            {"outline_number": "2", "type": 1, "lag": 0}]),
+        make_task("4", 8, [{"outline_number": "3", "type": 1, "lag": 0}]),
+    ]
+
+
+def test_free_lag_first_then_cheapest_cuts():
+    """Lags are cut first, parallel critical paths are cut together, savings are measured"""
+    plan = crashing_optimizer.crash(make_tasks(), target_days=12)
+    assert plan["baseline_duration_days"] == 18.0
+    steps = [(step["elements"], step["cut_days"], step["savings_days"]) for step in plan["steps"]]
+    assert steps == [
+        (["Lag Task 1 -> Task 3"], 0.75, 0.75),
+        (["Compress Task 1"], 1.25, 1.25),          # until task 2's path becomes critical
+        (["Compress Task 3"], 1.0, 1.0),            # one cut shortens both paths
+        (["Compress Task 1", "Compress Task 2"], 0.75, 0.75),
+    ], steps
+    assert plan["total_cost_usd"] == 1875.0
+    # Task 1 is out of capacity, so task 2 alone can no longer shorten the project
+    assert not plan["achieved"] and plan["final_duration_days"] == 14.25
+    assert plan["total_savings_days"] == sum(step["savings_days"] for step in plan["steps"])
+    # Each change carries its share of the savings measured in the steps that cut it
+    savings = {change["task_outline"] + change["change_type"][0]: change["savings_days"] for change in plan["changes"]}
+    assert savings == {"3l": 0.75, "1d": 1.625, "3d": 1.0, "2d": 0.375}, savings
+    lag = plan["changes"][0]
+    assert lag["change_type"] == "lag_reduction" and lag["predecessor_id"] == "1" and lag["task_id"] == "3"
+
+
+def test_stops_at_target():
+    """Crashing stops as soon as the target duration is reached"""
+    plan = crashing_optimizer.crash(make_tasks(), target_days=17, reduce_lags=False)
+    assert plan["achieved"] and plan["final_duration_days"] == 17.0
+    assert [c["change_type"] for c in plan["changes"]] == ["duration_compression"]
+    assert plan["changes"][0]["duration_format"] == "PT72H0M0S"
+
+
+def test_cost_curve_reuses_one_run():
+    """Each target's cost matches a separate crashing run to that target"""
+    curve = crashing_optimizer.cost_curve(make_tasks(), [17, 16, 15, 14, 13])
+    points = [(p["target_days"], p["achievable"], p["duration_days"], p["cost_usd"]) for p in curve["points"]]
+    assert points == [
+        (17, True, 17.0, 125.0),
+        (16, True, 16.0, 625.0),
+        (15, True, 15.0, 1125.0),
+        (14, False, 14.25, 1875.0),
+        (13, False, 14.25, 1875.0),
+    ], points
+    for point in curve["points"][:3]:
+        assert crashing_optimizer.crash(make_tasks(), point["target_days"])["total_cost_usd"] == point["cost_usd"]
+
+
+if __name__ == "__main__":
+    for test in (test_free_lag_first_then_cheapest_cuts, test_stops_at_target, test_cost_curve_reuses_one_run):
+        test()
+        print(f"✅ {test.__name__}")
+    print("✅ All crashing tests passed!")
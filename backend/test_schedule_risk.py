@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Test the Monte Carlo schedule risk simulation"""
+
+import schedule_risk
+from scheduling_engine import NUMPY_AVAILABLE
+from schedule_risk import schedule_risk_simulator
+from test_scheduling_engine import make_task
+
+
+def make_project():
+    return {"start_date": "2024-01-01", "tasks": [
+        make_task("1", 40),
+        make_task("2", 16, [{"outline_number": "1", "type": 1, "lag": 0}]),
+        make_task("3", 8),                                                   # 6 days of float
+        make_task("4", 8, [{"outline_number": "2", "type": 1, "lag": 0},
+                           {"outline_number": "3", "type": 1, "lag": 0}]),
+    ]}
+
+
+def test_no_spread_matches_cpm():
+    """Without duration spread every iteration reproduces the deterministic schedule"""
+    if not NUMPY_AVAILABLE:
+        print("  (NumPy not installed, skipped)")
+        return
+    result = schedule_risk_simulator.simulate(make_project(), iterations=50, optimistic_factor=1.0, pessimistic_factor=1.0)
+    assert result["deterministic_finish_days"] == 8.0
+    assert result["finish_days"]["p50"] == result["finish_days"]["p95"] == 8.0
+    assert result["finish_dates"]["p95"] == "2024-01-09"
+    assert result["probability_on_time"] == 1.0
+    indexes = {entry["outline_number"]: entry["criticality_index"] for entry in result["task_criticality"]}
+    assert indexes == {"1": 1.0, "2": 1.0, "4": 1.0}, indexes
+
+
+def test_spread_percentiles_and_seed():
+    """Sampled finishes are ordered P50 <= P80 <= P95 and repeatable with a seed"""
+    if not NUMPY_AVAILABLE:
+        print("  (NumPy not installed, skipped)")
+        return
+    for distribution in ("pert", "triangular"):
+        first = schedule_risk_simulator.simulate(make_project(), iterations=2000, distribution=distribution, seed=11)
+        second = schedule_risk_simulator.simulate(make_project(), iterations=2000, distribution=distribution, seed=11)
+        days = first["finish_days"]
+        assert 8.0 * 0.8 <= days["min"] <= days["p50"] <= days["p80"] <= days["p95"] <= days["max"] <= 8.0 * 1.5
+        assert days == second["finish_days"]
+        # Task 3's float is larger than any sampled overrun, so it is never critical
+        indexes = {entry["outline_number"]: entry["criticality_index"] for entry in first["task_criticality"]}
+        assert "3" not in indexes and indexes["1"] == 1.0, indexes
+
+
+def test_process_pool_matches_in_process():
+    """Batches spread over the shared process pool give the in-process result, and the pool is reused"""
+    if not NUMPY_AVAILABLE:
+        print("  (NumPy not installed, skipped)")
+        return
+    cells = schedule_risk.MAX_BATCH_CELLS
+    schedule_risk.MAX_BATCH_CELLS = 500  # Several batches
+    try:
+        local = schedule_risk_simulator.simulate(make_project(), iterations=1000, seed=5)
+        pooled = schedule_risk_simulator.simulate(make_project(), iterations=1000, seed=5, workers=3)
+        pool = schedule_risk._pool()
+        schedule_risk_simulator.simulate(make_project(), iterations=1000, seed=5, workers=2)
+    finally:
+        schedule_risk.MAX_BATCH_CELLS = cells
+    assert pooled["finish_days"] == local["finish_days"]
+    assert pooled["task_criticality"] == local["task_criticality"]
+    assert schedule_risk._pool() is pool
+
+
+if __name__ == "__main__":
+    for test in (test_no_spread_matches_cpm, test_spread_percentiles_and_seed, test_process_pool_matches_in_process):
+        test()
+        print(f"✅ {test.__name__}")
+    print("✅ All schedule risk tests passed!")
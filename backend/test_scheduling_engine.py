@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""Test the CPM scheduling engine (link types, constraints, summaries, cycles)"""
+
+from datetime import datetime
+
+from calendar_service import CalendarService
+from scheduling_engine import NUMPY_AVAILABLE, ScheduleNetwork, scheduling_engine
+
+
+def make_task(outline, hours, predecessors=None, **extra):
+    task = {
+        "id": outline,
+        "name": f"Task {outline}",
+        "outline_number": outline,
+        "outline_level": len(outline.split(".")),
+        "duration": f"PT{hours}H0M0S",
+        "summary": False,
+        "predecessors": predecessors or []
+    }
+    task.update(extra)
+    return task
+
+
+def test_link_types():
+    """FS/SS/FF/SF links produce the expected early starts"""
+    tasks = [
+        make_task("1", 40),                                                # 5 days
+        make_task("2", 16, [{"outline_number": "1", "type": 1, "lag": 2}]),  # FS +2
+        make_task("3", 16, [{"outline_number": "1", "type": 3, "lag": 1}]),  # SS +1
+        make_task("4", 16, [{"outline_number": "1", "type": 0, "lag": 0}]),  # FF
+        make_task("5", 16, [{"outline_number": "1", "type": 2, "lag": 3}]),  # SF +3
+    ]
+    result = scheduling_engine.compute(tasks)
+    assert result.early_start == [0.0, 7.0, 1.0, 3.0, 1.0], result.early_start
+    assert result.project_end == 9.0
+    # Task 1 drives task 2, which ends the project
+    assert result.total_float(0) == 0.0 and result.total_float(1) == 0.0
+    assert result.total_float(2) == 6.0
+
+
+def test_constraints():
+    """MSO pins the start date, SNET delays it, FNLT pulls late finish in"""
+    tasks = [
+        make_task("1", 8, constraint_type=2, constraint_date="2024-01-11"),
+        make_task("2", 8, [{"outline_number": "1", "type": 1, "lag": 0}], constraint_type=4, constraint_date="2024-01-20"),
+        make_task("3", 8, constraint_type=7, constraint_date="2024-01-05"),
+    ]
+    project = {"start_date": "2024-01-01", "tasks": tasks}
+    scheduling_engine.schedule_dates(project)
+    assert tasks[0]["start_date"] == "2024-01-11T08:00:00"
+    assert tasks[1]["start_date"] == "2024-01-20T08:00:00"
+    assert tasks[2]["start_date"] == "2024-01-01T08:00:00"
+
+
+def test_summary_rollup_and_summary_predecessor():
+    """Summaries roll up from children and can drive successors"""
+    tasks = [
+        make_task("1", 8, summary=True),
+        make_task("1.1", 16),
+        make_task("1.2", 24, [{"outline_number": "1.1", "type": 1, "lag": 0}]),
+        make_task("2", 8, [{"outline_number": "1", "type": 1, "lag": 0}]),
+    ]
+    project = {"start_date": "2024-01-01", "tasks": tasks}
+    stats = scheduling_engine.schedule_dates(project)
+    assert stats == {"scheduled": 3, "summaries": 1, "cyclic": 0}, stats
+    assert tasks[0]["start_date"] == "2024-01-01T08:00:00"
+    assert tasks[0]["finish_date"] == "2024-01-06T17:00:00"
+    assert tasks[0]["duration"] == "PT40H0M0S"
+    assert tasks[3]["start_date"] == "2024-01-06T08:00:00"
+
+
+def test_cycle_is_skipped():
+    """Tasks in a dependency cycle are left untouched"""
+    tasks = [
+        make_task("1", 8, [{"outline_number": "2", "type": 1, "lag": 0}], start_date="2024-03-01T08:00:00"),
+        make_task("2", 8, [{"outline_number": "1", "type": 1, "lag": 0}]),
+        make_task("3", 8),
+    ]
+    project = {"start_date": "2024-01-01", "tasks": tasks}
+    stats = scheduling_engine.schedule_dates(project)
+    assert stats["cyclic"] == 2
+    assert tasks[0]["start_date"] == "2024-03-01T08:00:00"
+    assert tasks[2]["start_date"] == "2024-01-01T08:00:00"
+
+
+def test_reschedule_from_stops_at_unchanged_dates():
+    """Incremental rescheduling follows successors and summaries, then stops, on a network built before the edit"""
+    tasks = [
+        make_task("1", 8, summary=True),
+        make_task("1.1", 16),
+        make_task("1.2", 16, [{"outline_number": "1.1", "type": 1, "lag": 0}]),
+        make_task("2", 8, [{"outline_number": "1", "type": 1, "lag": 0}]),
+        make_task("3", 8, [{"outline_number": "2", "type": 1, "lag": 0}], constraint_type=4, constraint_date="2024-02-01"),
+        make_task("4", 8, [{"outline_number": "3", "type": 1, "lag": 0}]),
+    ]
+    project = {"start_date": "2024-01-01", "tasks": tasks}
+    scheduling_engine.schedule_dates(project)
+    network = ScheduleNetwork(tasks, hierarchy=True)  # Links unchanged by the edit: reused as is
+
+    tasks[1]["duration"] = "PT40H0M0S"
+    stats = scheduling_engine.reschedule_from(project, ["1.1"], network=network)
+    # Task 3 is held by its SNET constraint, so task 4 is never reached
+    assert stats["changed"] == ["1", "1.1", "1.2", "2"], stats
+    assert stats["visited"] == 5, stats
+    assert tasks[3]["start_date"] == "2024-01-08T08:00:00"
+
+    expected = [(t["start_date"], t["finish_date"]) for t in tasks]
+    scheduling_engine.schedule_dates(project)
+    assert [(t["start_date"], t["finish_date"]) for t in tasks] == expected
+
+
+def test_calendar_skips_weekends_and_holidays():
+    """Working-day calendar: weekends and holidays are skipped, overrides are worked"""
+    calendar = CalendarService(work_week=[1, 2, 3, 4, 5], exceptions=[
+        {"exception_date": "2024-01-03", "is_working": False},  # Wednesday holiday
+        {"exception_date": "2024-01-13", "is_working": True},   # Saturday worked
+    ])
+    assert calendar.add_working_days(datetime(2024, 1, 1), 5) == datetime(2024, 1, 9)
+    assert calendar.get_working_days_between(datetime(2024, 1, 1), datetime(2024, 1, 15)) == 10.0
+    assert calendar.subtract_working_days(datetime(2024, 1, 7), 2) == datetime(2024, 1, 2)
+
+    tasks = [
+        make_task("1", 16),
+        make_task("2", 24, [{"outline_number": "1", "type": 1, "lag": 0}]),
+        make_task("3", 8, constraint_type=4, constraint_date="2024-01-06"),
+    ]
+    project = {"start_date": "2023-12-30", "tasks": tasks}  # Saturday
+    scheduling_engine.schedule_dates(project, calendar)
+    assert tasks[0]["start_date"] == "2024-01-01T08:00:00"
+    assert tasks[0]["finish_date"] == "2024-01-04T17:00:00"
+    assert tasks[1]["finish_date"] == "2024-01-09T17:00:00"
+    assert tasks[2]["start_date"] == "2024-01-08T08:00:00"
+
+    tasks[0]["duration"] = "PT24H0M0S"
+    scheduling_engine.reschedule_from(project, ["1"], calendar=calendar)
+    assert tasks[1]["start_date"] == "2024-01-05T08:00:00"
+    assert tasks[1]["finish_date"] == "2024-01-10T17:00:00"
+
+
+def test_vectorized_passes_match_dict_passes():
+    """NumPy level-by-level passes give exactly the dict-based results"""
+    if not NUMPY_AVAILABLE:
+        print("  (NumPy not installed, skipped)")
+        return
+    tasks = [
+        make_task("1", 8, summary=True),
+        make_task("1.1", 16, constraint_type=4, constraint_date="2024-01-03"),
+        make_task("1.2", 12, [{"outline_number": "1.1", "type": 3, "lag": 1}]),
+        make_task("2", 24, [{"outline_number": "1", "type": 1, "lag": 2}]),
+        make_task("3", 8, [{"outline_number": "1.2", "type": 0, "lag": 0}], constraint_type=7, constraint_date="2024-01-05"),
+        make_task("4", 40, [{"outline_number": "2", "type": 2, "lag": 1}], constraint_type=1),
+        make_task("5", 8, [{"outline_number": "6", "type": 1, "lag": 0}]),
+        make_task("6", 8, [{"outline_number": "5", "type": 1, "lag": 0}]),
+    ]
+
+    def offset(constraint_date):
+        return float(int(constraint_date[-2:]) - 1)
+
+    for hierarchy in (False, True):
+        expected = scheduling_engine.compute(tasks, offset, hierarchy=hierarchy, vectorized=False)
+        result = scheduling_engine.compute(tasks, offset, hierarchy=hierarchy, vectorized=True)
+        for field in ("early_start", "early_finish", "late_start", "late_finish", "scheduled"):
+            assert getattr(result, field) == getattr(expected, field), (hierarchy, field)
+        assert result.project_end == expected.project_end
+
+def test_driving_paths():
+    """Driving links connect zero-float tasks; branches form separate chains"""
+    tasks = [
+        make_task("1", 16),
+        make_task("2", 16),                                                   # joins task 3 with no float
+        make_task("3", 24, [{"outline_number": "1", "type": 1, "lag": 0},
+                            {"outline_number": "2", "type": 1, "lag": 0}]),
+        make_task("4", 8, [{"outline_number": "3", "type": 1, "lag": 0}]),
+        make_task("5", 8, [{"outline_number": "1", "type": 1, "lag": 0}]),    # 3 days of float
+    ]
+    result = scheduling_engine.compute(tasks)
+    links, chains = scheduling_engine.driving_paths(result)
+    assert sorted(links) == [(0, 2), (1, 2), (2, 3)], links
+    assert chains == [[0, 2, 3], [1]], chains
+    assert result.total_float(4) == 3.0
+
+
+def test_impact_follows_links_transitively():
+    """Impact collects every downstream/upstream task; a summary stands for its leaves"""
+    tasks = [
+        make_task("1", 0, summary=True),
+        make_task("1.1", 16),
+        make_task("1.2", 16, [{"outline_number": "1.1", "type": 1, "lag": 0}]),
+        make_task("2", 8, [{"outline_number": "1", "type": 1, "lag": 0}]),     # On every leaf of 1
+        make_task("3", 8, [{"outline_number": "2", "type": 1, "lag": 0}]),
+        make_task("4", 8),                                                    # Unlinked, float 5 days
+    ]
+    project = {"name": "P", "start_date": "2024-01-01", "tasks": tasks}
+    scheduling_engine.schedule_dates(project)
+    network = ScheduleNetwork(tasks, hierarchy=True)
+    result = scheduling_engine.compute(tasks, network=network)
+    floats = {t["id"]: result.total_float(i) for i, t in enumerate(tasks)}
+
+    impact = scheduling_engine.impact(network, "1.1", floats)
+    assert impact["successors"] == ["1", "1.2", "2", "3"] and impact["predecessors"] == []
+    assert impact["earliest_affected_finish"] == tasks[2]["finish_date"]
+    assert impact["absorbable_slip_days"] == 0
+
+    assert scheduling_engine.impact(network, "1", floats)["successors"] == ["2", "3"]
+    assert scheduling_engine.impact(network, "1", floats)["absorbable_slip_days"] == 0
+    assert scheduling_engine.impact(network, "3", floats)["predecessors"] == ["1", "1.1", "1.2", "2"]
+    assert scheduling_engine.impact(network, "4", floats)["successors"] == []
+    assert scheduling_engine.impact(network, "4", floats)["absorbable_slip_days"] == 5
+    assert scheduling_engine.impact(network, "missing", floats) is None
+
+
+def test_incremental_rollup_rescans_only_when_extreme_moves_inward():
+    """Ancestors are updated from the child's change; only losing the extreme re-aggregates"""
+    tasks = [make_task("1", 8, summary=True)] + [make_task(f"1.{k}", 8 * k) for k in range(1, 6)]
+    project = {"start_date": "2024-01-01", "tasks": tasks}
+    scheduling_engine.schedule_dates(project)
+
+    rescans = []
+    original = scheduling_engine._roll_up_summary
+    scheduling_engine._roll_up_summary = lambda *args: rescans.append(args[1]) or original(*args)
+    try:
+        tasks[2]["duration"] = "PT80H0M0S"      # outward: extends the summary finish
+        scheduling_engine.reschedule_from(project, ["1.2"])
+        assert tasks[0]["finish_date"] == "2024-01-11T17:00:00" and rescans == []
+
+        tasks[2]["duration"] = "PT8H0M0S"       # the child holding the finish moves inward
+        scheduling_engine.reschedule_from(project, ["1.2"])
+        assert tasks[0]["finish_date"] == "2024-01-06T17:00:00" and rescans == [0]
+    finally:
+        scheduling_engine._roll_up_summary = original
+
+
+def test_calendar_hours_per_day():
+    """Hour durations and lags count in the calendar's working day; CPM constraints count working days"""
+    from ai_service import ai_service
+
+    calendar = CalendarService(hours_per_day=10)
+    tasks = [
+        make_task("1", 40),                                                        # 4 days of 10 hours
+        make_task("2", 10, [{"outline_number": "1", "type": 1, "lag": "PT40H0M0S"}]),
+        make_task("3", 10, constraint_type=4, constraint_date="2024-01-08"),       # Monday, 5 working days in
+    ]
+    project = {"start_date": "2024-01-01", "tasks": tasks}
+    scheduling_engine.schedule_dates(project, calendar)
+    assert tasks[0]["finish_date"] == "2024-01-05T17:00:00"
+    assert tasks[1]["start_date"] == "2024-01-11T08:00:00"
+
+    schedule = ai_service._calculate_critical_path(tasks, "2024-01-01", calendar=calendar)
+    assert schedule["project_duration"] == 9.0
+    assert schedule["task_schedule"]["3"]["early_start"] == 5.0
+
+
+def test_forward_from_matches_a_full_pass():
+    """Re-propagating from an edited task gives the full pass's early dates, and restore() undoes it"""
+    tasks = [
+        make_task("1", 40),
+        make_task("2", 16, [{"outline_number": "1", "type": 1, "lag": 0}]),
+        make_task("3", 16, [{"outline_number": "2", "type": 3, "lag": 1}]),
+        make_task("4", 80),                                                  # not downstream of task 1
+        make_task("5", 8, [{"outline_number": "3", "type": 1, "lag": 0},
+                           {"outline_number": "4", "type": 1, "lag": 0}]),
+    ]
+    network = ScheduleNetwork(tasks)
+    result = scheduling_engine.compute(tasks, network=network)
+    constraints = scheduling_engine._resolve_constraints(network, None)
+    before = (list(result.early_start), result.project_end)
+
+    network.durations[0] = 2.0
+    moved = scheduling_engine.forward_from(network, result, constraints, [0])
+    expected = scheduling_engine.compute(tasks, network=network)
+    assert result.early_start == expected.early_start and result.project_end == expected.project_end
+    assert sorted(moved) == [0, 1, 2], moved  # task 5 is held by task 4
+
+    scheduling_engine.restore(result, moved, before[1])
+    assert (result.early_start, result.project_end) == before
+
+
+if __name__ == "__main__":
+    for test in (test_link_types, test_constraints, test_summary_rollup_and_summary_predecessor, test_cycle_is_skipped,
+                 test_reschedule_from_stops_at_unchanged_dates, test_calendar_skips_weekends_and_holidays,
+                 test_vectorized_passes_match_dict_passes, test_driving_paths, test_impact_follows_links_transitively,
+                 test_incremental_rollup_rescans_only_when_extreme_moves_inward, test_calendar_hours_per_day,
+                 test_forward_from_matches_a_full_pass):
+        test()
+        print(f"✅ {test.__name__}")
+    print("✅ All scheduling engine tests passed!")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""Test batch task operations and subtree cloning"""
+
+import copy
+
+from scheduling_engine import scheduling_engine
+from task_links import resolve_link_ids
+from xml_processor import MSProjectXMLProcessor
+from test_scheduling_engine import make_task
+
+
+def make_project():
+    tasks = [
+        make_task("1", 0, id="a"),
+        make_task("1.1", 16, id="b"),
+        make_task("1.2", 16, [{"outline_number": "1.1", "type": 1, "lag": 0}], id="c"),
+        make_task("2", 8, [{"outline_number": "1", "type": 1, "lag": 0}], id="d"),
+        make_task("3", 8, [{"outline_number": "2", "type": 1, "lag": 0}], id="e"),
+    ]
+    resolve_link_ids(tasks)
+    project = {"name": "P", "start_date": "2024-01-01", "tasks": tasks}
+    scheduling_engine.schedule_dates(project)
+    return project
+
+
+def dates(project):
+    return {t["id"]: (t["start_date"], t["finish_date"]) for t in project["tasks"]}
+
+
+def test_batch_matches_full_schedule():
+    """Mixed operations renumber once and leave the schedule a full pass would produce"""
+    project = make_project()
+    result = MSProjectXMLProcessor().apply_batch(project, [
+        {"op": "create", "task": {"name": "New", "outline_number": "1.2", "duration": "PT24H0M0S",
+                                  "predecessors": [{"outline_number": "1.1", "type": 1, "lag": 0}]}},
+        {"op": "update", "task_id": "b", "task": {"duration": "PT40H0M0S"}},
+        {"op": "move", "task_id": "e", "target_id": "a", "position": "under"},
+        {"op": "delete", "task_id": "d"},
+    ])
+    assert result["success"], result["errors"]
+    assert result["deleted"] == ["d"]
+
+    new_id = next(t["id"] for t in project["tasks"] if t["name"] == "New")
+    assert [(t["id"], t["outline_number"]) for t in project["tasks"]] == [
+        ("a", "1"), ("b", "1.1"), (new_id, "1.2"), ("c", "1.3"), ("e", "1.4")]
+    assert next(t for t in project["tasks"] if t["id"] == "e")["predecessors"] == []
+
+    expected = copy.deepcopy(project)
+    scheduling_engine.schedule_dates(expected)
+    assert dates(project) == dates(expected)
+    assert {t["id"] for t in result["changed"]} == {"a", "b", "c", "e", new_id}
+
+
+def test_failed_batch_changes_nothing():
+    """A validation error anywhere in the batch rolls every operation back"""
+    project = make_project()
+    before = copy.deepcopy(project)
+    result = MSProjectXMLProcessor().apply_batch(project, [
+        {"op": "move", "task_id": "e", "target_outline": "1", "position": "before"},
+        {"op": "update", "task_id": "c", "task": {"predecessors": [{"outline_number": "9", "type": 1, "lag": 0}]}},
+    ])
+    assert not result["success"]
+    assert result["errors"][0]["task_id"] == "c"
+    assert project == before
+
+
+def test_outline_lookups_see_earlier_operations():
+    """Operations addressed by outline number see the structure after the earlier ones"""
+    project = make_project()
+    result = MSProjectXMLProcessor().apply_batch(project, [
+        {"op": "delete", "task_id": "1.1"},
+        {"op": "update", "task_id": "1.1", "task": {"name": "Renamed"}},
+    ])
+    assert result["success"], result["errors"]
+    assert next(t for t in project["tasks"] if t["id"] == "c")["name"] == "Renamed"
+    assert next(t for t in project["tasks"] if t["id"] == "c")["predecessors"] == []
+
+
+def test_clone_subtree_remaps_and_chains():
+    """Copies get their own ids, internal links stay inside each copy, chained copies follow each other"""
+    project = make_project()
+    project["tasks"][0]["name"] = "Building 1"
+    roots = MSProjectXMLProcessor().clone_subtree(project, "a", 2, chain=True)
+
+    assert [root["name"] for root in roots] == ["Building 2", "Building 3"]
+    assert [t["outline_number"] for t in project["tasks"]] == ["1", "1.1", "1.2", "2", "2.1", "2.2",
+                                                               "3", "3.1", "3.2", "4", "5"]
+    by_outline = {t["outline_number"]: t for t in project["tasks"]}
+    assert len({t["id"] for t in project["tasks"]}) == len(project["tasks"])
+
+    # 2.2 follows 2.1 (not 1.1); 2.1 is chained after the source's last task 1.2
+    assert [p["predecessor_id"] for p in by_outline["2.2"]["predecessors"]] == [by_outline["2.1"]["id"]]
+    assert [p["predecessor_id"] for p in by_outline["2.1"]["predecessors"]] == [by_outline["1.2"]["id"]]
+    assert [p["predecessor_id"] for p in by_outline["3.1"]["predecessors"]] == [by_outline["2.2"]["id"]]
+
+    expected = copy.deepcopy(project)
+    scheduling_engine.schedule_dates(expected)
+    assert dates(project) == dates(expected)
+    assert by_outline["3"]["start_date"] > by_outline["2"]["finish_date"][:10]
+
+
+if __name__ == "__main__":
+    for test in (test_batch_matches_full_schedule, test_failed_batch_changes_nothing,
+                 test_outline_lookups_see_earlier_operations, test_clone_subtree_remaps_and_chains):
+        test()
+        print(f"✅ {test.__name__}")
+    print("✅ All batch operation tests passed!")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""Test the server-side task filter language"""
+
+from ai_service import ai_service
+from scheduling_engine import scheduling_engine
+from task_filter import TaskFilter
+from task_links import resolve_link_ids
+from wbs_index import WBSIndex
+from test_scheduling_engine import make_task
+
+
+def make_project():
+    tasks = [
+        make_task("1", 0, summary=True, name="Foundation"),
+        make_task("1.1", 40, name="Excavate"),
+        make_task("1.2", 16, [{"outline_number": "1.1", "type": 1, "lag": 0}], name="Slab on grade"),
+        make_task("2", 8, name="Permits"),
+        make_task("3", 0, [{"outline_number": "1.2", "type": 1, "lag": 2}], milestone=True, name="Done"),
+    ]
+    resolve_link_ids(tasks)
+    project = {"name": "P", "start_date": "2024-01-01", "tasks": tasks}
+    scheduling_engine.schedule_dates(project)
+    return project
+
+
+def ids(tasks):
+    return [t["id"] for t in tasks]
+
+
+def test_parse_errors():
+    """Bad expressions are rejected up front with the reason"""
+    for text, reason in [("", "Empty"), ("bogus", "Unknown filter term"), ("colour=red", "Unknown filter field"),
+                         ("float<x", "Expected a number"), ("start>2024", "Expected a date"),
+                         ("(milestone", "Missing ')'"), ("milestone )", "Unexpected"), ("not", "ends unexpectedly")]:
+        try:
+            TaskFilter(text)
+        except ValueError as e:
+            assert reason in str(e), (text, str(e))
+        else:
+            raise AssertionError(f"{text!r} should not parse")
+
+
+def test_terms_and_operators():
+    """Flags, comparisons, name matches and and/or/not combine as expected"""
+    tasks = make_project()["tasks"]
+    assert ids(TaskFilter("milestone").select(tasks)) == ["3"]
+    assert ids(TaskFilter("not summary and duration>=2").select(tasks)) == ["1.1", "1.2"]
+    assert ids(TaskFilter('name:"slab ON" or name:permit').select(tasks)) == ["1.2", "2"]
+    assert ids(TaskFilter("level<=1 not milestone").select(tasks)) == ["1", "2"]
+    assert ids(TaskFilter("has_lag").select(tasks)) == ["3"]
+    assert ids(TaskFilter("start>=2024-01-08 and (summary or milestone)").select(tasks)) == ["3"]
+
+
+def test_schedule_terms():
+    """critical and float read the critical path result, and only those terms ask for it"""
+    tasks = make_project()["tasks"]
+    assert not TaskFilter("milestone or name:slab").needs_schedule
+    task_filter = TaskFilter("critical and not summary")
+    assert task_filter.needs_schedule
+
+    schedule = ai_service._calculate_critical_path(tasks)
+    assert ids(task_filter.select(tasks, schedule=schedule)) == ["1.1", "1.2", "3"]
+    assert ids(TaskFilter("float>0 not summary").select(tasks, schedule=schedule)) == ["2"]
+
+
+def test_subtree_narrowing():
+    """A top-level subtree term scans only that subtree; under "or" it is an ordinary test"""
+    tasks = make_project()["tasks"]
+    task_filter = TaskFilter("subtree:1 and not summary")
+    assert task_filter.subtree == "1"
+    assert ids(task_filter.select(tasks, WBSIndex(tasks))) == ["1.1", "1.2"]
+    assert TaskFilter("subtree:9").select(tasks) == []
+
+    task_filter = TaskFilter("subtree:1.2 or milestone")
+    assert task_filter.subtree is None
+    assert ids(task_filter.select(tasks)) == ["1.2", "3"]
+    assert TaskFilter("not subtree:1").subtree is None
+
+
+if __name__ == "__main__":
+    for test in (test_parse_errors, test_terms_and_operators, test_schedule_terms, test_subtree_narrowing):
+        test()
+        print(f"✅ {test.__name__}")
+    print("✅ All task filter tests passed!")
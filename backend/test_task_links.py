@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""Test dependency links keyed by predecessor task id"""
+
+from ai_project_editor import ai_project_editor
+from scheduling_engine import ScheduleNetwork
+from task_links import refresh_link_outlines, resolve_link_ids
+from xml_processor import MSProjectXMLProcessor
+from test_scheduling_engine import make_task
+
+
+def make_project():
+    tasks = [
+        make_task("1", 16, id="a"),
+        make_task("2", 16, [{"outline_number": "1", "type": 1, "lag": 0}], id="b"),
+        make_task("3", 16, [{"outline_number": "2", "type": 1, "lag": 0}], id="c"),
+    ]
+    resolve_link_ids(tasks)
+    return {"name": "P", "start_date": "2024-01-01", "tasks": tasks}
+
+
+def links(project):
+    """Successor id -> predecessor ids"""
+    return {t["id"]: [p["predecessor_id"] for p in t.get("predecessors", [])] for t in project["tasks"]}
+
+
+def test_renumbering_keeps_links():
+    """Inserting and deleting tasks renumbers them without touching the links"""
+    project = make_project()
+    processor = MSProjectXMLProcessor()
+    processor.add_task(project, {"name": "New", "outline_number": "1", "duration": "PT8H0M0S"})
+    assert [t["outline_number"] for t in project["tasks"] if t["id"] == "a"] == ["2"]
+    assert links(project)["b"] == ["a"] and links(project)["c"] == ["b"]
+
+    # The scheduler follows the ids even though the outlines on the links are stale
+    network = ScheduleNetwork(project["tasks"])
+    position = {t["id"]: i for i, t in enumerate(project["tasks"])}
+    assert network.preds[position["c"]][0][0] == position["b"]
+    assert refresh_link_outlines(project["tasks"]) == 2
+    assert next(t for t in project["tasks"] if t["id"] == "c")["predecessors"][0]["outline_number"] == "3"
+
+    assert processor.delete_task(project, "a")
+    assert links(project)["b"] == [] and links(project)["c"] == ["b"]
+
+    assert refresh_link_outlines(project["tasks"]) == 1
+    assert next(t for t in project["tasks"] if t["id"] == "c")["predecessors"][0]["outline_number"] == "2"
+
+
+def test_ai_move_keeps_links():
+    """Moving a task in the AI editor leaves links pointing at the same tasks"""
+    project = make_project()
+    result = ai_project_editor._move_task(project, "3", "1", "before")
+    assert result["success"], result
+    assert links(project) == {"a": [], "b": ["a"], "c": ["b"]}
+
+
+def test_edited_links_resolve_from_outline():
+    """Links sent by outline number are re-keyed to the task at that outline"""
+    project = make_project()
+    processor = MSProjectXMLProcessor()
+    processor.update_task(project, "c", {"predecessors": [{"outline_number": "1", "type": 1, "lag": 0,
+                                                           "predecessor_id": "b"}]})
+    assert links(project)["c"] == ["a"]
+
+
+if __name__ == "__main__":
+    for test in (test_renumbering_keeps_links, test_ai_move_keeps_links, test_edited_links_resolve_from_outline):
+        test()
+        print(f"✅ {test.__name__}")
+    print("✅ All task link tests passed!")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""Test timeline aggregation for zoomed-out Gantt views"""
+
+from datetime import date
+
+from timeline import bucket_counts, project_span, timeline_arrays, timeline_window
+from test_scheduling_engine import make_task
+
+
+def make_tasks():
+    return [
+        make_task("1", 0, summary=True, start_date="2024-01-01T08:00:00", finish_date="2024-01-12T17:00:00"),
+        make_task("1.1", 40, start_date="2024-01-01T08:00:00", finish_date="2024-01-05T17:00:00"),
+        make_task("1.2", 40, start_date="2024-01-08T08:00:00", finish_date="2024-01-12T17:00:00"),
+        make_task("2", 8, start_date="2024-01-03T08:00:00", finish_date="2024-01-03T17:00:00"),
+        make_task("3", 8),  # Unscheduled: left out
+    ]
+
+
+def test_buckets_match_direct_count():
+    """Each bucket counts the leaves overlapping it, critical ones flagged"""
+    arrays = timeline_arrays(make_tasks(), critical_ids={"1.2"})
+    assert len(arrays["leaf_start"]) == 3 and [s["id"] for s in arrays["summaries"]] == ["1"]
+    assert project_span(arrays) == (date(2024, 1, 1), date(2024, 1, 12))
+
+    for bucket_days in (1, 3, 7, 30):
+        buckets = bucket_counts(arrays, bucket_days)
+        window = timeline_window(arrays, buckets, bucket_days, date(2023, 12, 20), date(2024, 1, 20))
+        for row in window["buckets"]:
+            low, high = date.fromisoformat(row["start"]).toordinal(), date.fromisoformat(row["end"]).toordinal()
+            overlapping = [i for i, (s, f) in enumerate(zip(arrays["leaf_start"], arrays["leaf_finish"]))
+                           if s <= high and f >= low]
+            assert row["count"] == len(overlapping), (bucket_days, row)
+            assert row["critical"] == any(arrays["leaf_critical"][i] for i in overlapping)
+
+
+def test_panning_slices_the_same_buckets():
+    """Windows at one zoom level share bucket boundaries; summaries outside the range are dropped"""
+    arrays = timeline_arrays(make_tasks(), critical_ids=set())
+    buckets = bucket_counts(arrays, 7)
+    first = timeline_window(arrays, buckets, 7, date(2024, 1, 1), date(2024, 1, 14))["buckets"]
+    panned = timeline_window(arrays, buckets, 7, date(2024, 1, 5), date(2024, 1, 20))["buckets"]
+    panned_by_start = {row["start"]: row for row in panned}
+    shared = [row for row in first if row["start"] in panned_by_start]
+    assert shared and all(row == panned_by_start[row["start"]] for row in shared)
+    assert timeline_window(arrays, buckets, 7, date(2024, 2, 1), date(2024, 2, 29))["summaries"] == []
+    assert timeline_window(arrays, buckets, 7, date(2024, 1, 1), date(2024, 1, 2), max_level=0)["summaries"] == []
+
+
+if __name__ == "__main__":
+    for test in (test_buckets_match_direct_count, test_panning_slices_the_same_buckets):
+        test()
+        print(f"✅ {test.__name__}")
+    print("✅ All timeline tests passed!")
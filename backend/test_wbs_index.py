@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Test the WBS hierarchy index"""
+
+import tempfile
+from pathlib import Path
+
+from database import DatabaseService
+from validator import ProjectValidator
+from wbs_index import WBSIndex, outline_key, subtree_key_range
+from xml_processor import MSProjectXMLProcessor
+from test_scheduling_engine import make_task
+
+
+def make_tasks():
+    return [
+        make_task("1", 0),
+        make_task("1.1", 8),
+        make_task("1.2", 0),
+        make_task("1.2.1", 8),
+        make_task("1.2.2", 8),
+        make_task("2", 8),
+        make_task("3.1.1", 8),   # Orphan: no task 3 or 3.1
+    ]
+
+
+def test_queries():
+    """Parents, ordered children, subtrees and sizes follow the outline numbers"""
+    index = WBSIndex(make_tasks())
+    assert index.child_ids(None) == ["1", "2", "3.1.1"]
+    assert index.child_ids("1") == ["1.1", "1.2"]
+    assert index.parent_id("1.2.1") == "1.2"
+    assert index.subtree_ids("1") == ["1", "1.1", "1.2", "1.2.1", "1.2.2"]
+    assert index.subtree_size("1") == 4 and index.subtree_size("2") == 0
+    assert index.has_children("1.2") and not index.has_children("1.1")
+    assert index.find("1.2.2")["id"] == "1.2.2"
+
+
+def test_incremental_updates_match_rebuild():
+    """insert/move/remove keep children and subtree sizes equal to a fresh build"""
+    tasks = make_tasks()
+    index = WBSIndex(tasks)
+
+    new_task = make_task("1.1.1", 8, id="new")
+    tasks.append(new_task)
+    index.insert(new_task, parent_id="1.1")
+    assert index.subtree_size("1") == 5 and index.has_children("1.1")
+
+    index.move("1.2", "2")
+    assert index.subtree_size("1") == 2 and index.subtree_size("2") == 3
+    assert index.child_ids("2") == ["1.2"]
+
+    assert index.remove("2") == ["2", "1.2", "1.2.1", "1.2.2"]
+    rebuilt = WBSIndex([t for t in tasks if t["id"] in {"1", "1.1", "new", "3.1.1"}])
+    for task_id in ("1", "1.1", "new", "3.1.1"):
+        assert index.child_ids(task_id) == rebuilt.child_ids(task_id)
+        assert index.subtree_size(task_id) == rebuilt.subtree_size(task_id)
+
+
+def test_summary_rollup_and_delete():
+    """Summary flags and dates roll up bottom-up; deleting a summary removes its subtree"""
+    tasks = make_tasks()
+    for task, day in zip(tasks, (None, 1, None, 3, 5, 2, 9)):
+        if day:
+            task["start_date"] = f"2024-01-0{day}T08:00:00"
+            task["finish_date"] = f"2024-01-0{day}T17:00:00"
+    processor = MSProjectXMLProcessor()
+    processor._calculate_summary_tasks(tasks)
+    by_id = {t["id"]: t for t in tasks}
+    assert [t["id"] for t in tasks if t["summary"]] == ["1", "1.2"]
+    assert by_id["1.2"]["start_date"] == "2024-01-03T08:00:00"
+    assert by_id["1"]["start_date"] == "2024-01-01T08:00:00"
+    assert by_id["1"]["finish_date"] == "2024-01-05T17:00:00"
+
+    project = {"tasks": tasks}
+    assert processor.delete_task(project, "1.2")
+    assert [t["outline_number"] for t in project["tasks"]] == ["1", "1.1", "2", "3.1.1"]
+    assert [t["id"] for t in project["tasks"] if t["summary"]] == ["1"]
+
+
+def test_validator_summary_detection():
+    """A milestone with children is reported as an invalid summary milestone"""
+    tasks = make_tasks()
+    tasks[2]["milestone"] = True
+    errors = ProjectValidator().validate_project({"name": "P", "start_date": "2024-01-01",
+                                                  "status_date": "2024-01-01", "tasks": tasks})["errors"]
+    assert any(e["field"] == "milestone" and e["task_id"] == "1.2" for e in errors), errors
+
+
+def test_outline_key_order():
+    """Outline keys sort as strings in WBS order and bound subtrees"""
+    outlines = ["10", "2", "1.10", "1", "1.2", "1.2.1", "0"]
+    assert sorted(outlines, key=outline_key) == ["0", "1", "1.2", "1.2.1", "1.10", "2", "10"]
+    low, high = subtree_key_range("1")
+    assert [o for o in outlines if low <= outline_key(o) < high] == ["1.10", "1", "1.2", "1.2.1"]
+
+
+def test_database_returns_wbs_order():
+    """get_tasks orders by the stored key and range-scans a subtree"""
+    with tempfile.TemporaryDirectory() as tmp:
+        db = DatabaseService(str(Path(tmp) / "projects.db"))
+        project_id = db.create_project("P", "2024-01-01", "2024-01-01")
+        db.bulk_create_tasks(project_id, [make_task(o, 8, id=f"t{o}") for o in ("10", "2", "1.10", "1", "1.2")])
+        assert [t["outline_number"] for t in db.get_tasks(project_id)] == ["1", "1.2", "1.10", "2", "10"]
+
+        db.update_task("t10", {"outline_number": "1.3"})
+        assert [t["outline_number"] for t in db.get_tasks(project_id, "1")] == ["1", "1.2", "1.3", "1.10"]
+
+
+def test_viewport_window():
+    """Windows follow WBS order, skip collapsed subtrees and stay correct after edits"""
+    index = WBSIndex(make_tasks())
+    visible = ["1", "1.1", "1.2", "1.2.1", "1.2.2", "2", "3.1.1"]
+    for offset in range(len(visible) + 1):
+        rows, total = index.window(offset, 3)
+        assert [t["id"] for t in rows] == visible[offset:offset + 3] and total == 7
+
+    rows, total = index.window(2, 10, collapsed=["1.2"])
+    assert [t["id"] for t in rows] == ["1.2", "2", "3.1.1"] and total == 5
+    rows, total = index.window(1, 2, collapsed=["1", "1.2"])
+    assert [t["id"] for t in rows] == ["2", "3.1.1"] and total == 3
+
+    index.move("1.2", "2")
+    rows, total = index.window(2, 3, collapsed=["missing"])
+    assert [t["id"] for t in rows] == ["2", "1.2", "1.2.1"] and total == 7
+
+
+if __name__ == "__main__":
+    for test in (test_queries, test_incremental_updates_match_rebuild, test_summary_rollup_and_delete,
+                 test_validator_summary_detection, test_outline_key_order, test_database_returns_wbs_order,
+                 test_viewport_window):
+        test()
+        print(f"✅ {test.__name__}")
+    print("✅ All WBS index tests passed!")
@@ -0,0 +1,130 @@
+"""
+Timeline Aggregation for Sturgis Project
+Zoomed-out Gantt data: leaf bars counted per time bucket, summaries as single spans
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from wbs_index import WBSIndex
+
+
+def _day(value: Optional[str]) -> Optional[int]:
+    """Day ordinal of an ISO date/datetime string"""
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value[:10]).toordinal()
+    except ValueError:
+        return None
+
+
+def timeline_arrays(tasks: List[Dict[str, Any]], critical_ids: set,
+                    index: Optional[WBSIndex] = None) -> Dict[str, Any]:
+    """
+    Flat day-ordinal arrays of the schedule, built once per schedule version.
+
+    Leaves become parallel start/finish/critical lists (finish day inclusive);
+    summaries keep their span and outline level. Tasks without dates are left out.
+    """
+    index = index if index is not None and index.tasks is tasks else WBSIndex(tasks)
+    leaf_start: List[int] = []
+    leaf_finish: List[int] = []
+    leaf_critical: List[bool] = []
+    summaries: List[Dict[str, Any]] = []
+    for task in tasks:
+        start = _day(task.get("start_date"))
+        finish = _day(task.get("finish_date"))
+        if start is None or finish is None:
+            continue
+        finish = max(start, finish)
+        task_id = task.get("id")
+        if task.get("summary") or index.has_children(task_id):
+            summaries.append({
+                "id": task_id,
+                "name": task.get("name"),
+                "outline_number": task.get("outline_number"),
+                "level": task.get("outline_number", "").count(".") + 1,
+                "start": start,
+                "finish": finish,
+                "critical": task_id in critical_ids,
+            })
+        else:
+            leaf_start.append(start)
+            leaf_finish.append(finish)
+            leaf_critical.append(task_id in critical_ids)
+    return {"leaf_start": leaf_start, "leaf_finish": leaf_finish, "leaf_critical": leaf_critical,
+            "summaries": summaries}
+
+
+def bucket_counts(arrays: Dict[str, Any], bucket_days: int) -> Dict[str, Any]:
+    """
+    Active leaf counts per bucket of bucket_days days, for the whole project.
+
+    Buckets are aligned to day ordinal 0, so every window at this zoom level
+    slices the same buckets and panning needs no recomputation. Counted with
+    a difference array: O(leaves + buckets).
+    """
+    starts = arrays["leaf_start"]
+    if not starts:
+        return {"first": 0, "count": [], "critical": []}
+    first = min(starts) // bucket_days
+    last = max(arrays["leaf_finish"]) // bucket_days
+    size = last - first + 1
+    count = [0] * (size + 1)
+    critical = [0] * (size + 1)
+    for start, finish, is_critical in zip(starts, arrays["leaf_finish"], arrays["leaf_critical"]):
+        low = start // bucket_days - first
+        high = finish // bucket_days - first + 1
+        count[low] += 1
+        count[high] -= 1
+        if is_critical:
+            critical[low] += 1
+            critical[high] -= 1
+    for i in range(1, size):
+        count[i] += count[i - 1]
+        critical[i] += critical[i - 1]
+    return {"first": first, "count": count[:size], "critical": critical[:size]}
+
+
+def project_span(arrays: Dict[str, Any]) -> Optional[tuple]:
+    """(first day, last day) of the scheduled work, or None for an unscheduled project"""
+    days = arrays["leaf_start"] + [summary["start"] for summary in arrays["summaries"]]
+    if not days:
+        return None
+    last = max(arrays["leaf_finish"] + [summary["finish"] for summary in arrays["summaries"]])
+    return date.fromordinal(min(days)), date.fromordinal(last)
+
+
+def timeline_window(arrays: Dict[str, Any], buckets: Dict[str, Any], bucket_days: int,
+                    start: date, end: date, max_level: int = 1) -> Dict[str, Any]:
+    """
+    Buckets and summary spans between start and end (inclusive).
+
+    Each bucket reports how many leaf bars are active in it and whether any
+    of them is critical; summaries up to max_level come back as one span each.
+    """
+    low = start.toordinal() // bucket_days
+    high = end.toordinal() // bucket_days
+    rows = []
+    for bucket in range(low, high + 1):
+        i = bucket - buckets["first"]
+        active = buckets["count"][i] if 0 <= i < len(buckets["count"]) else 0
+        critical = buckets["critical"][i] if 0 <= i < len(buckets["critical"]) else 0
+        day = date.fromordinal(max(bucket * bucket_days, 1))
+        rows.append({
+            "start": day.isoformat(),
+            "end": (day + timedelta(days=bucket_days - 1)).isoformat(),
+            "count": active,
+            "critical_count": critical,
+            "critical": critical > 0,
+        })
+
+    first_day, last_day = low * bucket_days, (high + 1) * bucket_days - 1
+    summaries = [
+        {**summary, "start": date.fromordinal(summary["start"]).isoformat(),
+         "finish": date.fromordinal(summary["finish"]).isoformat()}
+        for summary in arrays["summaries"]
+        if summary["level"] <= max_level and summary["start"] <= last_day and summary["finish"] >= first_day
+    ]
+    return {"bucket_days": bucket_days, "buckets": rows, "summaries": summaries,
+            "total_leaves": len(arrays["leaf_start"])}
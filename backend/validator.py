@@ -1,6 +1,8 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional
 import re
 from datetime import datetime
+from wbs_index import WBSIndex, task_key
+from task_links import link_target
 
 
 class ProjectValidator:
@@ -30,9 +32,10 @@ class ProjectValidator:
         # Validate tasks
         tasks = project_data.get("tasks", [])
         outline_numbers = set()
+        index = WBSIndex(tasks)
         
         for task in tasks:
-            task_errors = self._validate_task_structure(task, tasks)
+            task_errors = self._validate_task_structure(task, tasks, index)
             for error in task_errors:
                 error["task_id"] = task.get("id", task.get("outline_number", "unknown"))
             errors.extend(task_errors)
@@ -57,16 +60,18 @@ class ProjectValidator:
             "warnings": warnings
         }
     
-    def validate_task(self, task_data: Dict[str, Any], existing_tasks: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def validate_task(self, task_data: Dict[str, Any], existing_tasks: List[Dict[str, Any]],
+                      index: Optional[WBSIndex] = None) -> Dict[str, Any]:
         """Validate a single task"""
-        errors = self._validate_task_structure(task_data, existing_tasks)
+        errors = self._validate_task_structure(task_data, existing_tasks, index)
         
         return {
             "valid": len(errors) == 0,
             "errors": errors
         }
     
-    def _validate_task_structure(self, task: Dict[str, Any], all_tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _validate_task_structure(self, task: Dict[str, Any], all_tasks: List[Dict[str, Any]],
+                                 index: Optional[WBSIndex] = None) -> List[Dict[str, Any]]:
         """Validate task structure and fields"""
         errors = []
 
@@ -86,7 +91,7 @@ class ProjectValidator:
 
         # Check if this is a summary task (has children)
         # Only check for existing tasks (with id) - new tasks can't be summaries yet
-        is_summary = self._is_summary_task(task, all_tasks) if task.get("id") else False
+        is_summary = self._is_summary_task(task, all_tasks, index) if task.get("id") else False
 
         # Validate duration format
         duration = task.get("duration")
@@ -117,6 +122,8 @@ class ProjectValidator:
             })
         
         # Validate predecessors
+        if task.get("predecessors") and (index is None or index.tasks is not all_tasks):
+            index = WBSIndex(all_tasks)
         for pred in task.get("predecessors", []):
             if not pred.get("outline_number"):
                 errors.append({
@@ -124,9 +131,12 @@ class ProjectValidator:
                     "message": "Predecessor outline number is required"
                 })
 
-            # Check if predecessor exists
-            pred_exists = any(t.get("outline_number") == pred["outline_number"] for t in all_tasks)
-            if not pred_exists and task.get("outline_number") != pred["outline_number"]:
+            # Check if predecessor exists (by id once the link has been resolved)
+            if pred.get("predecessor_id"):
+                pred_exists = index.task(pred["predecessor_id"]) is not None
+            else:
+                pred_exists = index.find(pred.get("outline_number")) is not None
+            if not pred_exists and task.get("outline_number") != pred.get("outline_number"):
                 errors.append({
                     "field": "predecessors",
                     "message": f"Predecessor task {pred['outline_number']} not found"
@@ -214,16 +224,18 @@ class ProjectValidator:
         """Validate predecessor relationships for circular dependencies"""
         errors = []
         
-        # Build dependency graph
+        # Build dependency graph over task positions
+        index_by_id = {t.get("id"): i for i, t in enumerate(tasks)}
+        index_by_outline = {t.get("outline_number"): i for i, t in enumerate(tasks)}
         graph = {}
-        for task in tasks:
-            outline = task.get("outline_number")
-            graph[outline] = [pred["outline_number"] for pred in task.get("predecessors", [])]
+        for i, task in enumerate(tasks):
+            targets = (link_target(pred, index_by_id, index_by_outline) for pred in task.get("predecessors", []))
+            graph[i] = [p for p in targets if p is not None]
         
         # Check for circular dependencies
-        for task in tasks:
+        for i, task in enumerate(tasks):
             outline = task.get("outline_number")
-            if self._has_circular_dependency(outline, graph, set()):
+            if self._has_circular_dependency(i, graph, set()):
                 errors.append({
                     "field": "predecessors",
                     "message": f"Circular dependency detected for task {outline}",
@@ -232,7 +244,7 @@ class ProjectValidator:
         
         return errors
     
-    def _has_circular_dependency(self, node: str, graph: Dict[str, List[str]], visited: set) -> bool:
+    def _has_circular_dependency(self, node: int, graph: Dict[int, List[int]], visited: set) -> bool:
         """Check for circular dependencies using DFS"""
         if node in visited:
             return True
@@ -244,7 +256,8 @@ class ProjectValidator:
 
         return False
 
-    def _is_summary_task(self, task: Dict[str, Any], all_tasks: List[Dict[str, Any]]) -> bool:
+    def _is_summary_task(self, task: Dict[str, Any], all_tasks: List[Dict[str, Any]],
+                         index: Optional[WBSIndex] = None) -> bool:
         """Check if a task is a summary task (has children)"""
         # First check if the task is explicitly marked as summary
         if task.get("summary", False):
@@ -256,14 +269,11 @@ class ProjectValidator:
         if outline == "0":
             return True
 
-        # Check if any other task is a child of this task
-        for other_task in all_tasks:
-            other_outline = other_task.get("outline_number", "")
-            # A task is a child if its outline starts with parent's outline + "."
-            if other_outline.startswith(outline + ".") and other_outline != outline:
-                return True
-
-        return False
+        # Check if any other task is a child of the task at this outline
+        if index is None or index.tasks is not all_tasks:
+            index = WBSIndex(all_tasks)
+        node = index.find(outline)
+        return node is not None and index.has_children(task_key(node))
 
     def _validate_outline_format(self, outline: str) -> bool:
         """Validate outline number format (e.g., 1.2.3)"""
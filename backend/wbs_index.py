@@ -0,0 +1,318 @@
+"""
+WBS Index for Sturgis Project
+Hierarchy index over a task list: parent pointers, ordered child lists and subtree sizes
+"""
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+def task_key(task: Dict[str, Any]) -> str:
+    """Index key of a task: its id (outline number for tasks not yet saved)"""
+    return task.get("id") or task.get("outline_number", "")
+
+
+# Width of one outline segment in an outline key (up to 99999 children per task)
+OUTLINE_SEGMENT_WIDTH = 5
+
+
+def outline_key(outline: str) -> str:
+    """
+    Sort key of an outline number: zero-padded segments ("1.10" -> "00001.00010").
+
+    Keys compare as plain strings in WBS order (parents before their children,
+    "2" before "10"), so SQL can ORDER BY them and range-scan a subtree.
+    Non-numeric segments sort first, like the old [0] fallback.
+    """
+    return ".".join(
+        segment.zfill(OUTLINE_SEGMENT_WIDTH) if segment.isdigit() else "0" * OUTLINE_SEGMENT_WIDTH
+        for segment in str(outline).split(".")
+    )
+
+
+def subtree_key_range(outline: str) -> Tuple[str, str]:
+    """[low, high) outline key range of a task and all its descendants"""
+    key = outline_key(outline)
+    return key, key + "/"  # "/" sorts right after the "." separator
+
+
+class WBSIndex:
+    """
+    Task hierarchy keyed by task id.
+
+    Built in one pass over the tasks (O(n)); afterwards a task's parent,
+    children, subtree and summary status are answered in O(children)
+    instead of scanning every outline number for a prefix. A task's parent
+    is its nearest ancestor outline that exists, so gaps in the numbering
+    ("1" -> "1.2.1") still nest. insert/remove/move/renumber keep the index
+    current while an operation edits the task list, so it is built once
+    per operation rather than once per lookup.
+    """
+
+    def __init__(self, tasks: List[Dict[str, Any]]):
+        self.tasks = tasks
+        self._tasks_by_id: Dict[str, Dict[str, Any]] = {}
+        self._id_by_outline: Dict[str, str] = {}
+        self._parent: Dict[str, Optional[str]] = {}
+        self._children: Dict[Optional[str], List[str]] = {None: []}
+        self._size: Dict[str, int] = {}  # Number of descendants
+        self._row_offsets: Dict[Optional[str], List[int]] = {}  # Rows before each child, built on demand
+
+        for task in tasks:
+            task_id = task_key(task)
+            self._tasks_by_id[task_id] = task
+            self._id_by_outline[task.get("outline_number", "")] = task_id
+            self._children[task_id] = []
+            self._size[task_id] = 0
+
+        for task in tasks:
+            task_id = task_key(task)
+            parent_id = self._find_parent(task.get("outline_number", ""))
+            self._parent[task_id] = parent_id
+            self._children[parent_id].append(task_id)
+
+        # Subtree sizes, children before parents
+        for task_id in reversed(self.preorder()):
+            self._size[task_id] = sum(self._size[child] + 1 for child in self._children[task_id])
+
+    def _find_parent(self, outline: str) -> Optional[str]:
+        """Id of the nearest existing ancestor outline"""
+        while "." in outline:
+            outline = outline.rsplit(".", 1)[0]
+            if outline in self._id_by_outline:
+                return self._id_by_outline[outline]
+        return None
+
+    # =========================================================================
+    # QUERIES
+    # =========================================================================
+
+    def task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        return self._tasks_by_id.get(task_id)
+
+    def find(self, outline: str) -> Optional[Dict[str, Any]]:
+        """Task by outline number"""
+        task_id = self._id_by_outline.get(outline)
+        return self._tasks_by_id.get(task_id) if task_id is not None else None
+
+    def parent_id(self, task_id: str) -> Optional[str]:
+        return self._parent.get(task_id)
+
+    def parent_for(self, outline: str) -> Optional[str]:
+        """Id of the task a new task at this outline number would go under"""
+        return self._find_parent(outline)
+
+    def child_ids(self, task_id: Optional[str]) -> List[str]:
+        """Ids of the direct children, in task order (None for top-level tasks)"""
+        return list(self._children.get(task_id, []))
+
+    def children(self, task_id: Optional[str]) -> List[Dict[str, Any]]:
+        return [self._tasks_by_id[child] for child in self._children.get(task_id, [])]
+
+    def has_children(self, task_id: str) -> bool:
+        return bool(self._children.get(task_id))
+
+    def subtree_size(self, task_id: str) -> int:
+        """Number of descendants"""
+        return self._size.get(task_id, 0)
+
+    def subtree_ids(self, task_id: str) -> List[str]:
+        """The task and all its descendants, depth first in task order"""
+        if task_id not in self._tasks_by_id:
+            return []
+        result = []
+        stack = [task_id]
+        while stack:
+            current = stack.pop()
+            result.append(current)
+            stack.extend(reversed(self._children[current]))
+        return result
+
+    def subtree(self, task_id: str) -> List[Dict[str, Any]]:
+        return [self._tasks_by_id[i] for i in self.subtree_ids(task_id)]
+
+    def preorder(self) -> List[str]:
+        """Every task id, parents before their children"""
+        result = []
+        for root in self._children[None]:
+            result.extend(self.subtree_ids(root))
+        return result
+
+    def window(self, offset: int, limit: int, collapsed: Iterable[str] = ()) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Rows [offset, offset + limit) of the outline as a tree view shows it:
+        WBS order, with the descendants of collapsed tasks left out.
+
+        The start row is found by binary search over each level's subtree
+        sizes, and only the returned rows are visited, so a window costs
+        O(limit + depth * log(children)) plus a walk up from each collapsed
+        task, however large the project is.
+
+        Returns:
+            (rows, total number of visible rows)
+        """
+        collapsed = {task_id for task_id in collapsed if task_id in self._tasks_by_id}
+        hidden = self._hidden_rows(collapsed)
+        total = len(self._tasks_by_id) - sum(hidden.get(None, {}).values())
+        if offset >= total or limit <= 0:
+            return [], total
+
+        # Descend to the start row, remembering where to resume at each level
+        stack: List[List[Any]] = []
+        parent_id: Optional[str] = None
+        while True:
+            position, before = self._visible_child_at(parent_id, offset, hidden.get(parent_id))
+            offset -= before
+            if offset == 0:
+                stack.append([parent_id, position])
+                break
+            stack.append([parent_id, position + 1])
+            parent_id = self._children[parent_id][position]
+            offset -= 1
+
+        rows = []
+        while stack and len(rows) < limit:
+            level = stack[-1]
+            children = self._children[level[0]]
+            if level[1] >= len(children):
+                stack.pop()
+                continue
+            task_id = children[level[1]]
+            level[1] += 1
+            rows.append(self._tasks_by_id[task_id])
+            if task_id not in collapsed and self._children[task_id]:
+                stack.append([task_id, 0])
+        return rows, total
+
+    def _hidden_rows(self, collapsed: set) -> Dict[Optional[str], Dict[int, int]]:
+        """parent id -> {child position: rows hidden inside that child's subtree}"""
+        hidden: Dict[Optional[str], Dict[int, int]] = {}
+        for task_id in collapsed:
+            count = self._size[task_id]
+            if not count:
+                continue
+            ancestor = self._parent[task_id]
+            while ancestor is not None and ancestor not in collapsed:
+                ancestor = self._parent[ancestor]
+            if ancestor is not None:
+                continue  # Already hidden by a collapsed ancestor
+            node = task_id
+            while True:
+                parent_id = self._parent[node]
+                rows = hidden.setdefault(parent_id, {})
+                position = self._children[parent_id].index(node)
+                rows[position] = rows.get(position, 0) + count
+                if parent_id is None:
+                    break
+                node = parent_id
+        return hidden
+
+    def _visible_child_at(self, parent_id: Optional[str], row: int,
+                          hidden: Optional[Dict[int, int]]) -> Tuple[int, int]:
+        """Position of the child whose visible subtree holds the row-th visible row under parent_id, and the rows before it"""
+        offsets = self._row_offsets.get(parent_id)
+        if offsets is None:
+            offsets = [0]
+            for child in self._children[parent_id]:
+                offsets.append(offsets[-1] + self._size[child] + 1)
+            self._row_offsets[parent_id] = offsets
+
+        hidden_positions = sorted(hidden) if hidden else []
+        hidden_before = [0]
+        for position in hidden_positions:
+            hidden_before.append(hidden_before[-1] + hidden[position])
+
+        def visible_before(position: int) -> int:
+            return offsets[position] - hidden_before[bisect_left(hidden_positions, position)]
+
+        # Last child that starts at or before the row
+        low, high = 0, len(offsets) - 2
+        while low < high:
+            middle = (low + high + 1) // 2
+            if visible_before(middle) <= row:
+                low = middle
+            else:
+                high = middle - 1
+        return low, visible_before(low)
+
+    # =========================================================================
+    # INCREMENTAL UPDATES
+    # =========================================================================
+
+    def insert(self, task: Dict[str, Any], parent_id: Optional[str] = None, position: Optional[int] = None) -> None:
+        """Add a leaf task under parent_id (at the end of its children unless position is given)"""
+        task_id = task_key(task)
+        self._tasks_by_id[task_id] = task
+        self._id_by_outline[task.get("outline_number", "")] = task_id
+        self._children[task_id] = []
+        self._size[task_id] = 0
+        self._attach(task_id, parent_id, position)
+
+    def remove(self, task_id: str) -> List[str]:
+        """Remove a task and its subtree; returns the removed ids"""
+        removed = self.subtree_ids(task_id)
+        if not removed:
+            return removed
+        self._detach(task_id)
+        for i in removed:
+            task = self._tasks_by_id.pop(i)
+            outline = task.get("outline_number", "")
+            if self._id_by_outline.get(outline) == i:
+                del self._id_by_outline[outline]
+            del self._children[i]
+            del self._size[i]
+            del self._parent[i]
+        return removed
+
+    def move(self, task_id: str, parent_id: Optional[str], position: Optional[int] = None) -> None:
+        """Re-parent a task (with its subtree)"""
+        self._detach(task_id)
+        self._attach(task_id, parent_id, position)
+
+    def renumber(self, outline_mapping: Dict[str, str]) -> None:
+        """Apply an old -> new outline number mapping (the task dicts are already renumbered)"""
+        moved = [(self._id_by_outline.pop(old), new) for old, new in outline_mapping.items() if old in self._id_by_outline]
+        for task_id, new in moved:
+            self._id_by_outline[new] = task_id
+
+    def number(self) -> List[str]:
+        """
+        Renumber every task from the structure (1, 1.1, 1.2, 2, ...), closing
+        gaps, after insert/remove/move; returns the ids whose outline changed.
+        A top-level project summary ("0") keeps its number.
+        """
+        changed = []
+        self._id_by_outline = {}
+        roots = [task_id for task_id in self._children[None] if self._tasks_by_id[task_id].get("outline_number") != "0"]
+        for task_id in self._children[None]:
+            if task_id not in roots:
+                self._id_by_outline["0"] = task_id
+        stack = [(task_id, str(n)) for n, task_id in reversed(list(enumerate(roots, 1)))]
+        while stack:
+            task_id, outline = stack.pop()
+            task = self._tasks_by_id[task_id]
+            if task.get("outline_number") != outline:
+                task["outline_number"] = outline
+                task["outline_level"] = outline.count(".") + 1
+                changed.append(task_id)
+            self._id_by_outline[outline] = task_id
+            children = self._children[task_id]
+            stack.extend((child, f"{outline}.{n}") for n, child in reversed(list(enumerate(children, 1))))
+        return changed
+
+    def _attach(self, task_id: str, parent_id: Optional[str], position: Optional[int]) -> None:
+        siblings = self._children[parent_id]
+        siblings.insert(len(siblings) if position is None else position, task_id)
+        self._parent[task_id] = parent_id
+        self._row_offsets = {}
+        self._add_to_ancestors(parent_id, self._size[task_id] + 1)
+
+    def _detach(self, task_id: str) -> None:
+        parent_id = self._parent[task_id]
+        self._children[parent_id].remove(task_id)
+        self._row_offsets = {}
+        self._add_to_ancestors(parent_id, -(self._size[task_id] + 1))
+
+    def _add_to_ancestors(self, parent_id: Optional[str], count: int) -> None:
+        while parent_id is not None:
+            self._size[parent_id] += count
+            parent_id = self._parent[parent_id]
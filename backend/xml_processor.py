@@ -2,6 +2,9 @@ import xml.etree.ElementTree as ET
 from typing import Dict, List, Optional, Any
 from datetime import datetime
 import copy
+from scheduling_engine import ScheduleNetwork, scheduling_engine
+from wbs_index import WBSIndex, outline_key, task_key
+from task_links import links_to, refresh_link_outlines, resolve_link_ids
 
 
 class MSProjectXMLProcessor:
@@ -46,6 +49,9 @@ class MSProjectXMLProcessor:
         # This keeps the WBS clean with unique top-level numbers starting from 1
         project_data["tasks"] = self._skip_project_summary_and_renumber(project_data["tasks"])
 
+        # From here on links follow the predecessor's task id, not its outline number
+        resolve_link_ids(project_data["tasks"])
+
         return project_data
 
     def _rebuild_hierarchical_outline_numbers(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -403,6 +409,9 @@ class MSProjectXMLProcessor:
         requested_outline = task_data["outline_number"]
         tasks = project_data["tasks"]
 
+        # The new task's links name outline numbers as they are before the insert
+        resolve_link_ids(tasks, task_data.get("predecessors") or [])
+
         # Check if outline_number already exists
         existing_task = next((t for t in tasks if t["outline_number"] == requested_outline), None)
 
@@ -436,157 +445,112 @@ class MSProjectXMLProcessor:
         """Shift tasks at and after the insert position to make room for a new task.
 
         This shifts the task at insert_outline and all siblings after it (including their children)
-        by incrementing their outline numbers.
+        by incrementing their outline numbers. Links follow task ids, so they are not touched.
         """
         parts = insert_outline.split(".")
         insert_num = int(parts[-1])
         parent = ".".join(parts[:-1]) if len(parts) > 1 else ""
-        level = len(parts)
-
-        # Find all sibling outline numbers at the same level that need to shift
-        siblings_to_shift = set()
-        for task in tasks:
-            task_parts = task["outline_number"].split(".")
-            task_parent = ".".join(task_parts[:-1]) if len(task_parts) > 1 else ""
-
-            # Must be same parent and same level
-            if task_parent == parent and len(task_parts) == level:
-                task_num = int(task_parts[-1])
-                if task_num >= insert_num:
-                    siblings_to_shift.add(task["outline_number"])
-
-        # Build old -> new outline mapping
-        outline_mapping = {}
-
-        # Shift siblings and all their descendants
-        for task in tasks:
-            outline = task["outline_number"]
-
-            # Check if this task is a sibling to shift or a descendant of one
-            for sibling in siblings_to_shift:
-                if outline == sibling or outline.startswith(sibling + "."):
-                    # Calculate new outline by incrementing the sibling number
-                    sibling_parts = sibling.split(".")
-                    old_num = int(sibling_parts[-1])
-                    new_num = old_num + 1
-
-                    if parent:
-                        new_sibling = f"{parent}.{new_num}"
-                    else:
-                        new_sibling = str(new_num)
-
-                    # Apply the shift
-                    if outline == sibling:
-                        old_outline = outline
-                        task["outline_number"] = new_sibling
-                        outline_mapping[old_outline] = new_sibling
-                    else:
-                        # Descendant - replace prefix
-                        old_outline = outline
-                        task["outline_number"] = new_sibling + outline[len(sibling):]
-                        outline_mapping[old_outline] = task["outline_number"]
-
-                    # Update outline_level if changed
-                    task["outline_level"] = len(task["outline_number"].split("."))
-                    break
 
-        # Update predecessor references to point to new outline numbers
-        if outline_mapping:
-            for task in tasks:
-                if "predecessors" in task and task["predecessors"]:
-                    for pred in task["predecessors"]:
-                        old_pred_outline = pred.get("outline_number", "")
-                        if old_pred_outline in outline_mapping:
-                            pred["outline_number"] = outline_mapping[old_pred_outline]
-
-    def update_task(self, project_data: Dict[str, Any], task_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Update an existing task"""
-        from datetime import datetime, timedelta
+        # Siblings at and after the insert position (same parent, same level)
+        index = WBSIndex(tasks)
+        parent_task = index.find(parent) if parent else None
+        siblings = [
+            task for task in index.children(task_key(parent_task) if parent_task else None)
+            if (task["outline_number"].rsplit(".", 1)[0] if "." in task["outline_number"] else "") == parent
+        ]
+
+        # Shift each of them and its subtree; nothing else is visited
+        for sibling in siblings:
+            sibling_outline = sibling["outline_number"]
+            old_num = int(sibling_outline.split(".")[-1])
+            if old_num < insert_num:
+                continue
+            new_sibling = f"{parent}.{old_num + 1}" if parent else str(old_num + 1)
+            for task in index.subtree(task_key(sibling)):
+                # Replace the sibling prefix
+                task["outline_number"] = new_sibling + task["outline_number"][len(sibling_outline):]
+                task["outline_level"] = len(task["outline_number"].split("."))
+
+    def update_task(self, project_data: Dict[str, Any], task_id: str, updates: Dict[str, Any],
+                    network: Optional[ScheduleNetwork] = None) -> Optional[Dict[str, Any]]:
+        """
+        Update an existing task.
 
+        Schedule edits (duration, start/finish, constraint, predecessors and lags)
+        are propagated incrementally: only the task's successors and ancestor
+        summaries are rescheduled, stopping where dates no longer change.
+        network is a cached network of the tasks for the reschedule to reuse;
+        it is ignored when the edit changes links or outline numbers.
+        """
         updated_task = None
         for task in project_data["tasks"]:
             if task["id"] == task_id or task["outline_number"] == task_id:
-                # Check if we need to recalculate dates
-                start_changed = "start_date" in updates and updates["start_date"] != task.get("start_date")
-                duration_changed = "duration" in updates and updates["duration"] != task.get("duration")
-                constraint_changed = "constraint_type" in updates or "constraint_date" in updates
-
-                task.update(updates)
-
-                if "outline_number" in updates:
-                    task["outline_level"] = len(updates["outline_number"].split('.'))
-
-                # Apply constraint if set (and not a summary task)
-                if constraint_changed and not task.get("summary"):
-                    constraint_type = task.get("constraint_type", 0)
-                    constraint_date_str = task.get("constraint_date")
-                    duration_str = task.get("duration", "PT8H0M0S")
-                    duration_days = self._parse_duration_to_days(duration_str)
-
-                    if constraint_date_str and constraint_type in [2, 3, 4, 5, 6, 7]:
-                        try:
-                            constraint_date = datetime.fromisoformat(constraint_date_str.replace('Z', '+00:00').split('T')[0])
-
-                            if constraint_type == 2:  # Must Start On
-                                task["start_date"] = constraint_date.strftime("%Y-%m-%dT08:00:00")
-                                finish = constraint_date + timedelta(days=max(duration_days, 0))
-                                task["finish_date"] = finish.strftime("%Y-%m-%dT17:00:00")
-                                start_changed = False  # Already handled
-
-                            elif constraint_type == 3:  # Must Finish On
-                                task["finish_date"] = constraint_date.strftime("%Y-%m-%dT17:00:00")
-                                start = constraint_date - timedelta(days=max(duration_days, 0))
-                                task["start_date"] = start.strftime("%Y-%m-%dT08:00:00")
-                                start_changed = False
-
-                            elif constraint_type == 4:  # Start No Earlier Than
-                                current_start_str = task.get("start_date")
-                                if current_start_str:
-                                    current_start = datetime.fromisoformat(current_start_str.replace('Z', '+00:00').split('T')[0])
-                                    if current_start < constraint_date:
-                                        task["start_date"] = constraint_date.strftime("%Y-%m-%dT08:00:00")
-                                        finish = constraint_date + timedelta(days=max(duration_days, 0))
-                                        task["finish_date"] = finish.strftime("%Y-%m-%dT17:00:00")
-                                        start_changed = False
-
-                            elif constraint_type == 6:  # Finish No Earlier Than
-                                current_finish_str = task.get("finish_date")
-                                if current_finish_str:
-                                    current_finish = datetime.fromisoformat(current_finish_str.replace('Z', '+00:00').split('T')[0])
-                                    if current_finish < constraint_date:
-                                        task["finish_date"] = constraint_date.strftime("%Y-%m-%dT17:00:00")
-                                        start = constraint_date - timedelta(days=max(duration_days, 0))
-                                        task["start_date"] = start.strftime("%Y-%m-%dT08:00:00")
-                                        start_changed = False
-
-                        except Exception as e:
-                            print(f"Error applying constraint: {e}")
-
-                # Recalculate finish_date if start_date or duration changed (and not a summary task)
-                if (start_changed or duration_changed) and not task.get("summary"):
-                    start_str = task.get("start_date")
-                    duration_str = task.get("duration", "PT8H0M0S")
-
-                    if start_str:
-                        try:
-                            start_date = datetime.fromisoformat(start_str.replace('Z', '+00:00').split('T')[0])
-                            duration_days = self._parse_duration_to_days(duration_str)
-                            finish_date = start_date + timedelta(days=max(duration_days, 0))
-                            task["finish_date"] = finish_date.strftime("%Y-%m-%dT17:00:00")
-                        except Exception as e:
-                            print(f"Error recalculating finish date: {e}")
-
+                if "predecessors" in updates:
+                    resolve_link_ids(project_data["tasks"], updates["predecessors"] or [])
+                change = self._apply_update(task, updates)
                 updated_task = task
                 break
 
-        if updated_task:
-            # Recalculate summary tasks after update
+        if not updated_task:
+            return None
+
+        if "outline_number" in updates:
+            # Hierarchy changed - re-detect summary tasks
             project_data["tasks"] = self._calculate_summary_tasks(project_data["tasks"])
-            # Return the updated task with potentially updated summary status
-            return next((t for t in project_data["tasks"] if t["id"] == updated_task["id"]), updated_task)
 
+        task = updated_task
+        seeds, anchored, keep_start = [], [], []
+        self._queue_reschedule(task, change, seeds, anchored, keep_start)
+        if "predecessors" in updates or "outline_number" in updates:
+            network = None  # Links or hierarchy changed
+        if seeds or anchored:
+            stats = scheduling_engine.reschedule_from(project_data, seeds, anchored=anchored, keep_start=keep_start,
+                                                      network=network)
+            print(f"[Reschedule] Task {task.get('outline_number')}: {len(stats['changed'])} tasks changed, "
+                  f"{stats['visited']} recomputed{' (full reschedule)' if stats['full'] else ''}")
+
+        return task
+
+    def _apply_update(self, task: Dict[str, Any], updates: Dict[str, Any]) -> Optional[str]:
+        """
+        Apply field updates to a task (links already resolved).
+
+        Returns which schedule input changed: "links" (constraint or
+        predecessors), "start" (start date or duration), "finish" or None.
+        """
+        start_changed = "start_date" in updates and updates["start_date"] != task.get("start_date")
+        finish_changed = "finish_date" in updates and updates["finish_date"] != task.get("finish_date")
+        duration_changed = "duration" in updates and updates["duration"] != task.get("duration")
+        constraint_changed = "constraint_type" in updates or "constraint_date" in updates
+        links_changed = "predecessors" in updates and updates["predecessors"] != task.get("predecessors")
+
+        task.update(updates)
+
+        if "outline_number" in updates:
+            task["outline_level"] = len(updates["outline_number"].split('.'))
+
+        if constraint_changed or links_changed:
+            return "links"
+        if start_changed or duration_changed:
+            return "start"
+        if finish_changed:
+            return "finish"
         return None
 
+    def _queue_reschedule(self, task: Dict[str, Any], change: Optional[str], seeds: List[str],
+                          anchored: List[str], keep_start: List[str]) -> None:
+        """Add an updated task to the reschedule_from inputs for the kind of change"""
+        if change == "links":
+            # Constraint and link edits: reschedule the task itself from its predecessors
+            seeds.append(task["id"])
+        elif change == "start" and not task.get("summary"):
+            # Typed start or new duration: keep the start, derive the finish
+            seeds.append(task["id"])
+            if task.get("start_date"):
+                keep_start.append(task["id"])
+        elif change == "finish" and not task.get("summary"):
+            anchored.append(task["id"])
+
     def delete_task(self, project_data: Dict[str, Any], task_id: str) -> bool:
         """
         Delete a task from the project.
@@ -605,19 +569,14 @@ class MSProjectXMLProcessor:
             return False
 
         # Collect all tasks to delete (task + children if summary)
-        tasks_to_delete = [task_to_delete]
-        deleted_outline_numbers = {task_to_delete["outline_number"]}
-
-        # If this is a summary task, find and mark all children for deletion
-        outline_prefix = task_to_delete["outline_number"] + "."
-        for task in project_data["tasks"]:
-            if task["outline_number"].startswith(outline_prefix):
-                tasks_to_delete.append(task)
-                deleted_outline_numbers.add(task["outline_number"])
+        index = WBSIndex(project_data["tasks"])
+        tasks_to_delete = index.subtree(task_key(task_to_delete))
+        deleted_outline_numbers = {task["outline_number"] for task in tasks_to_delete}
+        deleted_ids = set(index.remove(task_key(task_to_delete)))
+        deleted_task_ids = {task.get("id") for task in tasks_to_delete}
 
         # Remove all marked tasks
-        for task in tasks_to_delete:
-            project_data["tasks"].remove(task)
+        project_data["tasks"][:] = [task for task in project_data["tasks"] if task_key(task) not in deleted_ids]
 
         # Remove predecessor references to deleted tasks from remaining tasks
         for task in project_data["tasks"]:
@@ -625,26 +584,313 @@ class MSProjectXMLProcessor:
                 # Filter out predecessors that reference deleted tasks
                 task["predecessors"] = [
                     pred for pred in task["predecessors"]
-                    if pred["outline_number"] not in deleted_outline_numbers
+                    if not links_to(pred, deleted_task_ids, deleted_outline_numbers)
                 ]
 
-        # Renumber tasks to close gaps (MS Project behavior)
+        # Renumber tasks to close gaps (MS Project behavior); links follow task ids
         outline_mapping = self._renumber_tasks(project_data["tasks"])
-
-        # Update predecessor references to new outline numbers
-        if outline_mapping:
-            for task in project_data["tasks"]:
-                if "predecessors" in task and task["predecessors"]:
-                    for pred in task["predecessors"]:
-                        old_outline = pred.get("outline_number", "")
-                        if old_outline in outline_mapping:
-                            pred["outline_number"] = outline_mapping[old_outline]
+        index.renumber(outline_mapping)
 
         # Recalculate summary tasks after deletion
-        project_data["tasks"] = self._calculate_summary_tasks(project_data["tasks"])
+        project_data["tasks"] = self._calculate_summary_tasks(project_data["tasks"], index)
 
         return True
 
+    def apply_batch(self, project_data: Dict[str, Any], operations: List[Dict[str, Any]],
+                    network: Optional[ScheduleNetwork] = None) -> Dict[str, Any]:
+        """
+        Apply an ordered list of task operations as one transaction.
+
+        Operations are {"op": "create", "task": {...}}, {"op": "update",
+        "task_id": ..., "task": {...}}, {"op": "delete", "task_id": ...} and
+        {"op": "move", "task_id": ..., "target_id" or "target_outline": ...,
+        "position": "under"|"before"|"after"}. Tasks are addressed by id (or by
+        outline number as it is at that point in the batch).
+
+        Structure changes go through one WBSIndex, and outline numbers are
+        renumbered from it only when a later operation looks a task up by
+        outline number, and once at the end. Validation, summary roll-up and
+        rescheduling then run once for the whole batch. If an operation or the
+        validation fails, the project is left as it was. network is a cached
+        network of the tasks for the reschedule to reuse when every operation
+        is an update that keeps links and outline numbers.
+
+        Returns:
+            {"success": bool, "errors": [...], "changed": [tasks created or
+            modified, including rescheduled ones], "deleted": [ids]}
+        """
+        import uuid
+        from validator import ProjectValidator
+
+        tasks = project_data["tasks"]
+        validator = ProjectValidator()
+        saved = [(task, dict(task)) for task in tasks]
+        index = WBSIndex(tasks)
+        state = {"dirty": False}  # Outline numbers behind the structure
+
+        def fresh_outlines() -> None:
+            if state["dirty"]:
+                index.number()
+                state["dirty"] = False
+
+        def find(task_id: Optional[str]) -> Optional[Dict[str, Any]]:
+            task = index.task(task_id)
+            if task is None and task_id:
+                fresh_outlines()
+                task = index.find(task_id)
+            return task
+
+        def resolve_links(links: List[Dict[str, Any]]) -> None:
+            fresh_outlines()
+            for pred in links:
+                target = index.find(pred.get("outline_number"))
+                if target is not None:
+                    pred["predecessor_id"] = task_key(target)
+                else:
+                    pred.pop("predecessor_id", None)
+
+        edited: List[str] = []
+        deleted: List[str] = []
+        seeds: List[str] = []
+        anchored: List[str] = []
+        keep_start: List[str] = []
+        errors: List[Dict[str, Any]] = []
+
+        for number, operation in enumerate(operations):
+            op = operation.get("op")
+            fields = dict(operation.get("task") or {})
+            task = find(operation.get("task_id")) if op != "create" else None
+            if op != "create" and task is None:
+                errors.append({"operation": number, "message": f"Task {operation.get('task_id')} not found"})
+                break
+
+            if op == "create":
+                outline = fields.get("outline_number") or ""
+                if not validator._validate_outline_format(outline):
+                    errors.append({"operation": number, "message": f"Invalid outline number format: {outline}"})
+                    break
+                fresh_outlines()
+                parent_id = index.parent_for(outline)
+                # Take the place of the task at this outline (it and later siblings move down)
+                requested = int(outline.rsplit(".", 1)[-1])
+                position = next((i for i, sibling in enumerate(index.children(parent_id))
+                                 if int(sibling["outline_number"].rsplit(".", 1)[-1]) >= requested), None)
+                resolve_links(fields.get("predecessors") or [])
+                task = {
+                    "id": str(uuid.uuid4()),
+                    "uid": str(uuid.uuid4()),
+                    **fields,
+                    "outline_level": len(outline.split('.')),
+                    "summary": False,
+                    "start_date": None,
+                    "finish_date": None
+                }
+                tasks.append(task)
+                index.insert(task, parent_id, position)
+                state["dirty"] = True
+                edited.append(task["id"])
+                seeds.append(task["id"])
+
+            elif op == "update":
+                if "outline_number" in fields:
+                    errors.append({"operation": number, "message": "Use a move operation to change a task's outline number"})
+                    break
+                if "predecessors" in fields:
+                    resolve_links(fields["predecessors"] or [])
+                change = self._apply_update(task, fields)
+                edited.append(task["id"])
+                self._queue_reschedule(task, change, seeds, anchored, keep_start)
+                if "start_date" not in fields and task["id"] in keep_start:
+                    # A new duration keeps the start only as long as no predecessor
+                    # moves, and other operations in the batch may move one
+                    keep_start.remove(task["id"])
+
+            elif op == "delete":
+                parent_id = index.parent_id(task_key(task))
+                deleted.extend(index.remove(task_key(task)))
+                if parent_id is not None:
+                    seeds.append(parent_id)
+                state["dirty"] = True
+
+            elif op == "move":
+                target = find(operation.get("target_id") or operation.get("target_outline"))
+                position = operation.get("position")
+                source_id = task_key(task)
+                if target is None:
+                    errors.append({"operation": number, "message": "Target task not found"})
+                    break
+                if task_key(target) in index.subtree_ids(source_id):
+                    errors.append({"operation": number, "message": "Cannot move a task under itself or its own children"})
+                    break
+                if position not in ("under", "before", "after"):
+                    errors.append({"operation": number, "message": "Position must be 'under', 'before', or 'after'"})
+                    break
+                old_parent_id = index.parent_id(source_id)
+                if position == "under":
+                    index.move(source_id, task_key(target))
+                else:
+                    parent_id = index.parent_id(task_key(target))
+                    siblings = [child for child in index.child_ids(parent_id) if child != source_id]
+                    index.move(source_id, parent_id, siblings.index(task_key(target)) + (position == "after"))
+                # Like a single move: moved tasks drop their constraints and are rescheduled
+                for moved in index.subtree(source_id):
+                    moved["constraint_type"] = 0
+                    moved["constraint_date"] = None
+                    seeds.append(moved["id"])
+                if old_parent_id is not None:
+                    seeds.append(old_parent_id)
+                state["dirty"] = True
+
+            else:
+                errors.append({"operation": number, "message": f"Unknown operation: {op}"})
+                break
+
+        if not errors:
+            # Renumber once and put the tasks back in WBS order
+            if state["dirty"]:
+                index.number()
+                tasks[:] = [index.task(task_id) for task_id in index.preorder()]
+
+            # Drop links to deleted tasks; their successors are rescheduled from
+            # the links they have left
+            if deleted:
+                deleted_ids = set(deleted)
+                for task in tasks:
+                    links = task.get("predecessors") or []
+                    kept = [pred for pred in links if pred.get("predecessor_id") not in deleted_ids]
+                    if len(kept) != len(links):
+                        task["predecessors"] = kept
+                        seeds.append(task["id"])
+                        if task["id"] in keep_start:
+                            keep_start.remove(task["id"])
+
+            # Validate every created or updated task against the result
+            for task_id in dict.fromkeys(edited):
+                task = index.task(task_id)
+                if task is None:
+                    continue  # Deleted later in the batch
+                for error in validator.validate_task(task, tasks, index)["errors"]:
+                    errors.append({"task_id": task_id, **error})
+
+        if errors:
+            # Roll back: restore every task and the task order
+            for task, snapshot in saved:
+                task.clear()
+                task.update(snapshot)
+            tasks[:] = [task for task, _ in saved]
+            return {"success": False, "errors": errors, "changed": [], "deleted": []}
+
+        # One roll-up and one incremental reschedule for the whole batch
+        self._calculate_summary_tasks(tasks, index)
+        seeds = [task_id for task_id in dict.fromkeys(seeds) if index.task(task_id) is not None]
+        anchored = [task_id for task_id in anchored if index.task(task_id) is not None]
+        if any(op["op"] != "update" or {"predecessors", "outline_number"} & (op.get("task") or {}).keys()
+               for op in operations):
+            network = None  # Links or hierarchy changed
+        stats = scheduling_engine.reschedule_from(project_data, seeds, anchored=anchored, keep_start=keep_start,
+                                                  network=network)
+        print(f"[Batch] {len(operations)} operations: {len(stats['changed'])} tasks rescheduled, "
+              f"{stats['visited']} recomputed{' (full reschedule)' if stats['full'] else ''}")
+
+        before = {id(task): snapshot for task, snapshot in saved}
+        changed = [task for task in tasks if before.get(id(task)) != task]
+        return {"success": True, "errors": [], "changed": changed, "deleted": deleted}
+
+    def clone_subtree(self, project_data: Dict[str, Any], task_id: str, copies: int,
+                      after_id: Optional[str] = None, chain: bool = False,
+                      number_names: bool = True) -> Optional[List[Dict[str, Any]]]:
+        """
+        Clone a task and its subtree several times, e.g. one building of a
+        repeated building template.
+
+        The copies are inserted one after another as siblings following
+        after_id (default: the source task), with new ids and UIDs. Links
+        inside the subtree are remapped to the same copy; links to tasks
+        outside it are kept. With chain, each copy's first tasks (no
+        predecessor inside the copy) follow the previous copy's last tasks
+        (no successor inside it), starting from the source. With number_names,
+        a trailing number on the source name is counted up ("Building 1" ->
+        "Building 2", ...).
+
+        All copies are built in memory and the project is renumbered, rolled
+        up and rescheduled once.
+
+        Returns:
+            The root task of each copy, or None if a task was not found
+        """
+        import re
+        import uuid
+
+        tasks = project_data["tasks"]
+        index = WBSIndex(tasks)
+        source = index.task(task_id) or index.find(task_id)
+        after = (index.task(after_id) or index.find(after_id)) if after_id else source
+        if source is None or after is None:
+            return None
+
+        template = index.subtree(task_key(source))
+        template_ids = {task_key(task) for task in template}
+        parent_ids = {task_key(task): index.parent_id(task_key(task)) for task in template}
+
+        # Entry and exit tasks of the template, for chaining copies
+        internal_successors = set()
+        entries = []
+        for task in template:
+            internal = [pred for pred in task.get("predecessors") or [] if pred.get("predecessor_id") in template_ids]
+            internal_successors.update(pred["predecessor_id"] for pred in internal)
+            if not internal and not index.has_children(task_key(task)):
+                entries.append(task_key(task))
+        exits = [task_key(task) for task in template
+                 if task_key(task) not in internal_successors and not index.has_children(task_key(task))]
+
+        name_match = re.match(r"^(.*?)(\d+)(\s*)$", source.get("name", "")) if number_names else None
+
+        after_parent = index.parent_id(task_key(after))
+        position = index.child_ids(after_parent).index(task_key(after)) + 1
+        previous = {task_id: task_id for task_id in template_ids}  # Copy k-1 of each template task
+        roots = []
+        seeds = []
+        for k in range(1, copies + 1):
+            id_map = {task_id: str(uuid.uuid4()) for task_id in template_ids}
+            for task in template:
+                old_id = task_key(task)
+                clone = copy.deepcopy(task)
+                clone["id"] = id_map[old_id]
+                clone["uid"] = str(uuid.uuid4())
+                clone["baselines"] = []  # New work has no baseline yet
+                for pred in clone.get("predecessors") or []:
+                    if pred.get("predecessor_id") in id_map:
+                        pred["predecessor_id"] = id_map[pred["predecessor_id"]]
+                if chain and old_id in entries:
+                    clone.setdefault("predecessors", []).extend(
+                        {"outline_number": index.task(previous[exit_id]).get("outline_number"),
+                         "predecessor_id": previous[exit_id], "type": 1, "lag": 0, "lag_format": 7}
+                        for exit_id in exits
+                    )
+
+                if task is source:
+                    if name_match:
+                        prefix, number, suffix = name_match.groups()
+                        clone["name"] = f"{prefix}{int(number) + k}{suffix}"
+                    index.insert(clone, after_parent, position)
+                    position += 1
+                    roots.append(clone)
+                else:
+                    index.insert(clone, id_map[parent_ids[old_id]])
+                tasks.append(clone)
+                if not index.has_children(old_id):
+                    seeds.append(clone["id"])  # Summaries follow their leaves
+            previous = id_map
+
+        # Renumber once, in WBS order, then roll up and reschedule the copies
+        index.number()
+        tasks[:] = [index.task(task_id) for task_id in index.preorder()]
+        self._calculate_summary_tasks(tasks, index)
+        stats = scheduling_engine.reschedule_from(project_data, seeds)
+        print(f"[Clone] {source.get('name')}: {copies} copies of {len(template)} tasks, "
+              f"{len(stats['changed'])} tasks rescheduled")
+        return roots
+
     def _renumber_tasks(self, tasks: List[Dict[str, Any]]) -> Dict[str, str]:
         """
         Renumber tasks to close gaps after deletion.
@@ -663,7 +909,7 @@ class MSProjectXMLProcessor:
 
         # Sort tasks by outline number for consistent ordering
         # This ensures parents are processed before children
-        sorted_tasks = sorted(tasks, key=lambda t: [int(x) for x in t["outline_number"].split(".")])
+        sorted_tasks = sorted(tasks, key=lambda t: outline_key(t["outline_number"]))
 
         # Track the next number for each parent level
         next_number = {}
@@ -709,58 +955,40 @@ class MSProjectXMLProcessor:
             return int(match.group(1))
         return 0
 
-    def _calculate_summary_tasks(self, tasks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _calculate_summary_tasks(self, tasks: List[Dict[str, Any]], index: Optional[WBSIndex] = None) -> List[Dict[str, Any]]:
         """
         Automatically detect summary tasks and calculate their properties based on children.
         A task is a summary task if other tasks have outline numbers that start with its outline number.
         Summary task dates are calculated as: start = min(children starts), finish = max(children finishes)
         IMPORTANT: This function preserves the original task order - do NOT sort!
         MS Project uses OutlineNumber to determine hierarchy, not task order in the file.
-        """
 
-        # Build a lookup by outline number for faster access
-        task_by_outline = {task["outline_number"]: task for task in tasks}
-        all_outlines = set(task_by_outline.keys())
+        Args:
+            tasks: Task list (updated in place)
+            index: Hierarchy index of tasks, if the caller already has one
+        """
+        if index is None or index.tasks is not tasks:
+            index = WBSIndex(tasks)
 
-        # First pass: Identify which tasks are summary tasks
+        # First pass: a task with children is a summary task
         for task in tasks:
-            outline = task["outline_number"]
-            has_children = False
-
-            # Check if any other task is a child of this task
-            for other_outline in all_outlines:
-                # A task is a child if its outline starts with parent's outline + "."
-                if other_outline.startswith(outline + ".") and other_outline != outline:
-                    has_children = True
-                    break
-
-            # Mark as summary task if it has children
+            has_children = index.has_children(task_key(task))
             task["summary"] = has_children
 
             # Summary tasks cannot be milestones
             if has_children:
                 task["milestone"] = False
 
-        # Second pass: Calculate summary task dates from children (bottom-up)
-        # Sort by outline level descending so we process deepest summary tasks first
-        sorted_outlines = sorted(all_outlines, key=lambda x: (-len(x.split('.')), x))
-
-        for outline in sorted_outlines:
-            task = task_by_outline[outline]
-            if not task.get("summary"):
+        # Second pass: roll dates up from children, deepest summaries first,
+        # so each summary already spans all of its descendants
+        for task_id in reversed(index.preorder()):
+            children = index.children(task_id)
+            if not children:
                 continue
+            task = index.task(task_id)
 
-            # Find all direct and indirect children
-            child_starts = []
-            child_finishes = []
-
-            for child_outline in all_outlines:
-                if child_outline.startswith(outline + ".") and child_outline != outline:
-                    child = task_by_outline[child_outline]
-                    if child.get("start_date"):
-                        child_starts.append(child["start_date"])
-                    if child.get("finish_date"):
-                        child_finishes.append(child["finish_date"])
+            child_starts = [child["start_date"] for child in children if child.get("start_date")]
+            child_finishes = [child["finish_date"] for child in children if child.get("finish_date")]
 
             # Set summary task dates from children (min start, max finish)
             if child_starts:
@@ -778,6 +1006,7 @@ class MSProjectXMLProcessor:
 
         # Calculate summary tasks before generating XML
         project_data["tasks"] = self._calculate_summary_tasks(project_data["tasks"])
+        refresh_link_outlines(project_data["tasks"])
 
         # Create a copy of the root to modify
         root = copy.deepcopy(self.xml_root)
@@ -807,15 +1036,7 @@ class MSProjectXMLProcessor:
 
             # Sort tasks by outline number to match frontend display order
             # This ensures row numbers in the app match MS Project
-            def outline_sort_key(task):
-                outline = task.get("outline_number", "0")
-                try:
-                    # Split by dots and convert to integers for proper numeric sorting
-                    return [int(p) for p in outline.split('.')]
-                except ValueError:
-                    return [0]
-
-            sorted_tasks = sorted(project_data["tasks"], key=outline_sort_key)
+            sorted_tasks = sorted(project_data["tasks"], key=lambda t: outline_key(t.get("outline_number", "0")))
 
             # Build UID mapping: map ALL UIDs to sequential numbers
             # MS Project displays predecessors by row number, and expects UID to match ID